@@ -0,0 +1,120 @@
+"""
+Server-side audio preprocessing before STT over a corpus of synthetic clips.
+
+Each clip is what the UI uploads from its fixed 5 s recording window:
+speech-like audio (gliding harmonics at syllable rate) somewhere inside it,
+surrounded by silence with background noise, at different levels, sample
+rates, channel counts and containers (raw pcm16, WAV, webm/Opus like
+MediaRecorder). For each the clip is preprocessed as process_audio() does
+and compared with uploading it unchanged: bytes and seconds sent to STT,
+how much of the speech survived trimming, and preprocessing CPU time per
+second of input audio.
+
+    python -m benchmarks.bench_audio_preprocess --clips 40
+"""
+
+import argparse
+import io
+import math
+import statistics
+import time
+import wave
+
+import numpy as np
+
+from modules.audio_preprocess import preprocess
+from modules.codec import encode
+
+WINDOW = 5.0
+
+
+def speech(seconds: float, rate: int, rng) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    pitch = rng.uniform(90, 220) + 25 * np.sin(2 * math.pi * rng.uniform(0.3, 1.0) * t)
+    phase = 2 * math.pi * np.cumsum(pitch) / rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 10))
+    syllables = np.clip(np.sin(2 * math.pi * rng.uniform(3, 5) * t), 0, None) ** 0.5
+    return (voice * syllables / np.abs(voice).max()).astype(np.float32)
+
+
+def wav_bytes(samples: np.ndarray, rate: int) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(samples.shape[1])
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((samples.clip(-1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+def make_clip(i: int, rng):
+    """(label, data, fmt, sample_rate, speech start, speech end) for clip i"""
+    kind = ("pcm16", "wav44", "wav48st", "webm")[i % 4]
+    rate = {"pcm16": 16000, "wav44": 44100, "wav48st": 48000, "webm": 48000}[kind]
+    level_db = rng.uniform(-40, -12)     # quiet to loud speaker
+    noise_db = rng.uniform(-75, -55)     # room noise
+    length = rng.uniform(0.8, 3.5)
+    start = rng.uniform(0.1, WINDOW - length - 0.1)
+
+    total = int(WINDOW * rate)
+    mono = rng.normal(0, 10 ** (noise_db / 20), total).astype(np.float32)
+    voice = speech(length, rate, rng) * 10 ** (level_db / 20) * math.sqrt(2)
+    first = int(start * rate)
+    mono[first:first + len(voice)] += voice
+    samples = np.stack([mono, mono * 0.8], axis=1) if kind == "wav48st" else mono[:, None]
+
+    if kind == "pcm16":
+        data, fmt = (samples[:, 0].clip(-1, 1) * 32767).astype("<i2").tobytes(), "pcm16"
+    elif kind == "webm":
+        data, fmt = encode(wav_bytes(samples, rate), "webm", 64000), "webm"
+    else:
+        data, fmt = wav_bytes(samples, rate), "wav"
+    return kind, data, fmt, rate, start, start + length
+
+
+def upload_seconds(upload) -> float:
+    import av
+    with av.open(io.BytesIO(upload.getvalue())) as container:
+        stream = container.streams.audio[0]
+        return sum(frame.samples for frame in container.decode(stream)) / stream.rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clips", type=int, default=40)
+    parser.add_argument("--format", choices=("auto", "flac", "opus", "wav"), default="auto", help="STT_UPLOAD_FORMAT")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    clips = [make_clip(i, rng) for i in range(args.clips)]
+    preprocess(clips[0][1], clips[0][2], clips[0][3], args.format)    # warm up imports
+
+    rows = {}
+    for kind, data, fmt, rate, start, end in clips:
+        cpu = time.process_time()
+        upload = preprocess(data, fmt, rate, args.format)
+        cpu = time.process_time() - cpu
+        row = rows.setdefault(kind, {"in": [], "out": [], "seconds": [], "cpu": [], "kept": [], "silent": 0})
+        row["in"].append(len(data))
+        row["cpu"].append(cpu / WINDOW)
+        if upload is None:
+            row["silent"] += 1
+            continue
+        row["out"].append(len(upload.getvalue()))
+        row["seconds"].append(upload_seconds(upload))
+        row["kept"].append(min(1.0, row["seconds"][-1] / (end - start)))
+
+    print(f"{args.clips} clips of {WINDOW:.0f} s, uploaded to STT as {args.format}\n")
+    print(f"{'clip':<10}{'bytes in':>10}{'bytes out':>11}{'saved':>8}{'s to STT':>10}{'speech kept':>13}"
+          f"{'CPU/s audio':>13}{'no speech':>11}")
+    for kind, row in rows.items():
+        bytes_in, bytes_out = statistics.mean(row["in"]), statistics.mean(row["out"] or [0])
+        print(f"{kind:<10}{bytes_in / 1024:>8.0f}KB{bytes_out / 1024:>9.0f}KB{1 - bytes_out / bytes_in:>8.0%}"
+              f"{statistics.mean(row['seconds'] or [0]):>8.2f} s{min(row['kept'] or [0]):>12.0%}"
+              f"{statistics.mean(row['cpu']) * 1000:>10.2f} ms{row['silent']:>11}")
+    print(f"\nunchanged uploads send {WINDOW:.1f} s each; 'speech kept' is the worst clip's trimmed "
+          f"length over its speech length (padding can make it 100%)")
+
+
+if __name__ == "__main__":
+    main()
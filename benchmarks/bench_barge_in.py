@@ -0,0 +1,96 @@
+"""
+Barge-in: a second request arriving while the first reply is still streaming.
+
+Runs the real WebSocket server against a local stub Groq server and a fake
+TTS engine. The client asks something, then asks again --after seconds into
+the streamed reply. Reports how long the second answer takes to start and
+how much of the abandoned reply was still generated and sent, with barge-in
+off and on.
+
+    python -m benchmarks.bench_barge_in --after 0.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.stub_groq import StubGroqServer, wait_until_listening
+
+REPLY = " ".join(f"This is sentence number {i} of a long answer." for i in range(12))
+
+
+async def session(url, after, port_label):
+    import websockets
+    from modules.protocol import decode_frame
+
+    counts = {"old_chunks": 0, "interrupt": 0}
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({"type": "hello", "protocol": 2}))
+        await ws.recv()
+        await ws.send(json.dumps({"type": "text", "text": "Tell me a long story", "stream": True}))
+        await asyncio.sleep(after)
+        second_sent = time.perf_counter()
+        await ws.send(json.dumps({"type": "text", "text": "Actually, never mind", "stream": True}))
+
+        first_new = None
+        responses = 0
+        while True:
+            message = await ws.recv()
+            if isinstance(message, bytes):
+                header, _ = decode_frame(message)
+            else:
+                header = json.loads(message)
+            kind = header["type"]
+            if kind == "interrupt":
+                counts["interrupt"] += 1
+            elif kind == "response":
+                responses += 1
+            elif kind == "audio_chunk":
+                # Until the first reply's response arrives, chunks belong to it
+                if responses == 0 and counts["interrupt"] == 0:
+                    counts["old_chunks"] += 1
+                elif first_new is None:
+                    first_new = time.perf_counter() - second_sent
+            elif kind == "audio_end" and (responses == 2 or (responses == 1 and counts["interrupt"])):
+                break
+    return first_new, counts
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--after", type=float, default=0.5)
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    args = parser.parse_args()
+
+    async with StubGroqServer(llm_delay=0.2, token_delay=args.token_delay, reply=REPLY) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.base_url
+        os.environ.setdefault("GROQ_API_KEY", "stub")
+        os.environ["TTS_PREWARM"] = "0"
+        from modules import websocket_server
+
+        def fake_tts(text):
+            time.sleep(0.05)
+            return b"RIFF" + text.encode()
+
+        server = asyncio.create_task(websocket_server.start_server(synthesize_fn=fake_tts))
+        await wait_until_listening(8765, "localhost")
+
+        print(f"second request {args.after}s into a {len(REPLY.split())}-word streamed reply")
+        print(f"{'barge-in':<10}{'2nd reply starts':>18}{'old chunks sent':>17}{'upstream busy':>17}")
+        for barge_in in (False, True):
+            websocket_server.BARGE_IN = barge_in
+            before = len(stub.requests)
+            started = time.perf_counter()
+            first_new, counts = await session("ws://localhost:8765", args.after, barge_in)
+            # Time the stub spent streaming completions that ran to the end
+            upstream = sum(end - start for _, start, end in stub.requests[before:])
+            print(f"{'on' if barge_in else 'off':<10}{first_new * 1000:>15.0f} ms{counts['old_chunks']:>17}"
+                  f"{upstream:>15.2f} s")
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
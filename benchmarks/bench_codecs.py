@@ -0,0 +1,82 @@
+"""
+Size and encode cost of synthesized speech per codec setting.
+
+For each codec and bit rate, encodes the same clip the way the Transcoder
+workers do and reports bytes per second of speech, the size relative to
+WAV, and encode CPU time per second of speech. --wav takes a real pyttsx3
+recording; without it a synthetic voice-like signal (a gliding harmonic
+tone with syllable-rate amplitude modulation, 22.05 kHz mono like pyttsx3
+output) stands in.
+
+    python -m benchmarks.bench_codecs --seconds 5
+    python -m benchmarks.bench_codecs --wav reply.wav
+"""
+
+import argparse
+import io
+import math
+import time
+import wave
+
+from modules.codec import encode
+
+SETTINGS = [
+    ("wav", None),
+    ("opus", 16000), ("opus", 24000), ("opus", 32000),
+    ("webm", 24000),
+    ("mp3", 32000), ("mp3", 48000), ("mp3", 64000),
+]
+
+
+def synthetic_speech(seconds: float, sample_rate: int = 22050) -> bytes:
+    import numpy as np
+
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    pitch = 120 + 30 * np.sin(2 * math.pi * 0.7 * t)                 # gliding fundamental
+    phase = 2 * math.pi * np.cumsum(pitch) / sample_rate
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))          # harmonics
+    envelope = np.clip(np.sin(2 * math.pi * 4 * t), 0, None) ** 0.5    # ~4 syllables/s
+    noise = np.random.default_rng(0).normal(0, 0.02, t.size)
+    samples = (voice * envelope / 3 + noise).clip(-1, 1)
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes((samples * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+def duration(wav: bytes) -> float:
+    with wave.open(io.BytesIO(wav)) as w:
+        return w.getnframes() / w.getframerate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0, help="length of the synthetic clip")
+    parser.add_argument("--wav", help="encode this WAV file instead")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.wav:
+        with open(args.wav, "rb") as f:
+            wav = f.read()
+    else:
+        wav = synthetic_speech(args.seconds)
+    seconds = duration(wav)
+
+    print(f"{seconds:.1f} s clip, {len(wav) / 1024:.0f} KB as WAV\n")
+    print(f"{'codec':<8}{'kbit/s':>8}{'bytes/s':>10}{'size':>8}{'encode CPU':>16}")
+    for codec, bitrate in SETTINGS:
+        cpu = time.process_time()
+        for _ in range(args.iterations):
+            audio = wav if codec == "wav" else encode(wav, codec, bitrate)
+        cpu = (time.process_time() - cpu) / args.iterations
+        print(f"{codec:<8}{(bitrate or 0) // 1000 or '-':>8}{len(audio) / seconds:>10.0f}"
+              f"{len(audio) / len(wav):>8.1%}{cpu / seconds * 1000:>10.1f} ms/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Concurrent turns against a local stub Groq server.
+
+Fires N text turns and N transcriptions at AIVoiceAssistant at the same time
+and reports how many upstream requests were in flight together. With the
+async client every client's request overlaps, so wall time stays close to a
+single request's latency instead of growing with N.
+
+    python -m benchmarks.bench_concurrent_turns --clients 8 --llm-delay 0.5
+"""
+
+import argparse
+import asyncio
+import base64
+import os
+import sys
+import time
+
+from benchmarks.stub_groq import StubGroqServer, max_overlap
+
+
+async def run(clients: int, llm_delay: float, stt_delay: float) -> int:
+    async with StubGroqServer(llm_delay=llm_delay, stt_delay=stt_delay) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.base_url
+        os.environ.setdefault("GROQ_API_KEY", "stub")
+        os.environ.setdefault("STT_PREPROCESS", "0")     # the clip is placeholder bytes
+        from modules.assistant import AIVoiceAssistant
+
+        assistant = AIVoiceAssistant()
+        history = [{"role": "system", "content": "You are a test."}]
+        audio = base64.b64encode(b"\x00" * 2048).decode()
+
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[assistant.process_command(f"hello {i}", list(history)) for i in range(clients)],
+            *[assistant.process_audio(audio) for _ in range(clients)],
+        )
+        wall = time.perf_counter() - started
+
+    failures = [r for r in results if isinstance(r, dict) and r["status"] != "success"]
+    overlap = max_overlap([(s, e) for _, s, e in stub.requests])
+    serial = clients * (llm_delay + stt_delay)
+
+    print(f"clients:              {clients}")
+    print(f"upstream requests:    {len(stub.requests)} over {stub.connections} connection(s)")
+    print(f"max in flight:        {overlap}")
+    print(f"wall time:            {wall:.3f}s (serial would be ~{serial:.3f}s)")
+    print(f"failed turns:         {len(failures)}")
+
+    ok = not failures and overlap >= min(clients, 2)
+    print("PASS: turns overlap" if ok else "FAIL: turns were serialized")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    parser.add_argument("--stt-delay", type=float, default=0.3)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.clients, args.llm_delay, args.stt_delay)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Round trips per tool turn, with and without direct replies.
+
+The stub Groq server asks for a tool call on every user message; the turn
+is run with the tool's direct_reply policy on (reply with the tool's own
+message) and off (a second completion phrases the result).
+
+    python -m benchmarks.bench_direct_reply --llm-delay 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.stub_groq import StubGroqServer
+
+
+async def turn(assistant, stub, stream: bool):
+    history = [{"role": "system", "content": "You are a test."}]
+    before = len(stub.requests)
+    started = time.perf_counter()
+    if stream:
+        async for kind, response in assistant.stream_command("remind me to stretch", history):
+            pass
+    else:
+        response = await assistant.process_command("remind me to stretch", history)
+    elapsed = (time.perf_counter() - started) * 1000
+    return len(stub.requests) - before, elapsed, response["message"]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    tool_call = ("set_reminder", {"reminder_text": "stretch", "duration_minutes": 30})
+    async with StubGroqServer(llm_delay=args.llm_delay, tool_call=tool_call) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.base_url
+        os.environ.setdefault("GROQ_API_KEY", "stub")
+        os.environ.setdefault("STORE_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+        from modules.assistant import AIVoiceAssistant
+        from modules.tools import tool_policies
+
+        assistant = AIVoiceAssistant()
+        print(f"{'mode':<10}{'direct_reply':<14}{'round trips':>12}{'turn':>10}  reply")
+        for stream in (False, True):
+            for direct in (False, True):
+                tool_policies["set_reminder"]["direct_reply"] = direct
+                trips, elapsed, message = await turn(assistant, stub, stream)
+                mode = "streamed" if stream else "whole"
+                print(f"{mode:<10}{str(direct):<14}{trips:>12}{elapsed:>8.0f}ms  {message!r}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""
+Fast-path intent routing: accuracy per threshold and turn latency.
+
+Classifies a labelled set of utterances (requests the router should answer
+and ones that need the LLM) at several thresholds, then times a routed turn
+against the same request sent through a local stub Groq server.
+
+    python -m benchmarks.bench_intent_router --llm-delay 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.stub_groq import StubGroqServer
+
+UTTERANCES = [
+    ("What time is it?", "get_current_time"),
+    ("Hey Aria, what's the time please", "get_current_time"),
+    ("tell me the current time", "get_current_time"),
+    ("What's the date today?", "get_current_date"),
+    ("what day is it", "get_current_date"),
+    ("Today's date please", "get_current_date"),
+    ("List my reminders.", "get_reminders"),
+    ("Show me all my reminders", "get_reminders"),
+    ("do I have any reminders", "get_reminders"),
+    ("Do I have any messages?", "get_messages"),
+    ("read my messages", "get_messages"),
+    ("what time is it in Tokyo", None),
+    ("what is the date of the next full moon", None),
+    ("tell me a joke about time", None),
+    ("remind me to call mom in 10 minutes", None),
+    ("delete reminder 2", None),
+    ("what are my reminders for tomorrow", None),
+    ("send a message to John saying I'm late", None),
+    ("play some relaxing music", None),
+    ("how much time does it take to boil an egg", None),
+]
+
+
+def accuracy(router_cls, tools, threshold):
+    router = router_cls(tools, threshold=threshold)
+    correct = false_routes = 0
+    for text, expected in UTTERANCES:
+        routed = router.route(text)
+        correct += routed == expected
+        false_routes += routed is not None and routed != expected
+    return correct, false_routes, router.stats()["hit_rate"]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    parser.add_argument("--iterations", type=int, default=10000)
+    args = parser.parse_args()
+
+    async with StubGroqServer(llm_delay=args.llm_delay) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.base_url
+        os.environ.setdefault("GROQ_API_KEY", "stub")
+        from modules.assistant import AIVoiceAssistant
+        from modules.intent_router import IntentRouter
+        from modules.tools import tools
+
+        print(f"{'threshold':>10}{'correct':>10}{'false routes':>14}{'hit rate':>10}")
+        for threshold in (0.5, 0.6, 0.7, 0.8, 0.9, 1.0):
+            correct, false_routes, hit_rate = accuracy(IntentRouter, tools, threshold)
+            print(f"{threshold:>10.1f}{correct:>7}/{len(UTTERANCES)}{false_routes:>14}{hit_rate:>10.0%}")
+
+        router = IntentRouter(tools)
+        started = time.perf_counter()
+        for i in range(args.iterations):
+            router.classify(UTTERANCES[i % len(UTTERANCES)][0])
+        per_call = (time.perf_counter() - started) / args.iterations * 1e6
+        print(f"\nclassify(): {per_call:.1f} us per utterance")
+
+        assistant = AIVoiceAssistant()
+        history = [{"role": "system", "content": "You are a test."}]
+        started = time.perf_counter()
+        routed = await assistant.process_command("What time is it?", list(history))
+        routed_ms = (time.perf_counter() - started) * 1000
+
+        assistant.router = None
+        started = time.perf_counter()
+        await assistant.process_command("What time is it?", list(history))
+        llm_ms = (time.perf_counter() - started) * 1000
+
+    print(f"routed turn: {routed_ms:.1f} ms ({routed['message']!r})")
+    print(f"LLM turn:    {llm_ms:.1f} ms (one stub round trip; a real tool turn makes two)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
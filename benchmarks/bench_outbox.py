@@ -0,0 +1,121 @@
+"""
+A streamed reply to a client on a slow link: inline sends vs the session outbox.
+
+The fake socket takes --kbps to "transmit" each frame. The producer plays
+a streamed turn: response_delta text every --delta-ms and a WAV sentence
+of --chunk-kb every --chunk-ms, then a reminder arrives mid-reply. Inline
+is how the server sent before the outbox (await websocket.send() in the
+turn itself). Reports how late text frames reach the client compared with
+when the turn would have produced them on an unblocked schedule, how long
+the producer (the turn pipeline) was blocked, and how much audio was sent.
+
+    python -m benchmarks.bench_outbox --kbps 800 --chunks 12
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from modules.metrics import Turn
+from modules.outbox import Outbox
+
+
+class SlowSocket:
+    def __init__(self, kbps: float):
+        self.bytes_per_second = kbps * 1000 / 8
+        self.received = []      # (type, due at, received at)
+
+    async def send(self, frame):
+        await asyncio.sleep(len(frame) / self.bytes_per_second)
+        header = json.loads(frame if isinstance(frame, str) else frame[frame.index(b"{"):frame.index(b"}") + 1])
+        self.received.append((header["type"], header["t"], time.perf_counter()))
+
+
+def frame(message_type: str, due: float, payload_bytes: int = 0):
+    header = json.dumps({"type": message_type, "t": due})
+    return header.encode() + bytes(payload_bytes) if payload_bytes else header
+
+
+async def produce(send, args):
+    """The turn: returns seconds spent blocked in send()"""
+    blocked = 0.0
+    deltas_per_chunk = max(1, args.chunk_ms // args.delta_ms)
+    started = time.perf_counter()
+    due = lambda: started + step * args.delta_ms / 1000     # when this frame is produced if nothing blocks
+    step = 0
+
+    async def timed(frame_, message_type):
+        nonlocal blocked
+        started = time.perf_counter()
+        await send(frame_, message_type)
+        blocked += time.perf_counter() - started
+
+    await timed(frame("transcription", due()), "transcription")
+    for seq in range(args.chunks):
+        for _ in range(deltas_per_chunk):
+            await timed(frame("response_delta", due()), "response_delta")
+            await asyncio.sleep(args.delta_ms / 1000)
+            step += 1
+        await timed(frame("audio_chunk", due(), args.chunk_kb * 1024), "audio_chunk")
+        if seq == args.chunks // 2:
+            await timed(frame("reminder", due()), "reminder")
+    await timed(frame("response", due()), "response")
+    return blocked
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def run(mode, args):
+    socket = SlowSocket(args.kbps)
+    outbox = Outbox(socket.send, max_bytes=args.max_kb * 1024, stale_seconds=args.stale)
+
+    async def inline(frame_, message_type):
+        await socket.send(frame_)
+
+    turn = Turn("text")
+
+    async def queued(frame_, message_type):
+        await outbox.put(frame_, message_type, turn if message_type == "audio_chunk" else None)
+
+    started = time.perf_counter()
+    blocked = await produce(inline if mode == "inline" else queued, args)
+    produced = time.perf_counter() - started
+    await outbox.flush()
+    await outbox.close()
+
+    text_delay = [received - due for kind, due, received in socket.received if kind != "audio_chunk"]
+    audio = [r for r in socket.received if r[0] == "audio_chunk"]
+    return {
+        "text p50": percentile(text_delay, 0.5) * 1000,
+        "text p95": percentile(text_delay, 0.95) * 1000,
+        "blocked": blocked / produced,
+        "audio sent": len(audio),
+        "done": (socket.received[-1][2] - started) if socket.received else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--kbps", type=float, default=800, help="client link speed, kbit/s")
+    parser.add_argument("--chunks", type=int, default=12, help="audio chunks in the reply")
+    parser.add_argument("--chunk-kb", type=int, default=90, help="one spoken sentence as WAV is ~90 KB")
+    parser.add_argument("--chunk-ms", type=int, default=300, help="time between chunks being synthesized")
+    parser.add_argument("--delta-ms", type=int, default=30)
+    parser.add_argument("--max-kb", type=int, default=1024, help="outbox byte budget (OUTBOX_MAX_BYTES)")
+    parser.add_argument("--stale", type=float, default=10.0, help="OUTBOX_STALE_SECONDS")
+    args = parser.parse_args()
+
+    print(f"{args.chunks} x {args.chunk_kb} KB audio + text at {args.kbps:.0f} kbit/s")
+    print(f"{'mode':<8}{'text p50':>10}{'text p95':>10}{'turn blocked':>14}{'audio sent':>12}{'last frame':>12}")
+    for mode in ("inline", "outbox"):
+        r = await run(mode, args)
+        print(f"{mode:<8}{r['text p50']:>7.0f} ms{r['text p95']:>7.0f} ms{r['blocked']:>14.0%}"
+              f"{r['audio sent']:>7}/{args.chunks:<4}{r['done']:>10.1f} s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Bytes and CPU per audio round trip: protocol 1 (base64 in JSON) vs protocol 2 (binary frames).
+
+A round trip is one recorded clip uploaded by the client plus one synthesized
+reply sent back. For each we time the encode on the sending side and the
+decode on the receiving side, exactly as modules/ and ui/app.js do them
+(the browser half is approximated with the equivalent Python calls).
+
+    python -m benchmarks.bench_protocol --upload-kb 80 --reply-kb 300
+"""
+
+import argparse
+import base64
+import json
+import os
+import time
+
+from modules.protocol import decode_frame, encode_frame
+
+
+def v1_round_trip(upload: bytes, reply: bytes):
+    # client: FileReader.readAsDataURL -> JSON.stringify
+    up = json.dumps({"type": "audio", "audio": base64.b64encode(upload).decode(), "stream": True})
+    # server: json.loads -> b64decode
+    data = json.loads(up)
+    received = base64.b64decode(data["audio"])
+    # server: b64encode -> json.dumps
+    down = json.dumps({"type": "audio_response", "audio": base64.b64encode(reply).decode("utf-8")})
+    # client: JSON.parse -> atob
+    played = base64.b64decode(json.loads(down)["audio"])
+    return len(up.encode()) + len(down.encode()), len(received) + len(played)
+
+
+def v2_round_trip(upload: bytes, reply: bytes):
+    up = encode_frame({"type": "audio", "format": "webm", "stream": True}, upload)
+    _, received = decode_frame(up)
+    down = encode_frame({"type": "audio_response"}, reply)
+    _, played = decode_frame(down)
+    return len(up) + len(down), len(received) + len(played)
+
+
+def measure(fn, upload, reply, iterations):
+    wire = payload = 0
+    cpu = time.process_time()
+    for _ in range(iterations):
+        wire, payload = fn(upload, reply)
+    cpu = (time.process_time() - cpu) / iterations
+    return wire, payload, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--upload-kb", type=int, default=80, help="recorded clip (5 s of webm/opus is ~80 KB)")
+    parser.add_argument("--reply-kb", type=int, default=300, help="synthesized WAV reply")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    upload = os.urandom(args.upload_kb * 1024)
+    reply = os.urandom(args.reply_kb * 1024)
+
+    print(f"upload {args.upload_kb} KB + reply {args.reply_kb} KB, {args.iterations} iterations")
+    print(f"{'protocol':<24}{'bytes on wire':>16}{'overhead':>10}{'CPU/round trip':>17}")
+    results = {}
+    for label, fn in (("1 (base64 JSON)", v1_round_trip), ("2 (binary frames)", v2_round_trip)):
+        wire, payload, cpu = measure(fn, upload, reply, args.iterations)
+        results[label] = (wire, cpu)
+        print(f"{label:<24}{wire:>16,}{(wire / payload - 1) * 100:>9.1f}%{cpu * 1000:>14.3f} ms")
+
+    (w1, c1), (w2, c2) = results.values()
+    print(f"binary frames: {1 - w2 / w1:.0%} fewer bytes, {c1 / c2:.1f}x less CPU per round trip")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Repeated requests with the response cache off and on.
+
+Sends the same request --repeats times from a fresh history (like a quick
+action button) through a local stub Groq server, then a turn that calls a
+tool with side effects to show it is never served from the cache.
+
+    python -m benchmarks.bench_response_cache --llm-delay 0.5 --repeats 5
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.stub_groq import StubGroqServer
+
+
+async def repeat(assistant, text, repeats):
+    timings = []
+    for _ in range(repeats):
+        history = [{"role": "system", "content": "You are a test."}]
+        started = time.perf_counter()
+        await assistant.process_command(text, history)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--llm-delay", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    async with StubGroqServer(llm_delay=args.llm_delay, reply="Here's a joke for you.") as stub:
+        os.environ["GROQ_BASE_URL"] = stub.base_url
+        os.environ.setdefault("GROQ_API_KEY", "stub")
+        os.environ.setdefault("STORE_PATH", os.path.join(tempfile.mkdtemp(), "bench.db"))
+        from modules.assistant import AIVoiceAssistant
+        from modules.response_cache import ResponseCache, schema_version
+        from modules.tools import tools, tool_policies
+
+        assistant = AIVoiceAssistant()
+        for label, cache in (("off", None), ("on", ResponseCache(tool_policies, schema_version(tools)))):
+            assistant.response_cache = cache
+            before = len(stub.requests)
+            timings = await repeat(assistant, "Tell me a joke", args.repeats)
+            print(f"cache {label:<4} upstream requests {len(stub.requests) - before:>3}   "
+                  f"per turn: {' '.join(f'{t:6.1f}' for t in timings)} ms")
+
+        stub.tool_call = ("send_message", {"content": "hi", "recipient": "sam"})
+        before = len(stub.requests)
+        await repeat(assistant, "Text Sam hi", 2)
+        print(f"side-effect tool turn x2: upstream requests {len(stub.requests) - before} (never cached)")
+        print(f"stats: {assistant.response_cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+"""
+Soak test: does the server's memory stay flat over thousands of turns?
+
+Starts the server as load_test does (stub Groq and TTS) and keeps --clients
+connections busy until --turns turns are done. Each connection is a new
+user (fresh client_id) for --session-turns turns, cycling through an audio
+turn, a text turn (the stub model answers both with a send_message tool
+call carrying --message-kb of text) and "list my messages", whose tool
+result grows with the user's messages. New users keep the workload the
+same from start to end, so any lasting growth is the server's. The
+server's RSS (whole process tree, from /proc) and its accounted
+per-session memory (voice_session_memory_bytes) are sampled as it goes.
+
+The server runs with MALLOC_ARENA_MAX=--malloc-arenas: glibc otherwise gives
+threads (the thread pools) arenas of their own and RSS climbs in steps of
+several MB for thousands of turns before it levels off, which hides a leak
+in a run of this length (--malloc-arenas 0 keeps glibc's default).
+
+After the first quarter of the turns (imports, caches, pools warm) RSS
+should stop growing. The test fails (exit status 1) if its median over the
+last quarter is more than --max-growth-mb above its median over the second
+quarter, or if the trend over the last three quarters (least squares) is
+steeper than --max-slope-mb per 1000 turns. Caps can be tried from the
+environment, e.g. TOOL_RESULT_MAX_CHARS=10000000 to keep whole tool results
+in the history.
+
+    python -m benchmarks.bench_soak --clients 16 --turns 4000
+    python -m benchmarks.bench_soak --turns 2000 --trace     # then print /debug/memory
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import sys
+import time
+import uuid
+
+from benchmarks.load_test import REPLY, TRANSCRIPT, free_port, process_usage, serve, speech_pcm
+from benchmarks.stub_groq import StubGroqServer, wait_until_listening
+
+
+async def http_get(port: int, path: str) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {path} HTTP/1.0\r\n\r\n".encode())
+    response = await reader.read()
+    writer.close()
+    return response.split(b"\r\n\r\n", 1)[1].decode()
+
+
+async def session_memory(port: int) -> int:
+    body = await http_get(port, "/metrics")
+    return sum(int(float(value)) for value in re.findall(r"^voice_session_memory_bytes\{.*\} (\S+)$", body, re.M))
+
+
+async def user(url: str, args, progress: dict):
+    import websockets
+    from modules.protocol import decode_frame, encode_frame
+
+    pcm = speech_pcm(args.clip_seconds)
+    turn = 0
+    while progress["started"] < args.turns:
+        async with websockets.connect(url, max_size=10 ** 8) as ws:
+            await ws.send(json.dumps({"type": "hello", "protocol": 2, "client_id": uuid.uuid4().hex}))
+            await ws.recv()
+            for _ in range(args.session_turns):
+                if progress["started"] >= args.turns:
+                    break
+                progress["started"] += 1
+                kind = ("audio", "text", "list")[turn % 3]
+                turn += 1
+                if kind == "audio":
+                    await ws.send(encode_frame({"type": "audio", "format": "pcm16", "sample_rate": 16000}, pcm))
+                else:
+                    text = TRANSCRIPT if kind == "text" else "list my messages"
+                    await ws.send(json.dumps({"type": "text", "text": text}))
+                while True:
+                    message = await ws.recv()
+                    header = decode_frame(message)[0] if isinstance(message, bytes) else json.loads(message)
+                    if header["type"] == "error":
+                        progress["errors"] += 1
+                        break
+                    if header["type"] == "audio_response":
+                        progress["done"] += 1
+                        break
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=4000, help="turns in total")
+    parser.add_argument("--session-turns", type=int, default=60, help="turns per connection, each a new user")
+    parser.add_argument("--message-kb", type=float, default=1.0, help="text stored per send_message call")
+    parser.add_argument("--clip-seconds", type=float, default=2.0)
+    parser.add_argument("--samples", type=int, default=24, help="RSS samples over the run")
+    parser.add_argument("--max-growth-mb", type=float, default=4.0, help="allowed RSS growth after warm-up")
+    parser.add_argument("--max-slope-mb", type=float, default=2.0, help="allowed RSS trend, MB per 1000 turns")
+    parser.add_argument("--malloc-arenas", type=int, default=2, help="MALLOC_ARENA_MAX for the server, 0 for glibc's default")
+    parser.add_argument("--trace", action="store_true", help="MEMORY_DEBUG=1 and print /debug/memory at the end")
+    args = parser.parse_args()
+
+    metrics_port = free_port()
+    os.environ["METRICS_PORT"] = str(metrics_port)
+    if args.malloc_arenas:
+        os.environ["MALLOC_ARENA_MAX"] = str(args.malloc_arenas)
+    if args.trace:
+        os.environ["MEMORY_DEBUG"] = "1"
+    tool_call = ("send_message", {"recipient": "bob", "content": "x" * int(args.message_kb * 1024)})
+
+    async with StubGroqServer(llm_delay=0.02, stt_delay=0.02, reply=REPLY, transcript=TRANSCRIPT,
+                              tool_call=tool_call) as stub:
+        port = free_port()
+        options = {"stt": "groq", "stt_delay": 0.02, "tts_delay": 0.01, "workers": 1}
+        server = multiprocessing.get_context("spawn").Process(target=serve, args=(port, stub.base_url, options))
+        server.start()
+        try:
+            await wait_until_listening(port)
+            progress = {"started": 0, "done": 0, "errors": 0}
+            users = asyncio.gather(*(user(f"ws://127.0.0.1:{port}", args, progress) for _ in range(args.clients)))
+
+            samples = []        # (turns done, seconds, RSS bytes, session bytes)
+            started = time.perf_counter()
+            step = max(1, args.turns // args.samples)
+            while not users.done():
+                await asyncio.sleep(0.05)
+                if progress["done"] >= len(samples) * step or users.done():
+                    samples.append((progress["done"], time.perf_counter() - started,
+                                    process_usage(server.pid)[1], await session_memory(metrics_port)))
+            await users
+            report = await http_get(metrics_port, "/debug/memory") if args.trace else None
+        finally:
+            server.terminate()
+            server.join()
+
+    print(f"{args.clients} users, {progress['done']} turns ({progress['errors']} errors), "
+          f"a new user every {args.session_turns} turns, {args.message_kb:g} KB per stored message\n")
+    print(f"{'turns':>7}{'seconds':>9}{'RSS':>10}{'sessions':>12}")
+    for done, seconds, rss, accounted in samples:
+        print(f"{done:>7}{seconds:>9.1f}{rss / 2 ** 20:>7.1f} MB{accounted / 1024:>9.0f} KB")
+
+    # RSS moves by a few MB between samples as the allocator reuses memory: compare medians
+    done = samples[-1][0]
+    warm = statistics.median(rss for turns, _, rss, _ in samples if done // 4 <= turns <= done // 2)
+    end = statistics.median(rss for turns, _, rss, _ in samples if turns >= done * 3 // 4)
+    growth = (end - warm) / 2 ** 20
+    # A steady leak can hide in the noise between two medians; the trend can't
+    after = [(turns, rss) for turns, _, rss, _ in samples if turns >= done // 4]
+    slope = statistics.linear_regression([t for t, _ in after], [r for _, r in after]).slope * 1000 / 2 ** 20
+    print(f"\nmedian RSS after warm-up (turns {done // 4}-{done // 2}) {warm / 2 ** 20:.1f} MB, "
+          f"over the last quarter {end / 2 ** 20:.1f} MB: {growth:+.1f} MB; trend {slope:+.2f} MB per 1000 turns")
+    failed = []
+    if growth > args.max_growth_mb:
+        failed.append(f"RSS grew more than {args.max_growth_mb:g} MB")
+    if slope > args.max_slope_mb:
+        failed.append(f"RSS is rising faster than {args.max_slope_mb:g} MB per 1000 turns")
+    print("PASS: RSS flat" if not failed else "FAIL: " + "; ".join(failed))
+    if report:
+        print("\n" + report)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
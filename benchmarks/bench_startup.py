@@ -0,0 +1,89 @@
+"""
+Startup cost: importing the server, and launching it until the socket accepts.
+
+Each run is a fresh interpreter, so nothing is cached in sys.modules. The
+import run also lists which heavy third-party packages the import pulled in;
+with lazy backends none of them should be loaded before start_server()
+creates the ones that are configured.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY = ("groq", "httpx", "speech_recognition", "pyttsx3", "faster_whisper", "numpy")
+
+IMPORT_SCRIPT = f"""
+import sys, time
+started = time.perf_counter()
+import modules.websocket_server
+elapsed = time.perf_counter() - started
+print(elapsed, ",".join(m for m in {HEAVY!r} if m in sys.modules))
+"""
+
+SERVE_SCRIPT = """
+import asyncio, sys
+from modules import websocket_server
+asyncio.run(websocket_server.start_server("127.0.0.1", int(sys.argv[1])))
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_import(env):
+    out = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT], env=env, capture_output=True, text=True, check=True)
+    elapsed, loaded = (out.stdout.strip().split(" ") + [""])[:2]
+    return float(elapsed), loaded
+
+
+def time_ready(env) -> float:
+    """Process spawn to the WebSocket port accepting connections"""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-c", SERVE_SCRIPT, str(port)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.01)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = dict(os.environ, GROQ_API_KEY=os.environ.get("GROQ_API_KEY", "stub"), TTS_PREWARM="0",
+               METRICS_PORT="-1", LOG_LEVEL="WARNING",
+               STORE_PATH=os.path.join(tempfile.mkdtemp(prefix="bench_startup_"), "assistant.db"))
+
+    imports = [time_import(env) for _ in range(args.runs)]
+    ready = [time_ready(env) for _ in range(args.runs)]
+
+    print(f"median of {args.runs} fresh interpreters")
+    print(f"import modules.websocket_server  {statistics.median(t for t, _ in imports) * 1000:>6.0f} ms"
+          f"   heavy modules loaded: {imports[0][1] or 'none'}")
+    print(f"spawn to socket accepting        {statistics.median(ready) * 1000:>6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Reminder lookups at scale: module-level lists vs the SQLite store.
+
+Fills both with --reminders reminders spread over --owners clients, then
+times the operations the assistant performs: one client's active
+reminders, a lookup by id (delete_reminder), and the due-reminder query
+that the old 10-second poll answered by parsing every entry's time.
+
+    python -m benchmarks.bench_store --reminders 100000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from modules.store import Store
+
+
+def timed(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        result = fn()
+    return (time.perf_counter() - started) / iterations * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reminders", type=int, default=100_000)
+    parser.add_argument("--owners", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    now = datetime.now()
+    rows = [
+        (f"reminder {i}", now + timedelta(minutes=rng.randint(-60, 7 * 24 * 60)), f"client-{rng.randrange(args.owners)}")
+        for i in range(args.reminders)
+    ]
+
+    # The old layout: a list of dicts with formatted times
+    reminders = []
+    for text, due, owner in rows:
+        reminders.append({
+            "id": len(reminders) + 1, "text": text, "time": due.strftime("%Y-%m-%d %H:%M"),
+            "created": now.strftime("%Y-%m-%d %H:%M:%S"), "active": True, "owner": owner
+        })
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = Store(os.path.join(tmp, "bench.db"))
+        started = time.perf_counter()
+        for text, due, owner in rows:
+            store.add_reminder(text, due, owner)
+        queued = time.perf_counter() - started
+        store.flush()
+        committed = time.perf_counter() - started
+        print(f"{args.reminders} reminders: queued in {queued:.2f}s, committed in {committed:.2f}s "
+              f"({store.commits} transactions)\n")
+
+        owner = "client-7"
+        target = args.reminders // 2
+        print(f"{'operation':<28}{'lists (ms)':>12}{'store (ms)':>12}")
+        cases = [
+            (
+                "one client's reminders",
+                lambda: [r for r in reminders if r["active"] and r["owner"] == owner],
+                lambda: store.active_reminders(owner),
+            ),
+            (
+                "reminder by id",
+                lambda: next(r for r in reminders if r["id"] == target),
+                lambda: store.get_reminder(target),
+            ),
+            (
+                "due reminders",
+                lambda: [r for r in reminders
+                         if r["active"] and datetime.now() >= datetime.strptime(r["time"], "%Y-%m-%d %H:%M")],
+                lambda: store.due_reminders(datetime.now(), limit=args.reminders),
+            ),
+        ]
+        for name, old, new in cases:
+            old_ms, old_result = timed(old, max(1, args.iterations // 10) if name == "due reminders" else args.iterations)
+            new_ms, new_result = timed(new, args.iterations)
+            assert (len(old_result) if isinstance(old_result, list) else 1) == \
+                   (len(new_result) if isinstance(new_result, list) else 1), name
+            print(f"{name:<28}{old_ms:>12.3f}{new_ms:>12.3f}")
+
+        started = time.perf_counter()
+        pending = store.pending_reminders()
+        print(f"\nstartup load of {len(pending)} active reminders: {time.perf_counter() - started:.2f}s")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
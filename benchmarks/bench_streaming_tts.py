@@ -0,0 +1,103 @@
+"""
+Time-to-first-audio with and without streamed responses.
+
+Runs the same text turn through respond() twice against a local stub Groq
+server that streams tokens with a fixed gap, using a fake TTS whose cost is
+proportional to the text length:
+
+  before  full completion -> synthesize whole reply -> one audio_response
+  after   tokens streamed -> per-sentence synthesis -> ordered audio_chunk messages
+
+    python -m benchmarks.bench_streaming_tts --first-token 0.3 --token-delay 0.03
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.stub_groq import StubGroqServer
+
+REPLY = (
+    "Sure, I can help with that. Your reminder to call mom is set for 2:45 PM today. "
+    "I also found three messages waiting for you from this morning. "
+    "Would you like me to read them out loud now, or save them for later?"
+)
+
+
+class FakeTTS:
+    def __init__(self, seconds_per_char: float):
+        self.seconds_per_char = seconds_per_char
+
+    def text_to_speech(self, text: str) -> bytes:
+        time.sleep(len(text) * self.seconds_per_char)
+        return b"RIFF" + b"\x00" * len(text) * 100
+
+
+class RecordingSocket:
+    """Collects (elapsed, message type) for everything the server sends"""
+
+    remote_address = ("bench", 0)
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sent = []
+
+    async def send(self, message):
+        self.sent.append((time.perf_counter() - self.started, json.loads(message)["type"]))
+
+    def first(self, *types_):
+        return next((t for t, kind in self.sent if kind in types_), None)
+
+
+async def run(first_token: float, token_delay: float, seconds_per_char: float):
+    fake = FakeTTS(seconds_per_char)
+
+    async with StubGroqServer(llm_delay=first_token, token_delay=token_delay, reply=REPLY) as stub:
+        os.environ["GROQ_BASE_URL"] = stub.base_url
+        os.environ.setdefault("GROQ_API_KEY", "stub")
+        from modules import websocket_server
+        from modules.conversation import Conversation
+        from modules.session import Session
+        from modules.tts import tts_service
+
+        tts_service.synthesize_fn = fake.text_to_speech
+        tts_service.use_processes = False
+
+        results = {}
+        for label, stream in (("before", False), ("after", True)):
+            socket = RecordingSocket()
+            history = Conversation("You are a test.")
+            session = Session(socket, history)
+            await websocket_server.respond(session, "what's up", stream=stream)
+            await session.outbox.flush()
+            results[label] = (
+                socket.first("audio_response", "audio_chunk"),
+                socket.first("response_delta", "response"),
+                socket.sent[-1][0],
+            )
+        await tts_service.close()
+
+    print(f"reply: {len(REPLY)} chars, {len(REPLY.split())} tokens, "
+          f"first token {first_token * 1000:.0f} ms, +{token_delay * 1000:.0f} ms/token, "
+          f"TTS {seconds_per_char * 1000:.1f} ms/char")
+    print(f"{'mode':<8}{'first text':>14}{'first audio':>14}{'turn done':>14}")
+    for label, (audio, text, done) in results.items():
+        print(f"{label:<8}{text * 1000:>11.0f} ms{audio * 1000:>11.0f} ms{done * 1000:>11.0f} ms")
+    before, after = results["before"][0], results["after"][0]
+    print(f"time-to-first-audio: {before * 1000:.0f} ms -> {after * 1000:.0f} ms "
+          f"({before / after:.1f}x faster)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--first-token", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.03)
+    parser.add_argument("--tts-ms-per-char", type=float, default=4.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.first_token, args.token_delay, args.tts_ms_per_char / 1000))
+
+
+if __name__ == "__main__":
+    main()
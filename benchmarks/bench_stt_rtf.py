@@ -0,0 +1,96 @@
+"""
+Real-time factor of the local STT backend on the CPU.
+
+For each model size, loads LocalWhisperSTT (download + warm-up are not
+timed), then transcribes the same clips one at a time and as a concurrent
+burst of --clients requests that the backend batches together. RTF is
+processing time / audio duration: below 1.0 is faster than real time.
+
+Needs faster-whisper; model weights are fetched on first use.
+
+    python -m benchmarks.bench_stt_rtf --models tiny.en base.en small.en --clients 4
+    python -m benchmarks.bench_stt_rtf --wav sample.wav
+"""
+
+import argparse
+import asyncio
+import io
+import math
+import struct
+import time
+
+from modules.stt import LocalWhisperSTT
+from modules.vad import wav_header
+
+
+def synthetic_clip(seconds: float, sample_rate: int = 16000) -> bytes:
+    """Speech-like WAV: voiced harmonics with a syllable-rate envelope"""
+    samples = []
+    for n in range(int(seconds * sample_rate)):
+        t = n / sample_rate
+        envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 4 * t)
+        pitch = 140 + 30 * math.sin(2 * math.pi * 0.7 * t)
+        value = sum(math.sin(2 * math.pi * pitch * h * t) / h for h in (1, 2, 3))
+        samples.append(int(6000 * envelope * value / 1.8))
+    pcm = struct.pack(f"<{len(samples)}h", *samples)
+    return wav_header(len(pcm), sample_rate) + pcm
+
+
+def wav_seconds(wav: bytes) -> float:
+    channels, sample_rate = struct.unpack_from("<HI", wav, 22)
+    bits = struct.unpack_from("<H", wav, 34)[0]
+    return (len(wav) - 44) / (sample_rate * channels * bits // 8)
+
+
+def upload(wav: bytes) -> io.BytesIO:
+    audio_file = io.BytesIO(wav)
+    audio_file.name = "audio.wav"
+    return audio_file
+
+
+async def run_model(model: str, wav: bytes, clients: int, repeats: int, workers: int):
+    stt = LocalWhisperSTT(model_size=model, workers=workers, batch_size=clients)
+    started = time.perf_counter()
+    await stt.start()
+    load = time.perf_counter() - started
+    duration = wav_seconds(wav)
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        text = await stt.transcribe(upload(wav))
+    single = (time.perf_counter() - started) / repeats
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await asyncio.gather(*(stt.transcribe(upload(wav)) for _ in range(clients)))
+    burst = (time.perf_counter() - started) / repeats
+
+    await stt.close()
+    print(f"{model:<12} load {load:6.1f}s   single {single:6.2f}s RTF {single / duration:5.2f}   "
+          f"{clients} concurrent {burst:6.2f}s RTF/clip {burst / clients / duration:5.2f}")
+    print(f"{'':<12} text: {text[:60]!r}")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=["tiny.en", "base.en", "small.en"])
+    parser.add_argument("--wav", help="16-bit PCM WAV to transcribe instead of a synthetic clip")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.wav:
+        with open(args.wav, "rb") as f:
+            wav = f.read()
+    else:
+        wav = synthetic_clip(args.seconds)
+    print(f"clip: {wav_seconds(wav):.1f}s, {args.clients} concurrent clients, {args.workers} worker(s)\n")
+
+    for model in args.models:
+        await run_model(model, wav, args.clients, args.repeats, args.workers)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
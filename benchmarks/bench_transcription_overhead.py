@@ -0,0 +1,70 @@
+"""
+Server-side cost of getting one utterance ready for upload.
+
+Compares the old temp-file path (decode, mktemp, write, reopen, read,
+delete) with the in-memory path used by process_audio today, for base64
+input (protocol 1), raw bytes (protocol 2) and raw PCM. The network upload
+itself is excluded; "read" stands in for the HTTP client consuming the file.
+
+    python -m benchmarks.bench_transcription_overhead --seconds 5
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import time
+
+from modules.assistant import audio_upload
+
+
+def temp_file_path(audio, fmt):
+    audio_bytes = base64.b64decode(audio) if isinstance(audio, str) else audio
+    tmp_filename = tempfile.mktemp(suffix=f".{fmt}")
+    try:
+        with open(tmp_filename, "wb") as f:
+            f.write(audio_bytes)
+        with open(tmp_filename, "rb") as audio_file:
+            return len(audio_file.read())
+    finally:
+        os.remove(tmp_filename)
+
+
+def in_memory_path(audio, fmt):
+    return len(audio_upload(audio, fmt).read())
+
+
+def per_call(fn, audio, fmt, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn(audio, fmt)
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0, help="utterance length")
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    webm = os.urandom(int(16_000 * args.seconds))        # ~128 kbps opus/webm
+    pcm = os.urandom(int(32_000 * args.seconds))         # 16 kHz 16-bit mono
+    cases = [
+        ("base64 webm (protocol 1)", base64.b64encode(webm).decode(), "webm", temp_file_path),
+        ("raw webm (protocol 2)", webm, "webm", temp_file_path),
+        ("raw pcm16 (streamed mic)", pcm, "pcm16", None),
+    ]
+
+    print(f"{args.seconds:.0f} s utterance, {args.iterations} iterations, temp dir {tempfile.gettempdir()}")
+    print(f"{'input':<28}{'temp file':>12}{'in memory':>12}{'speedup':>10}")
+    for label, audio, fmt, old in cases:
+        new = per_call(in_memory_path, audio, fmt, args.iterations)
+        if old:
+            before = per_call(old, audio, fmt, args.iterations)
+            print(f"{label:<28}{before * 1e6:>9.0f} us{new * 1e6:>9.0f} us{before / new:>9.1f}x")
+        else:
+            print(f"{label:<28}{'-':>12}{new * 1e6:>9.0f} us{'':>10}")
+
+
+if __name__ == "__main__":
+    main()
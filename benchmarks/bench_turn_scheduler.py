@@ -0,0 +1,78 @@
+"""
+Fairness and admission control of a shared stage.
+
+One greedy session queues --burst jobs on a stage just before --sessions
+other sessions queue one job each. With a plain FIFO semaphore the others
+wait behind the whole burst; the round-robin Stage serves them after at most
+one greedy job each. Then more jobs than the queue holds are offered to show
+rejections, and a waiting session is cancelled to show its jobs leave the queue.
+
+    python -m benchmarks.bench_turn_scheduler --burst 20 --sessions 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from modules.turn_scheduler import Stage, StageBusy
+
+
+async def job(limiter, session, work, done):
+    started = time.perf_counter()
+    if isinstance(limiter, Stage):
+        async with limiter.slot(session):
+            await asyncio.sleep(work)
+    else:
+        async with limiter:
+            await asyncio.sleep(work)
+    done.append((session, time.perf_counter() - started))
+
+
+async def waits(limiter, burst, sessions, work):
+    done = []
+    tasks = [asyncio.create_task(job(limiter, "greedy", work, done)) for _ in range(burst)]
+    await asyncio.sleep(0)
+    tasks += [asyncio.create_task(job(limiter, f"s{i}", work, done)) for i in range(sessions)]
+    await asyncio.gather(*tasks)
+    others = [t for s, t in done if s != "greedy"]
+    return statistics.mean(others), max(others)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--burst", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--work", type=float, default=0.05)
+    args = parser.parse_args()
+
+    fifo = await waits(asyncio.Semaphore(args.concurrency), args.burst, args.sessions, args.work)
+    fair = await waits(Stage("llm", args.concurrency, queue_size=1000), args.burst, args.sessions, args.work)
+    print(f"other sessions' latency behind a {args.burst}-job burst (concurrency {args.concurrency}):")
+    print(f"  FIFO semaphore    mean {fifo[0] * 1000:6.0f} ms   max {fifo[1] * 1000:6.0f} ms")
+    print(f"  round-robin Stage mean {fair[0] * 1000:6.0f} ms   max {fair[1] * 1000:6.0f} ms")
+
+    stage = Stage("stt", args.concurrency, queue_size=8)
+    done = []
+    tasks = [asyncio.create_task(job(stage, f"s{i % 4}", args.work, done)) for i in range(20)]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    rejected = sum(isinstance(r, StageBusy) for r in results)
+    print(f"\n20 jobs offered to a stage holding {args.concurrency} + 8 queued: "
+          f"{len(done)} ran, {rejected} rejected with StageBusy")
+
+    stage = Stage("tts", 1)
+    blocker = asyncio.create_task(job(stage, "a", 0.2, []))
+    await asyncio.sleep(0)
+    waiting = [asyncio.create_task(job(stage, "gone", 0.2, [])) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    before = stage.stats()["waiting"]
+    for task in waiting:
+        task.cancel()
+    await asyncio.gather(*waiting, return_exceptions=True)
+    print(f"disconnect: {before} queued jobs cancelled -> {stage.stats()['waiting']} left waiting")
+    await blocker
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
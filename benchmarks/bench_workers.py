@@ -0,0 +1,31 @@
+"""
+Throughput and latency of the load test as the number of worker processes
+grows. Takes every load_test option; --counts picks the worker counts.
+
+Each worker has its own event loop, stage limits and TTS pool, so on a
+machine with N cores throughput should grow until the workers (plus their
+TTS processes) use the N cores; past that, more workers only add memory.
+
+    python -m benchmarks.bench_workers --counts 1 2 4 --clients 300 --turns 3
+"""
+
+import asyncio
+import os
+
+from benchmarks import load_test
+
+
+async def main():
+    parser = load_test.parser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU(s)\n")
+    for workers in args.counts:
+        args.workers = workers
+        load_test.report(args, await load_test.run(args))
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,273 @@
+"""
+End-to-end load test of the WebSocket server against local stubs.
+
+The server runs in its own process exactly as main.py starts it (with
+--workers N, as a WorkerPool of N processes), except that Groq points at a
+StubGroqServer (LLM and, by default, transcription) and TTS is the "stub"
+backend from benchmarks/stub_backends.py, sleeping --tts-delay per call.
+Hundreds of simulated clients then connect, say hello and send a mix of
+`audio` (binary pcm16 frames) and `text` turns, one at a time, the way the
+UI does. Reports turn latency and time-to-first-audio percentiles, completed
+turns per second, "busy" rejections, and the server process's CPU time and
+RSS summed over its processes (read from /proc, so those two are Linux only).
+
+    python -m benchmarks.load_test --clients 200 --turns 5 --stream
+    LLM_CONCURRENCY=64 STAGE_QUEUE_SIZE=256 python -m benchmarks.load_test --clients 300
+
+Server settings come from the environment as usual, so tuning variables can
+be tried without editing anything.
+"""
+
+import argparse
+import array
+import asyncio
+import functools
+import json
+import math
+import multiprocessing
+import os
+import random
+import socket
+import tempfile
+import time
+import uuid
+
+from benchmarks.stub_groq import StubGroqServer, wait_until_listening
+
+REPLY = "Sure, here is a short answer. It has a couple of sentences. That should do it."
+TRANSCRIPT = "tell me something interesting about the ocean"
+
+
+# ----- server process -----
+
+def serve(port: int, groq_url: str, options: dict):
+    """Child process: the real server (or a WorkerPool of them) wired to the stubs"""
+    os.environ.update({
+        "GROQ_BASE_URL": groq_url,
+        "BACKEND_PLUGINS": "benchmarks.stub_backends",
+        "TTS_BACKEND": "stub",
+        "STUB_TTS_DELAY": str(options["tts_delay"]),
+        "STUB_STT_DELAY": str(options["stt_delay"]),
+        "STUB_TRANSCRIPT": TRANSCRIPT,
+        "STORE_PATH": os.path.join(tempfile.mkdtemp(prefix="load_test_"), "assistant.db"),
+    })
+    if options["stt"] == "stub":
+        os.environ["STT_BACKEND"] = "stub"
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    os.environ.setdefault("TTS_PREWARM", "0")
+    os.environ.setdefault("METRICS_PORT", "-1")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")     # busy rejections are counted, not logged
+
+    if options["workers"] > 1:
+        from modules.workers import WorkerPool
+        WorkerPool(options["workers"], "127.0.0.1", port).run()
+        return
+
+    from modules.websocket_server import start_server
+    from modules.workers import stop_on_sigterm
+    stop_on_sigterm()
+    try:
+        asyncio.run(start_server("127.0.0.1", port))
+    except KeyboardInterrupt:
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def descendants(pid: int):
+    """pid and every process below it (workers, TTS pools), from /proc"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    found, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        found.append(current)
+        stack.extend(children.get(current, ()))
+    return found
+
+
+def process_usage(pid: int):
+    """(CPU seconds, RSS bytes) of pid's whole process tree, or None off Linux"""
+    cpu = rss = 0
+    try:
+        pids = descendants(pid)
+    except OSError:
+        return None
+    for current in pids:
+        try:
+            with open(f"/proc/{current}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{current}/status") as f:
+                status = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        cpu += (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")     # utime + stime
+        rss += int(status["VmRSS"].split()[0]) * 1024
+    return cpu, rss
+
+
+# ----- simulated clients -----
+
+@functools.lru_cache()
+def speech_pcm(seconds: float) -> bytes:
+    """A tone between two quiet gaps, so server-side trimming finds something to keep"""
+    n = int(seconds * 16000)
+    tone = [int(8000 * math.sin(2 * math.pi * 180 * i / 16000)) if n // 4 <= i < 3 * n // 4 else 0 for i in range(n)]
+    return array.array("h", tone).tobytes()
+
+
+async def client(url: str, turns: int, args, results: list):
+    import websockets
+    from modules.protocol import decode_frame, encode_frame
+
+    # Protocol 2 binary frames: the server wraps pcm16 in a WAV header itself
+    pcm = speech_pcm(args.clip_seconds)
+
+    async with websockets.connect(url, max_size=10 ** 7) as ws:
+        # A client_id, like the UI sends, so its conversation is kept in the shared store
+        hello = {"type": "hello", "protocol": 2, "client_id": uuid.uuid4().hex}
+        if args.audio:
+            hello["audio"] = args.audio.split(",")
+        await ws.send(json.dumps(hello))
+        await ws.recv()
+
+        for _ in range(turns):
+            kind = "audio" if random.random() < args.audio_share else "text"
+            started = time.perf_counter()
+            if kind == "audio":
+                header = {"type": "audio", "format": "pcm16", "sample_rate": 16000, "stream": args.stream}
+                await ws.send(encode_frame(header, pcm))
+            else:
+                await ws.send(json.dumps({"type": "text", "text": TRANSCRIPT, "stream": args.stream}))
+
+            first_audio = None
+            audio_bytes = 0
+            outcome = "ok"
+            while True:
+                message = await ws.recv()
+                header = decode_frame(message)[0] if isinstance(message, bytes) else json.loads(message)
+                kind_in = header["type"]
+                if kind_in in ("audio_chunk", "audio_response"):
+                    audio_bytes += len(message)
+                    if first_audio is None:
+                        first_audio = time.perf_counter() - started
+                if kind_in == "error":
+                    outcome = "busy" if header.get("code") == "busy" else "error"
+                    break
+                if kind_in == "audio_end" or (kind_in == "audio_response" and not args.stream):
+                    break
+            results.append((kind, outcome, time.perf_counter() - started, first_audio, audio_bytes))
+
+            if args.think:
+                await asyncio.sleep(random.uniform(0, 2 * args.think))
+
+
+def percentiles(values):
+    if not values:
+        return "        -        -        -"
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return "".join(f"{pick(q) * 1000:>9.0f}" for q in (0.50, 0.95, 0.99))
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3, help="turns per client")
+    parser.add_argument("--workers", type=int, default=1, help="server processes sharing the port (WORKERS)")
+    parser.add_argument("--audio-share", type=float, default=0.5, help="fraction of turns sent as audio")
+    parser.add_argument("--stream", action="store_true", help="ask for streamed replies")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which clients connect")
+    parser.add_argument("--think", type=float, default=0.0, help="mean pause between a client's turns")
+    parser.add_argument("--clip-seconds", type=float, default=2.0)
+    parser.add_argument("--llm-delay", type=float, default=0.3, help="stub LLM latency (first token when streaming)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="stub gap between streamed tokens")
+    parser.add_argument("--stt-delay", type=float, default=0.2)
+    parser.add_argument("--tts-delay", type=float, default=0.05, help="fake synthesis time per call")
+    parser.add_argument("--audio", default="", help="codecs the clients accept, e.g. opus,mp3 (default: WAV)")
+    parser.add_argument("--stt", choices=("groq", "stub"), default="groq",
+                        help="groq: real GroqSTT against the stub server; stub: in-process backend")
+    return parser
+
+
+async def run(args) -> dict:
+    """Start the server, drive the clients, stop it; returns the raw results"""
+    async with StubGroqServer(llm_delay=args.llm_delay, stt_delay=args.stt_delay, token_delay=args.token_delay,
+                              reply=REPLY, transcript=TRANSCRIPT) as stub:
+        port = free_port()
+        options = {"stt": args.stt, "stt_delay": args.stt_delay, "tts_delay": args.tts_delay,
+                   "workers": args.workers}
+        server = multiprocessing.get_context("spawn").Process(target=serve, args=(port, stub.base_url, options))
+        server.start()
+        try:
+            await wait_until_listening(port)
+            # A warm-up turn per worker so imports and connection setup aren't measured
+            await asyncio.gather(*(client(f"ws://127.0.0.1:{port}", 1, args, []) for _ in range(2 * args.workers)))
+
+            results = []
+            usage_before = process_usage(server.pid)
+            started = time.perf_counter()
+
+            async def staggered(i):
+                await asyncio.sleep(args.ramp * i / max(1, args.clients))
+                await client(f"ws://127.0.0.1:{port}", args.turns, args, results)
+
+            outcomes = await asyncio.gather(*(staggered(i) for i in range(args.clients)), return_exceptions=True)
+            elapsed = time.perf_counter() - started
+            usage_after = process_usage(server.pid)
+        finally:
+            server.terminate()
+            server.join()
+
+    return {
+        "results": results,
+        "elapsed": elapsed,
+        "failed": [o for o in outcomes if isinstance(o, BaseException)],
+        "cpu": usage_after[0] - usage_before[0] if usage_before and usage_after else None,
+        "rss": usage_after[1] if usage_after else None,
+    }
+
+
+def report(args, run_result: dict):
+    results, elapsed, failed = run_result["results"], run_result["elapsed"], run_result["failed"]
+    ok = [r for r in results if r[1] == "ok"]
+    print(f"{args.clients} clients x {args.turns} turns, {args.workers} worker(s), {args.audio_share:.0%} audio, "
+          f"{'streamed' if args.stream else 'whole'} replies, stt={args.stt}, audio={args.audio or 'wav'}")
+    print(f"{'':<22}{'p50':>9}{'p95':>9}{'p99':>9}   (ms)")
+    for kind in ("audio", "text"):
+        rows = [r for r in ok if r[0] == kind]
+        if rows:
+            print(f"{kind + ' turn':<22}{percentiles([r[2] for r in rows])}")
+            print(f"{kind + ' first audio':<22}{percentiles([r[3] for r in rows if r[3] is not None])}")
+    print(f"{'all turns':<22}{percentiles([r[2] for r in ok])}")
+    print(f"completed {len(ok)} turns in {elapsed:.2f} s = {len(ok) / elapsed:.1f} turns/s; "
+          f"busy {sum(r[1] == 'busy' for r in results)}, errors {sum(r[1] == 'error' for r in results)}, "
+          f"dropped clients {len(failed)}")
+    if ok:
+        print(f"speech received {sum(r[4] for r in ok) / len(ok) / 1024:.1f} KB/turn")
+    if run_result["cpu"] is not None:
+        cpu = run_result["cpu"]
+        print(f"server CPU {cpu:.2f} s ({cpu / elapsed:.0%} of one core, {cpu / max(1, len(ok)) * 1000:.1f} ms/turn), "
+              f"RSS {run_result['rss'] / 2 ** 20:.0f} MB across its processes")
+    if failed:
+        print(f"first client failure: {failed[0]!r}")
+
+
+async def main():
+    args = parser().parse_args()
+    report(args, await run(args))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
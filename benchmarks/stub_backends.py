@@ -0,0 +1,49 @@
+"""
+Stub STT and TTS backends, registered under the name "stub".
+
+Load them into a server like any backend plugin, so every worker process
+gets them without code changes:
+
+    BACKEND_PLUGINS=benchmarks.stub_backends STT_BACKEND=stub TTS_BACKEND=stub python main.py
+
+STUB_STT_DELAY / STUB_TTS_DELAY (seconds) and STUB_TRANSCRIPT tune them.
+The stub TTS returns a valid WAV of silence as long as the text would take
+to say (~60 ms per character), so codecs and byte counts behave as for
+real speech.
+"""
+
+import asyncio
+import os
+import time
+
+from modules import backends
+from modules.stt import STTBackend
+from modules.vad import wav_header
+
+STT_DELAY = float(os.getenv("STUB_STT_DELAY", "0.2"))
+TTS_DELAY = float(os.getenv("STUB_TTS_DELAY", "0.05"))
+TRANSCRIPT = os.getenv("STUB_TRANSCRIPT", "tell me something interesting about the ocean")
+
+
+class StubSTT(STTBackend):
+    """Transcribes every clip as TRANSCRIPT after STT_DELAY, without HTTP"""
+
+    name = "stub"
+
+    async def transcribe(self, audio_file):
+        await asyncio.sleep(STT_DELAY)
+        return TRANSCRIPT
+
+
+def fake_tts(text: str) -> bytes:
+    time.sleep(TTS_DELAY)
+    pcm = bytes(int(len(text) * 0.06 * 16000) * 2)
+    return wav_header(len(pcm), 16000) + pcm
+
+
+def fake_tts_backend():
+    return fake_tts
+
+
+backends.register("stt", "stub", StubSTT)
+backends.register("tts", "stub", fake_tts_backend)
@@ -0,0 +1,188 @@
+"""
+Minimal local stand-in for the Groq HTTP API.
+
+Speaks just enough HTTP/1.1 (keep-alive, Content-Length bodies, chunked SSE
+for stream=True) for the Groq SDK to talk to it, answers chat completions and
+transcriptions after a fixed delay, and records when each request started and finished so benchmarks can
+check that requests from different clients overlap.
+"""
+
+import asyncio
+import json
+import time
+
+
+class StubGroqServer:
+    def __init__(self, llm_delay: float = 0.5, stt_delay: float = 0.3,
+                 reply: str = "Stub reply.", transcript: str = "what time is it",
+                 token_delay: float = 0.0, tool_call: tuple = None):
+        self.llm_delay = llm_delay          # non-streamed: whole reply; streamed: first token
+        self.stt_delay = stt_delay
+        self.token_delay = token_delay      # streamed: gap between tokens
+        self.reply = reply
+        self.transcript = transcript
+        self.tool_call = tool_call          # (name, arguments): requested whenever the user spoke last
+        self.requests = []          # (path, started, finished)
+        self.connections = 0
+        self._writers = set()
+        self._server = None
+        self.port = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.sleep(0)
+        await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        k, v = line.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                started = time.perf_counter()
+                if path.endswith("/chat/completions") and json.loads(body).get("stream"):
+                    await self.stream(writer, json.loads(body))
+                    self.requests.append((path, started, time.perf_counter()))
+                    continue
+                content_type, payload = await self.respond(path, body)
+                self.requests.append((path, started, time.perf_counter()))
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: " + content_type.encode() + b"\r\n"
+                    b"Content-Length: " + str(len(payload)).encode() + b"\r\n"
+                    b"Connection: keep-alive\r\n\r\n" + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def respond(self, path: str, body: bytes):
+        if path.endswith("/audio/transcriptions"):
+            await asyncio.sleep(self.stt_delay)
+            return "text/plain", self.transcript.encode()
+
+        # A non-streamed reply arrives only once every token has been generated
+        await asyncio.sleep(self.llm_delay + self.token_delay * (len(self.reply.split(" ")) - 1))
+        return "application/json", json.dumps(self.completion(json.loads(body))).encode()
+
+    async def stream(self, writer, request: dict):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        await asyncio.sleep(self.llm_delay)
+        tool_call = self.wants_tool(request)
+        if tool_call:
+            self._write_chunk(writer, self.sse(request, {"tool_calls": [dict(tool_call, index=0)]}, None))
+            self._write_chunk(writer, self.sse(request, {}, "tool_calls"))
+            self._write_chunk(writer, b"data: [DONE]\n\n")
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+            return
+        tokens = [word + " " for word in self.reply.split(" ")]
+        tokens[-1] = tokens[-1].rstrip()
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            self._write_chunk(writer, self.sse(request, {"content": token}, None))
+            await writer.drain()
+        self._write_chunk(writer, self.sse(request, {}, "stop"))
+        self._write_chunk(writer, b"data: [DONE]\n\n")
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    @staticmethod
+    def _write_chunk(writer, data: bytes):
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+    def sse(self, request: dict, delta: dict, finish_reason) -> bytes:
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return b"data: " + json.dumps(chunk).encode() + b"\n\n"
+
+    def wants_tool(self, request: dict):
+        if not self.tool_call or request["messages"][-1]["role"] != "user":
+            return None
+        name, arguments = self.tool_call
+        return {
+            "id": f"call_stub_{len(self.requests)}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)},
+        }
+
+    def completion(self, request: dict) -> dict:
+        tool_call = self.wants_tool(request)
+        message = {"role": "assistant", "content": self.reply}
+        if tool_call:
+            message = {"role": "assistant", "content": None, "tool_calls": [tool_call]}
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if tool_call else "stop",
+                "message": message,
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+
+def max_overlap(intervals) -> int:
+    """Largest number of (start, end) intervals open at the same instant."""
+    events = sorted([(s, 1) for s, _ in intervals] + [(e, -1) for _, e in intervals])
+    best = current = 0
+    for _, delta in events:
+        current += delta
+        best = max(best, current)
+    return best
+
+
+async def wait_until_listening(port: int, host: str = "127.0.0.1", timeout: float = 30.0):
+    """Poll until the server under test accepts connections"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
@@ -1,5 +1,10 @@
 import asyncio
+from modules.config import WORKERS
 from modules.websocket_server import start_server
+from modules.workers import run_workers
 
 if __name__ == "__main__":
-    asyncio.run(start_server())
+    if WORKERS > 1:
+        run_workers(WORKERS)
+    else:
+        asyncio.run(start_server())
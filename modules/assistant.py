@@ -1,62 +1,153 @@
+import asyncio
 import base64
-import tempfile
-import os
-from typing import List, Dict
-from groq import Groq
-from dotenv import load_dotenv
+import contextvars
+import functools
+import io
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Union
 from .function import *
-from .tools import tools, function_map
+from .config import (
+    TOOL_WORKERS, TOOL_TIMEOUT, TOOL_RESULT_MAX_CHARS, CONVERSATION_SUMMARY_MODEL, CONVERSATION_SUMMARY_TOKENS, INTENT_ROUTER,
+    LLM_MODEL, LLM_TEMPERATURE, RESPONSE_CACHE, STT_BACKEND, LLM_BACKEND, STT_PREPROCESS,
+)
+from . import backends
+from .conversation import transcript
+from .intent_router import IntentRouter
+from .metrics import span, FAST_PATH, TOOL_SECONDS
+from .response_cache import ResponseCache, schema_version
+from .tools import tools, function_map, tool_timeouts, tool_policies
+from .groq_client import groq_slots
+from .stt import STTBackend
+from .turn_scheduler import turn_scheduler, StageBusy
+from .vad import wav_header
 import json
 
+log = logging.getLogger(__name__)
+
+# Sync tools run here so blocking calls (webbrowser, the store) stay off the event loop
+tool_pool = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+
+def audio_upload(audio: Union[str, bytes, memoryview], fmt: str = "webm", sample_rate: int = 16000) -> io.BytesIO:
+    """
+    Wrap a client clip as a named in-memory file for the STT backend.
+
+    Base64 (protocol 1) is decoded, raw bytes are used as-is, and raw PCM
+    gets a WAV header; the name tells Whisper which container it's reading.
+    """
+    data = base64.b64decode(audio) if isinstance(audio, str) else audio
+    if fmt == "pcm16":
+        data = wav_header(len(data), sample_rate) + data
+        fmt = "wav"
+    audio_file = io.BytesIO(data)
+    audio_file.name = f"audio.{fmt}"
+    return audio_file
+
+
+def tool_content(result: Dict, max_chars: int = TOOL_RESULT_MAX_CHARS) -> str:
+    """
+    A tool result as the JSON the model (and the conversation history) gets,
+    at most max_chars long. A long "data" list is cut to its first items
+    with an "omitted" count; anything else too long loses its data.
+    """
+    content = json.dumps(result)
+    if len(content) <= max_chars:
+        return content
+    data = result.get("data")
+    if isinstance(data, list):
+        keep = len(data)
+        while keep > 0:
+            keep //= 2
+            content = json.dumps({**result, "data": data[:keep], "omitted": len(data) - keep})
+            if len(content) <= max_chars:
+                return content
+    summary = {key: value for key, value in result.items() if key != "data"}
+    summary["truncated"] = True
+    content = json.dumps(summary)
+    return content if len(content) <= max_chars else json.dumps({"success": result.get("success"), "truncated": True})
 
-load_dotenv()
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 
 class AIVoiceAssistant:
-    def __init__(self):
+    def __init__(self, stt: STTBackend = None, llm=None):
+        # Backends not passed in are created from the registry on first use
+        # (or all at once by start_server), so importing this is cheap
+        self._stt = stt
+        self._llm = llm
+        self.router = IntentRouter(tools) if INTENT_ROUTER else None
+        self.response_cache = ResponseCache(tool_policies, schema_version(tools)) if RESPONSE_CACHE else None
+
+    @property
+    def stt(self) -> STTBackend:
+        if self._stt is None:
+            self._stt = backends.create("stt", STT_BACKEND)
+        return self._stt
+
+    @stt.setter
+    def stt(self, backend: STTBackend):
+        self._stt = backend
+
+    @property
+    def llm(self):
+        """Chat completions client (chat.completions.create)"""
+        if self._llm is None:
+            self._llm = backends.create("llm", LLM_BACKEND)
+        return self._llm
+
+    @llm.setter
+    def llm(self, client):
+        self._llm = client
+
+    @functools.cached_property
+    def recognizer(self):
+        """Energy settings for the streamed-mic endpointer, as speech_recognition tunes them"""
         import speech_recognition as sr
-        self.recognizer = sr.Recognizer()
-        self.recognizer.energy_threshold = 4000
-        self.recognizer.dynamic_energy_threshold = True
-
-    def process_audio(self, base64_audio: str) -> str:
-        tmp_filename = None
-        try:
-            audio_bytes = base64.b64decode(base64_audio)
-            tmp_filename = tempfile.mktemp(suffix=".webm")
-            with open(tmp_filename, "wb") as f:
-                f.write(audio_bytes)
-            with open(tmp_filename, "rb") as audio_file:
-                transcription = client.audio.transcriptions.create(
-                    model="whisper-large-v3",
-                    file=audio_file,
-                    response_format="text"
-                )
-            return transcription
-        except Exception as e:
-            return f"[ERROR] {type(e).__name__}: {str(e)}"
-        finally:
-            if tmp_filename and os.path.exists(tmp_filename):
-                os.remove(tmp_filename)
-
-
+        recognizer = sr.Recognizer()
+        recognizer.energy_threshold = 4000
+        recognizer.dynamic_energy_threshold = True
+        return recognizer
 
     async def process_command(self, user_message: str, conversation_history: List[Dict]) -> Dict:
-
-
+        # ✅ Simple requests (time, date, reminders...) skip the LLM entirely
+        routed = await self._route(user_message)
+        if routed:
+            return routed
+
+        key = self._cache_key(user_message, conversation_history)
+        cached = self.response_cache.get(key) if key else None
+        if cached:
+            FAST_PATH.inc(path="response_cache")
+            log.info("Reply served from the response cache")
+            return cached
+
+        response = await self._complete_command(user_message, conversation_history)
+        if key:
+            self.response_cache.put(key, response)
+        return response
+
+    def _cache_key(self, user_message: str, conversation_history: List[Dict]) -> Optional[str]:
+        if not self.response_cache:
+            return None
+        return self.response_cache.key(user_message, conversation_history, LLM_MODEL, LLM_TEMPERATURE)
+
+    async def _complete_command(self, user_message: str, conversation_history: List[Dict]) -> Dict:
         try:
             # Build messages (ONLY dicts)
             messages = conversation_history + [
                 {"role": "user", "content": user_message}
             ]
 
-            response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=messages,
-                tools=tools,
-                tool_choice="auto",
-                temperature=0.7
-            )
+            async with turn_scheduler.llm.slot(), groq_slots:
+                with span("llm_1"):
+                    response = await self.llm.chat.completions.create(
+                        model=LLM_MODEL,
+                        messages=messages,
+                        tools=tools,
+                        tool_choice="auto",
+                        temperature=LLM_TEMPERATURE
+                    )
 
             msg = response.choices[0].message
             tool_calls = msg.tool_calls
@@ -76,144 +167,357 @@ class AIVoiceAssistant:
                 }
 
             # ✅ TOOL CALL HANDLING
-            function_results = []
-            tool_messages = []
-
-            for tc in tool_calls:
-                function_name = tc.function.name
-                # Handle empty/None arguments properly
-                try:
-                    function_args = json.loads(
-                        tc.function.arguments) if tc.function.arguments and tc.function.arguments.strip() else {}
-                except (json.JSONDecodeError, AttributeError):
-                    function_args = {}
-
-                # Ensure function_args is always a dict
-                if function_args is None:
-                    function_args = {}
-
-                # ✅ IMPROVED: Convert string booleans to actual booleans
-                if function_args:
-                    for key, value in list(function_args.items()):
-                        if isinstance(value, str):
-                            value_lower = value.lower()
-                            if value_lower in ["true", "false"]:
-                                function_args[key] = (value_lower == "true")
-                            # Also handle "1" and "0" as booleans
-                            elif value in ["1", "0"]:
-                                function_args[key] = (value == "1")
-
-                if function_name in function_map:
-                    result = function_map[function_name](**function_args)
-                    function_results.append({
-                        "tool_call_id": tc.id,
-                        "function_name": function_name,
-                        "result": result
-                    })
-
-                    tool_messages.append({
-                        "role": "tool",
-                        "tool_call_id": tc.id,
-                        "content": json.dumps(result)
-                    })
-
-            # ✅ Add assistant tool-call message (DICT, not object)
-            assistant_tool_call_message = {
-                "role": "assistant",
-                "tool_calls": [
-                    {
-                        "id": tc.id,
-                        "type": "function",
-                        "function": {
-                            "name": tc.function.name,
-                            "arguments": tc.function.arguments
-                        }
+            assistant_tool_call_message, tool_messages, function_results = await self._run_tool_calls([
+                {
+                    "id": tc.id,
+                    "type": "function",
+                    "function": {
+                        "name": tc.function.name,
+                        "arguments": tc.function.arguments
                     }
-                    for tc in tool_calls
-                ]
-            }
+                }
+                for tc in tool_calls
+            ])
+
+            # ✅ Tool messages that already say it all skip the second LLM call
+            direct_reply = self._direct_reply(function_results)
+            if direct_reply:
+                return self._tool_turn_result(direct_reply, assistant_tool_call_message, tool_messages, function_results)
 
             messages.append(assistant_tool_call_message)
             messages.extend(tool_messages)
 
             # ✅ Final LLM response
-            final_response = client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=messages,
-                tools=tools,
-                tool_choice="auto",
-                temperature=0.7
-            )
+            async with turn_scheduler.llm.slot(), groq_slots:
+                with span("llm_2"):
+                    final_response = await self.llm.chat.completions.create(
+                        model=LLM_MODEL,
+                        messages=messages,
+                        tools=tools,
+                        tool_choice="auto",
+                        temperature=LLM_TEMPERATURE
+                    )
 
             final_text = final_response.choices[0].message.content
 
-            return {
-                "status": "success",
-                "message": final_text,
-                "function_called": function_results[0]["function_name"] if function_results else None,
-                "function_results": function_results,
-                "conversation_update": (
-                        [assistant_tool_call_message] +
-                        tool_messages +
-                        [{"role": "assistant", "content": final_text}]
-                )
-            }
+            return self._tool_turn_result(final_text, assistant_tool_call_message, tool_messages, function_results)
 
+        except StageBusy:
+            raise
         except Exception as e:
-            print(f"Error processing command: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Error processing command: %s", e)
             return {
                 "status": "error",
                 "message": str(e),
                 "function_called": None
             }
 
+    async def stream_command(self, user_message: str, conversation_history: List[Dict]):
+        """
+        Streaming variant of process_command.
 
+        Yields ("delta", text) as completion tokens arrive, then a single
+        ("done", response) where response has the same shape process_command returns.
+        """
+        routed = await self._route(user_message)
+        key = None if routed else self._cache_key(user_message, conversation_history)
+        ready = routed or (self.response_cache.get(key) if key else None)
+        if ready:
+            if not routed:
+                FAST_PATH.inc(path="response_cache")
+            yield "delta", ready["message"]
+            yield "done", ready
+            return
+
+        async for kind, value in self._stream_command(user_message, conversation_history):
+            if kind == "done" and key:
+                self.response_cache.put(key, value)
+            yield kind, value
+
+    async def _stream_command(self, user_message: str, conversation_history: List[Dict]):
+        try:
+            messages = conversation_history + [
+                {"role": "user", "content": user_message}
+            ]
+
+            text_parts = []
+            tool_calls = {}
+            async for delta in self._stream_completion(messages, tool_calls):
+                text_parts.append(delta)
+                yield "delta", delta
 
+            # ✅ NO TOOL CALL
+            if not tool_calls:
+                content = "".join(text_parts)
+                yield "done", {
+                    "status": "success",
+                    "message": content,
+                    "function_called": None,
+                    "conversation_update": {"role": "assistant", "content": content}
+                }
+                return
 
-    def process_audio(self, base64_audio: str) -> str:
+            # ✅ TOOL CALL HANDLING
+            assistant_tool_call_message, tool_messages, function_results = await self._run_tool_calls(
+                [tool_calls[i] for i in sorted(tool_calls)]
+            )
+
+            direct_reply = self._direct_reply(function_results)
+            if direct_reply:
+                yield "delta", direct_reply
+                yield "done", self._tool_turn_result(
+                    direct_reply, assistant_tool_call_message, tool_messages, function_results
+                )
+                return
+
+            messages.append(assistant_tool_call_message)
+            messages.extend(tool_messages)
+
+            # ✅ Final LLM response, streamed
+            text_parts = []
+            async for delta in self._stream_completion(messages, {}, stage="llm_2"):
+                text_parts.append(delta)
+                yield "delta", delta
+
+            yield "done", self._tool_turn_result(
+                "".join(text_parts), assistant_tool_call_message, tool_messages, function_results
+            )
+
+        except StageBusy:
+            raise
+        except Exception as e:
+            log.exception("Error streaming command: %s", e)
+            yield "done", {
+                "status": "error",
+                "message": str(e),
+                "function_called": None
+            }
+
+    async def _stream_completion(self, messages: List[Dict], tool_calls: Dict[int, Dict], stage: str = "llm_1"):
+        """Yield content deltas of a streamed completion, merging tool call fragments into tool_calls"""
+        async with turn_scheduler.llm.slot(), groq_slots:
+            with span(stage):
+                stream = await self.llm.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    tools=tools,
+                    tool_choice="auto",
+                    temperature=LLM_TEMPERATURE,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    if delta.content:
+                        yield delta.content
+                    for tc in delta.tool_calls or []:
+                        call = tool_calls.setdefault(tc.index, {
+                            "id": None,
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""}
+                        })
+                        if tc.id:
+                            call["id"] = tc.id
+                        if tc.function:
+                            call["function"]["name"] += tc.function.name or ""
+                            call["function"]["arguments"] += tc.function.arguments or ""
+
+    async def _route(self, user_message: str) -> Optional[Dict]:
         """
-        ✅ Use Groq Whisper instead of Google Speech Recognition
+        Answer with a tool's own message when the intent router is confident;
+        recorded in the history as an ordinary tool call turn
         """
-        tmp_filename = None
-
+        function_name = self.router.route(user_message) if self.router else None
+        if function_name is None:
+            return None
+
+        assistant_tool_call_message, tool_messages, function_results = await self._run_tool_calls([{
+            "id": f"call_{uuid.uuid4().hex[:24]}",
+            "type": "function",
+            "function": {"name": function_name, "arguments": "{}"}
+        }])
+        result = function_results[0]["result"]
+        if not result.get("success"):
+            return None     # let the LLM deal with it
+
+        FAST_PATH.inc(path="intent_router")
+        log.info("Routed to %s without the LLM (%.0f%% hit rate)", function_name, self.router.stats()["hit_rate"] * 100)
+        response = self._tool_turn_result(result["message"], assistant_tool_call_message, tool_messages, function_results)
+        response["routed"] = True
+        return response
+
+    @staticmethod
+    def _direct_reply(function_results: List[Dict]) -> Optional[str]:
+        """The tools' own messages, if every call succeeded with a direct_reply tool"""
+        if not function_results:
+            return None
+        for fr in function_results:
+            if not tool_policies.get(fr["function_name"], {}).get("direct_reply"):
+                return None
+            if not fr["result"].get("success") or not fr["result"].get("message"):
+                return None
+        return " ".join(fr["result"]["message"] for fr in function_results)
+
+    async def _run_tool_calls(self, tool_calls: List[Dict]):
+        """
+        Execute the model's tool calls concurrently; returns (assistant tool-call
+        message, tool messages, results), both lists in tool_calls order
+        """
+        results = await asyncio.gather(*(
+            self._call_tool(tc["function"]["name"], self._parse_arguments(tc["function"]["arguments"]))
+            for tc in tool_calls
+        ))
+
+        function_results = []
+        tool_messages = []
+        for tc, result in zip(tool_calls, results):
+            function_results.append({
+                "tool_call_id": tc["id"],
+                "function_name": tc["function"]["name"],
+                "result": result
+            })
+
+            tool_messages.append({
+                "role": "tool",
+                "tool_call_id": tc["id"],
+                "content": tool_content(result)
+            })
+
+        # ✅ Add assistant tool-call message (DICT, not object)
+        assistant_tool_call_message = {
+            "role": "assistant",
+            "tool_calls": tool_calls
+        }
+        return assistant_tool_call_message, tool_messages, function_results
+
+    @staticmethod
+    def _parse_arguments(arguments) -> Dict:
+        # Handle empty/None arguments properly
         try:
-            print("[DEBUG] Starting audio processing...")
+            function_args = json.loads(arguments) if arguments and arguments.strip() else {}
+        except (json.JSONDecodeError, AttributeError):
+            function_args = {}
+
+        # Ensure function_args is always a dict
+        if not isinstance(function_args, dict):
+            function_args = {}
+
+        # ✅ IMPROVED: Convert string booleans to actual booleans
+        for key, value in list(function_args.items()):
+            if isinstance(value, str):
+                value_lower = value.lower()
+                if value_lower in ["true", "false"]:
+                    function_args[key] = (value_lower == "true")
+                # Also handle "1" and "0" as booleans
+                elif value in ["1", "0"]:
+                    function_args[key] = (value == "1")
+        return function_args
+
+    async def _call_tool(self, function_name: str, function_args: Dict) -> Dict:
+        """Run one tool with its timeout: coroutine tools on the loop, plain ones in tool_pool"""
+        function = function_map.get(function_name)
+        if function is None:
+            return {"success": False, "message": f"Unknown function: {function_name}"}
+
+        timeout = tool_timeouts.get(function_name, TOOL_TIMEOUT)
+        async with turn_scheduler.tools.slot():
+            started = time.perf_counter()
+            outcome = "ok"
+            try:
+                with span("tool"):
+                    if asyncio.iscoroutinefunction(function):
+                        call = function(**function_args)
+                    else:
+                        # copy_context() so the tool still sees the current session
+                        call = asyncio.get_running_loop().run_in_executor(
+                            tool_pool, functools.partial(contextvars.copy_context().run, function, **function_args)
+                        )
+                    return await asyncio.wait_for(call, timeout)
+            except asyncio.TimeoutError:
+                outcome = "timeout"
+                log.error("Tool %s timed out after %ss", function_name, timeout)
+                return {"success": False, "message": f"{function_name} timed out"}
+            except Exception as e:
+                outcome = "error"
+                log.error("Tool %s failed: %s", function_name, e)
+                return {"success": False, "message": f"{function_name} failed: {e}"}
+            finally:
+                TOOL_SECONDS.observe(time.perf_counter() - started, tool=function_name, outcome=outcome)
+
+    def _tool_turn_result(self, final_text: str, assistant_tool_call_message: Dict,
+                          tool_messages: List[Dict], function_results: List[Dict]) -> Dict:
+        return {
+            "status": "success",
+            "message": final_text,
+            "function_called": function_results[0]["function_name"] if function_results else None,
+            "function_results": function_results,
+            "conversation_update": (
+                    [assistant_tool_call_message] +
+                    tool_messages +
+                    [{"role": "assistant", "content": final_text}]
+            )
+        }
 
-            # Decode base64 audio from frontend
-            audio_bytes = base64.b64decode(base64_audio)
-            print(f"[DEBUG] Decoded {len(audio_bytes)} bytes of audio")
 
-            # Save directly as webm (browser format)
-            tmp_filename = tempfile.mktemp(suffix=".webm")
-            with open(tmp_filename, "wb") as f:
-                f.write(audio_bytes)
 
-            print(f"[DEBUG] Saved to temp file: {tmp_filename}")
 
-            # Use Groq Whisper API for transcription
-            with open(tmp_filename, "rb") as audio_file:
-                transcription = client.audio.transcriptions.create(
-                    model="whisper-large-v3",
-                    file=audio_file,
-                    response_format="text"
+    async def summarize(self, previous_summary: Optional[str], messages: List[Dict]) -> str:
+        """Fold messages trimmed from a conversation into its running summary"""
+        prompt = (
+            "Summarize this conversation between a user and a voice assistant in a few short sentences. "
+            "Keep names, times, reminders and anything the user may refer back to.\n\n"
+        )
+        if previous_summary:
+            prompt += f"Summary so far: {previous_summary}\n\n"
+        prompt += transcript(messages)
+
+        async with turn_scheduler.llm.slot(), groq_slots:
+            with span("summary"):
+                response = await self.llm.chat.completions.create(
+                    model=CONVERSATION_SUMMARY_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=CONVERSATION_SUMMARY_TOKENS,
+                    temperature=0.3
                 )
+        return response.choices[0].message.content or ""
+
+    async def _prepare_audio(self, audio, fmt: str, sample_rate: int) -> Optional[io.BytesIO]:
+        if STT_PREPROCESS:
+            from .audio_preprocess import preprocess
+            try:
+                return await asyncio.to_thread(preprocess, audio, fmt, sample_rate)
+            except Exception as e:
+                log.warning("Audio preprocessing failed (%s: %s), uploading the clip unchanged", type(e).__name__, e)
+        return audio_upload(audio, fmt, sample_rate)
+
+    async def process_audio(self, audio: Union[str, bytes, memoryview], fmt: str = "webm",
+                            sample_rate: int = 16000) -> str:
+        """
+        ✅ Transcribe with the configured STT backend (Groq Whisper or a local model)
 
-            print(f"[DEBUG] Recognition successful: {transcription}")
+        The clip goes to the backend straight from memory. fmt is the container the
+        client recorded ("webm", "wav", ...) or "pcm16" for raw 16-bit mono PCM
+        at sample_rate, which only needs a WAV header in front. With STT_PREPROCESS
+        it is first reduced to 16 kHz mono speech (see audio_preprocess), in a
+        thread; a clip that can't be decoded that way is uploaded as it came.
+        """
+        try:
+            with span("decode"):
+                audio_file = await self._prepare_audio(audio, fmt, sample_rate)
+            if audio_file is None:
+                return "[WARN] No speech in the recording"
+            log.debug("Prepared %d bytes of audio as %s", audio_file.getbuffer().nbytes, audio_file.name)
+
+            async with turn_scheduler.stt.slot():
+                with span("stt"):
+                    transcription = await self.stt.transcribe(audio_file)
+
+            log.debug("Recognition successful: %s", transcription)
             return transcription
 
+        except StageBusy:
+            raise
         except Exception as e:
-            print(f"[ERROR] Audio processing failed: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("Audio processing failed: %s: %s", type(e).__name__, e)
             return f"[ERROR] {type(e).__name__}: {str(e)}"
-        finally:
-            # Clean up temp file
-            if tmp_filename and os.path.exists(tmp_filename):
-                try:
-                    os.remove(tmp_filename)
-                    print(f"[DEBUG] Cleaned up temp file: {tmp_filename}")
-                except:
-                    pass
-
@@ -0,0 +1,168 @@
+import base64
+import io
+import logging
+import wave
+from typing import Optional, Tuple, Union
+from .config import (
+    MIN_SAMPLE_RATE, MAX_SAMPLE_RATE, STT_UPLOAD_FORMAT, STT_SILENCE_DB, STT_TRIM_PAD_MS, STT_TARGET_DB, STT_MAX_GAIN_DB,
+)
+from .metrics import registry
+from .vad import wav_header
+
+log = logging.getLogger(__name__)
+
+STT_AUDIO_BYTES = registry.counter("voice_stt_audio_bytes_total", "Audio received from clients / uploaded to STT",
+                                   ["stage"])
+
+SAMPLE_RATE = 16000     # what Whisper works at; anything more is resampled away by the model anyway
+LOSSLESS = ("pcm16", "wav")
+FRAME_MS = 20
+CONTRAST_DB = 10.0      # speech must be this much louder than the clip's noise floor
+
+
+def decode(data: bytes, fmt: str, sample_rate: int = SAMPLE_RATE) -> Tuple["np.ndarray", int]:
+    """
+    A clip as float32 samples in [-1, 1], shape (samples, channels), and
+    its sample rate. Raw PCM and 16-bit WAV are read directly; any other
+    container (webm/ogg Opus, MP3, ...) is decoded with PyAV.
+    """
+    import numpy as np
+
+    if fmt == "pcm16":
+        pcm = np.frombuffer(data, dtype="<i2", count=len(data) // 2)
+        return _scaled(pcm).reshape(-1, 1), sample_rate
+    if fmt == "wav":
+        try:
+            with wave.open(io.BytesIO(data)) as w:
+                if w.getsampwidth() == 2:
+                    pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+                    return _scaled(pcm).reshape(-1, w.getnchannels()), w.getframerate()
+        except wave.Error:
+            pass    # e.g. float WAV: PyAV reads it
+
+    import av
+
+    chunks, rate, channels = [], None, 1
+    with av.open(io.BytesIO(data)) as container:
+        stream = container.streams.audio[0]
+        rate, channels = stream.rate, stream.channels
+        # Interleaved float32 at the clip's own rate and layout; numpy does the rest
+        resampler = av.AudioResampler(format="flt")
+        for frame in container.decode(stream):
+            for converted in resampler.resample(frame):
+                chunks.append(converted.to_ndarray().reshape(-1))
+    samples = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32)
+    return samples[:len(samples) // channels * channels].reshape(-1, channels), rate
+
+
+def _scaled(pcm: "np.ndarray") -> "np.ndarray":
+    # One float copy of the clip, scaled in place
+    samples = pcm.astype("float32")
+    samples *= 1 / 32768
+    return samples
+
+
+def to_mono_16k(samples: "np.ndarray", rate: int) -> "np.ndarray":
+    """Average the channels and resample to SAMPLE_RATE; ValueError for rates outside MIN/MAX_SAMPLE_RATE"""
+    import numpy as np
+
+    # A bogus rate would divide by zero or interpolate a clip into gigabytes
+    if not MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE:
+        raise ValueError(f"Unsupported sample rate {rate} Hz")
+
+    mono = samples.mean(axis=1, dtype=np.float32) if samples.shape[1] > 1 else samples[:, 0]
+    if rate == SAMPLE_RATE or not len(mono):
+        return mono
+    if rate % SAMPLE_RATE == 0:
+        # 48/32 kHz: average each group of samples (a box filter against aliasing) and keep one
+        factor = rate // SAMPLE_RATE
+        return mono[:len(mono) // factor * factor].reshape(-1, factor).mean(axis=1)
+    if rate > SAMPLE_RATE:
+        # 44.1/22.05 kHz: box filter as wide as the step, then interpolate
+        width = int(np.ceil(rate / SAMPLE_RATE))
+        cumulative = np.concatenate(([0.0], np.cumsum(mono, dtype=np.float64)))
+        mono = ((cumulative[width:] - cumulative[:-width]) / width).astype(np.float32)
+    count = int(len(mono) * SAMPLE_RATE / rate)
+    return np.interp(np.arange(count) * (rate / SAMPLE_RATE), np.arange(len(mono)), mono).astype(np.float32)
+
+
+def frame_levels(mono: "np.ndarray") -> "np.ndarray":
+    """RMS level of each FRAME_MS frame in dBFS"""
+    import numpy as np
+
+    size = SAMPLE_RATE * FRAME_MS // 1000
+    frames = mono[:len(mono) // size * size].reshape(-1, size)
+    rms = np.sqrt(np.mean(frames * frames, axis=1, dtype=np.float64))
+    return 20 * np.log10(rms + 1e-10)
+
+
+def trim(mono: "np.ndarray", silence_db: float = STT_SILENCE_DB, pad_ms: int = STT_TRIM_PAD_MS):
+    """
+    Cut leading and trailing silence. A frame is speech if it is louder than
+    silence_db and CONTRAST_DB above the clip's noise floor (its 10th
+    percentile frame); a clip without that much contrast is left alone.
+    None if nothing in the clip is louder than silence_db.
+    """
+    import numpy as np
+
+    levels = frame_levels(mono)
+    if not len(levels) or levels.max() < silence_db:
+        return None
+    floor = np.percentile(levels, 10)
+    if levels.max() - floor < CONTRAST_DB:
+        return mono
+    voiced = np.flatnonzero(levels >= max(silence_db, floor + CONTRAST_DB))
+    size = SAMPLE_RATE * FRAME_MS // 1000
+    pad = SAMPLE_RATE * pad_ms // 1000
+    return mono[max(0, voiced[0] * size - pad):(voiced[-1] + 1) * size + pad]
+
+
+def normalize(mono: "np.ndarray", target_db: float = STT_TARGET_DB, max_gain_db: float = STT_MAX_GAIN_DB):
+    """Scale towards target_db RMS, at most max_gain_db up and never past 0.99 peak"""
+    import numpy as np
+
+    rms = float(np.sqrt(np.mean(mono * mono, dtype=np.float64)))
+    peak = float(np.abs(mono).max()) if len(mono) else 0.0
+    if rms == 0.0 or peak == 0.0:
+        return mono
+    gain = min(10 ** (target_db / 20) / rms, 10 ** (max_gain_db / 20), 0.99 / peak)
+    return mono * np.float32(gain)
+
+
+def preprocess(audio: Union[str, bytes, memoryview], fmt: str = "webm", sample_rate: int = SAMPLE_RATE,
+               upload_format: str = STT_UPLOAD_FORMAT) -> Optional[io.BytesIO]:
+    """
+    Turn a client clip into what STT needs and nothing more: 16 kHz mono,
+    silence trimmed, level normalized, as a named in-memory file. None if
+    the clip has no speech at all. CPU bound: run it in a thread.
+
+    upload_format "auto" keeps lossless input lossless (FLAC) and sends
+    already-compressed recordings back as Opus, which FLAC would inflate.
+    """
+    data = base64.b64decode(audio) if isinstance(audio, str) else audio     # frames are read in place, not copied
+    STT_AUDIO_BYTES.inc(len(data), stage="received")
+
+    samples, rate = decode(data, fmt, sample_rate)
+    mono = trim(to_mono_16k(samples, rate))
+    if mono is None:
+        return None
+    pcm = (normalize(mono) * 32767).astype("<i2").tobytes()
+    wav = wav_header(len(pcm), SAMPLE_RATE) + pcm
+
+    if upload_format == "auto":
+        upload_format = "flac" if fmt in LOSSLESS else "opus"
+    encoded, name = wav, "audio.wav"
+    if upload_format in ("flac", "opus"):
+        from .codec import encode
+        try:
+            encoded = encode(wav, upload_format)
+            name = "audio.ogg" if upload_format == "opus" else "audio.flac"
+        except ImportError:
+            pass    # no PyAV: WAV it is
+    log.debug("Preprocessed %.2f s of %s (%d bytes) into %.2f s of %s (%d bytes)",
+              len(samples) / rate, fmt, len(data), len(mono) / SAMPLE_RATE, name, len(encoded))
+
+    STT_AUDIO_BYTES.inc(len(encoded), stage="uploaded")
+    upload = io.BytesIO(encoded)
+    upload.name = name
+    return upload
@@ -0,0 +1,73 @@
+import asyncio
+import importlib
+import logging
+import time
+from typing import Callable, Dict, List, Union
+from .config import BACKEND_PLUGINS
+
+log = logging.getLogger(__name__)
+
+
+# kind -> name -> zero-argument factory, or "module:attribute" of one so that
+# a backend's imports (SDKs, models) only happen when it is actually chosen.
+#   stt: returns an STTBackend
+#   llm: returns a client with an OpenAI-style chat.completions.create()
+#   tts: returns a picklable text -> WAV bytes function run by TTSService workers
+_registry: Dict[str, Dict[str, Union[str, Callable]]] = {
+    "stt": {
+        "groq": ".stt:GroqSTT",
+        "local": ".stt:LocalWhisperSTT",
+    },
+    "llm": {
+        "groq": ".groq_client:get_client",
+    },
+    "tts": {
+        "pyttsx3": ".tts:pyttsx3_backend",
+    },
+}
+
+
+def register(kind: str, name: str, factory: Union[str, Callable]):
+    """Add (or replace) a backend; plugins call this when they are imported"""
+    if kind not in _registry:
+        raise ValueError(f"Unknown backend kind '{kind}' (choose from {', '.join(_registry)})")
+    _registry[kind][name] = factory
+
+
+def names(kind: str) -> List[str]:
+    return list(_registry[kind])
+
+
+def create(kind: str, name: str):
+    """Build the named backend, importing its module on first use"""
+    factory = _registry.get(kind, {}).get(name)
+    if factory is None:
+        raise ValueError(f"Unknown {kind} backend '{name}' (choose from {', '.join(_registry.get(kind, ()))})")
+    if isinstance(factory, str):
+        module, attribute = factory.split(":")
+        factory = getattr(importlib.import_module(module, __package__), attribute)
+    return factory()
+
+
+def load_plugins(modules: List[str] = BACKEND_PLUGINS):
+    for module in modules:
+        importlib.import_module(module)
+        log.info("Loaded backend plugin %s", module)
+
+
+async def create_all(wanted: Dict[str, str]) -> Dict[str, object]:
+    """
+    Create several backends at once ({kind: name}), each in its own thread so
+    slow imports and model loads overlap; logs how long each one took
+    """
+    async def timed(kind, name):
+        started = time.perf_counter()
+        backend = await asyncio.to_thread(create, kind, name)
+        return backend, time.perf_counter() - started
+
+    results = await asyncio.gather(*(timed(kind, name) for kind, name in wanted.items()))
+    created = {}
+    for (kind, name), (backend, elapsed) in zip(wanted.items(), results):
+        created[kind] = backend
+        log.info("Created %s backend %s in %.0f ms", kind, name, elapsed * 1000)
+    return created
@@ -0,0 +1,160 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Optional
+from .config import AUDIO_CODECS, OPUS_BITRATE, MP3_BITRATE, CODEC_WORKERS
+from .metrics import registry, span
+
+log = logging.getLogger(__name__)
+
+AUDIO_BYTES = registry.counter("voice_audio_bytes_total", "Speech audio sent to clients, by codec", ["codec"])
+
+
+# name -> (MIME type the client plays it as, container, encoder, sample rate, bit rate)
+# Opus in Ogg plays in Chrome, Firefox and Safari 17+; MP3 everywhere else.
+# FLAC (lossless, the clip's own rate) is what preprocessed audio is uploaded to STT as.
+CODECS = {
+    "wav": ("audio/wav", None, None, None, None),
+    "opus": ("audio/ogg; codecs=opus", "ogg", "libopus", 48000, OPUS_BITRATE),
+    "webm": ("audio/webm; codecs=opus", "webm", "libopus", 48000, OPUS_BITRATE),
+    "mp3": ("audio/mpeg", "mp3", "libmp3lame", 24000, MP3_BITRATE),
+    "flac": ("audio/flac", "flac", "flac", None, None),
+}
+
+
+def mime_type(codec: str) -> str:
+    return CODECS[codec][0]
+
+
+def cache_format(codec: str) -> str:
+    """What TTSCache keys on: the codec and its bit rate, so changing either misses"""
+    bitrate = CODECS[codec][4]
+    return f"{codec}@{bitrate}" if bitrate else codec
+
+
+def detect_codec(audio: bytes) -> str:
+    """Codec of an encoded clip, from its first bytes"""
+    if audio[:4] == b"OggS":
+        return "opus"
+    if audio[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if audio[:4] == b"fLaC":
+        return "flac"
+    if audio[:3] == b"ID3" or audio[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "mp3"
+    return "wav"
+
+
+def available_codecs() -> list:
+    """AUDIO_CODECS this install can encode (compressed ones need PyAV)"""
+    try:
+        import av
+    except ImportError:
+        av = None
+    usable = []
+    for codec in AUDIO_CODECS:
+        if codec not in CODECS:
+            log.warning("Unknown audio codec '%s' in AUDIO_CODECS (choose from %s)", codec, ", ".join(CODECS))
+            continue
+        encoder = CODECS[codec][2]
+        if encoder is None:
+            usable.append(codec)
+        elif av is None:
+            log.warning("Audio codec '%s' needs PyAV (pip install av); skipping it", codec)
+        else:
+            try:
+                av.codec.Codec(encoder, "w")
+                usable.append(codec)
+            except Exception:
+                log.warning("This PyAV build has no %s encoder; skipping '%s'", encoder, codec)
+    return usable or ["wav"]
+
+
+def negotiate_codec(accepted: Optional[Iterable[str]], offered: Iterable[str]) -> str:
+    """First of the server's offered codecs that the client accepts; WAV for old clients"""
+    if not accepted:
+        return "wav"
+    accepted = {str(codec).lower() for codec in accepted}
+    for codec in offered:
+        if codec in accepted:
+            return codec
+    return "wav"
+
+
+def encode(wav: bytes, codec: str, bitrate: Optional[int] = None) -> bytes:
+    """Transcode a WAV clip to codec (at its configured bit rate by default); runs in a Transcoder worker"""
+    import av
+
+    _, container, encoder, sample_rate, default_bitrate = CODECS[codec]
+    bitrate = bitrate or default_bitrate
+    out = io.BytesIO()
+    with av.open(io.BytesIO(wav), "r") as source, av.open(out, "w", format=container) as target:
+        sample_rate = sample_rate or source.streams.audio[0].rate
+        stream = target.add_stream(encoder, rate=sample_rate)
+        if bitrate:
+            stream.bit_rate = bitrate
+        stream.layout = "mono"
+        resampler = av.AudioResampler(format=stream.codec_context.codec.audio_formats[0].name,
+                                      layout="mono", rate=sample_rate)
+        for frame in source.decode(audio=0):
+            for resampled in resampler.resample(frame):
+                target.mux(stream.encode(resampled))
+        for resampled in resampler.resample(None):
+            target.mux(stream.encode(resampled))
+        target.mux(stream.encode(None))
+    return out.getvalue()
+
+
+class Transcoder:
+    """
+    Encodes synthesized WAV for clients in a pool of worker processes, so
+    compression never runs on the event loop. A clip that fails to encode
+    is returned as WAV, which every client can play, rather than dropped.
+    """
+
+    def __init__(self, workers: int = CODEC_WORKERS, use_processes: bool = True):
+        self.workers = workers
+        self.use_processes = use_processes
+        self.offered = None
+        self._pool = None
+
+    def start(self):
+        if self._pool is not None:
+            return
+        self.offered = available_codecs()
+        self._pool = self._new_pool()
+        log.info("Audio codecs offered to clients: %s", ", ".join(self.offered))
+
+    def _new_pool(self):
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="codec")
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    def negotiate(self, accepted) -> str:
+        self.start()
+        return negotiate_codec(accepted, self.offered)
+
+    async def encode(self, wav: bytes, codec: str) -> bytes:
+        """wav encoded as codec, or wav itself if that is what was asked for (or encoding failed)"""
+        if codec == "wav" or not wav:
+            return wav
+        self.start()
+        with span("encode"):
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._pool, encode, wav, codec)
+            except BrokenProcessPool:
+                log.error("Codec worker died, restarting pool")
+                self._pool = self._new_pool()
+            except Exception as e:
+                log.error("Encoding %s failed: %s", codec, e)
+        return wav
+
+
+transcoder = Transcoder()
@@ -0,0 +1,132 @@
+import os
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+def _int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+# Groq API
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+GROQ_MAX_CONCURRENCY = _int("GROQ_MAX_CONCURRENCY", 16)      # in-flight requests across all clients
+GROQ_MAX_CONNECTIONS = _int("GROQ_MAX_CONNECTIONS", 32)      # pooled HTTP connections
+GROQ_KEEPALIVE_CONNECTIONS = _int("GROQ_KEEPALIVE_CONNECTIONS", 16)
+GROQ_KEEPALIVE_EXPIRY = _float("GROQ_KEEPALIVE_EXPIRY", 30.0)
+GROQ_CONNECT_TIMEOUT = _float("GROQ_CONNECT_TIMEOUT", 5.0)
+GROQ_LLM_TIMEOUT = _float("GROQ_LLM_TIMEOUT", 30.0)
+GROQ_STT_TIMEOUT = _float("GROQ_STT_TIMEOUT", 60.0)
+GROQ_MAX_RETRIES = _int("GROQ_MAX_RETRIES", 2)
+
+# Backends, chosen by name from modules/backends.py; plugins are modules that register more
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+TTS_BACKEND = os.getenv("TTS_BACKEND", "pyttsx3")
+BACKEND_PLUGINS = [m.strip() for m in os.getenv("BACKEND_PLUGINS", "").split(",") if m.strip()]
+
+# Language model
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+LLM_TEMPERATURE = _float("LLM_TEMPERATURE", 0.7)
+
+# Response cache (opt-in): repeated requests in the same context reuse the last reply
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_ENTRIES = _int("RESPONSE_CACHE_ENTRIES", 512)
+RESPONSE_CACHE_TTL = _float("RESPONSE_CACHE_TTL", 300.0)          # seconds
+RESPONSE_CACHE_CONTEXT = _int("RESPONSE_CACHE_CONTEXT", 2)        # trailing history messages in the key
+
+# Fast-path intent router
+INTENT_ROUTER = os.getenv("INTENT_ROUTER", "1") == "1"     # answer simple requests without the LLM
+INTENT_THRESHOLD = _float("INTENT_THRESHOLD", 0.8)         # share of the request a pattern must cover
+
+# Tool calls
+TOOL_WORKERS = _int("TOOL_WORKERS", 8)            # threads for blocking (sync) tool functions
+TOOL_TIMEOUT = _float("TOOL_TIMEOUT", 10.0)       # seconds, unless tools.tool_timeouts says otherwise
+TOOL_RESULT_MAX_CHARS = _int("TOOL_RESULT_MAX_CHARS", 4000)   # tool output kept in the history (lists are shortened)
+
+# Speech-to-text
+STT_BACKEND = os.getenv("STT_BACKEND", "groq")                      # "groq" or "local"
+STT_LANGUAGE = os.getenv("STT_LANGUAGE", "en")
+STT_LOCAL_MODEL = os.getenv("STT_LOCAL_MODEL", "base.en")           # faster-whisper model size or path
+STT_LOCAL_COMPUTE_TYPE = os.getenv("STT_LOCAL_COMPUTE_TYPE", "int8")
+STT_LOCAL_WORKERS = _int("STT_LOCAL_WORKERS", 2)                    # parallel decodes sharing one model
+STT_LOCAL_CPU_THREADS = _int("STT_LOCAL_CPU_THREADS", 0)            # per worker, 0 = CTranslate2 default
+STT_LOCAL_BEAM_SIZE = _int("STT_LOCAL_BEAM_SIZE", 1)
+STT_BATCH_SIZE = _int("STT_BATCH_SIZE", 8)                          # clips decoded together
+STT_BATCH_WINDOW_MS = _int("STT_BATCH_WINDOW_MS", 20)               # how long to wait for more clips
+STT_PREPROCESS = os.getenv("STT_PREPROCESS", "1") == "1"           # 16 kHz mono, trimmed, normalized before STT
+STT_UPLOAD_FORMAT = os.getenv("STT_UPLOAD_FORMAT", "auto")          # "auto", "flac", "opus" (need PyAV) or "wav"
+STT_SILENCE_DB = _float("STT_SILENCE_DB", -60.0)                    # frames quieter than this (dBFS) are never speech
+STT_TRIM_PAD_MS = _int("STT_TRIM_PAD_MS", 200)                      # kept around the speech when trimming
+STT_TARGET_DB = _float("STT_TARGET_DB", -20.0)                      # RMS level speech is normalized to (dBFS)
+STT_MAX_GAIN_DB = _float("STT_MAX_GAIN_DB", 20.0)                   # never amplify quiet clips more than this
+
+# Responses
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "1") == "1"   # honour clients asking for streamed replies
+
+# Text-to-speech
+TTS_WORKERS = _int("TTS_WORKERS", 2)          # worker processes, each with its own engine
+TTS_QUEUE_SIZE = _int("TTS_QUEUE_SIZE", 32)   # pending requests before callers wait
+TTS_RATE = _int("TTS_RATE", 0)                # words per minute, 0 = engine default
+TTS_VOICE = os.getenv("TTS_VOICE") or None    # pyttsx3 voice id, unset = engine default
+TTS_CACHE_ENTRIES = _int("TTS_CACHE_ENTRIES", 256)
+TTS_CACHE_MEMORY_BYTES = _int("TTS_CACHE_MEMORY_BYTES", 64 * 1024 * 1024)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR") or None                       # unset = no disk tier
+TTS_CACHE_DISK_BYTES = _int("TTS_CACHE_DISK_BYTES", 256 * 1024 * 1024)
+TTS_PREWARM = os.getenv("TTS_PREWARM", "1") == "1"
+TTS_PREWARM_PHRASES = [p for p in os.getenv("TTS_PREWARM_PHRASES", "").split("|") if p.strip()]
+
+# Audio sent to clients: the first of these the client can play is used
+AUDIO_CODECS = [c.strip() for c in os.getenv("AUDIO_CODECS", "opus,mp3,wav").split(",") if c.strip()]
+OPUS_BITRATE = _int("OPUS_BITRATE", 24000)    # bits per second
+MP3_BITRATE = _int("MP3_BITRATE", 48000)
+CODEC_WORKERS = _int("CODEC_WORKERS", 2)      # encoder processes
+
+# Conversation history
+CONVERSATION_MAX_TOKENS = _int("CONVERSATION_MAX_TOKENS", 3000)       # history budget per prompt (approx.)
+CONVERSATION_SUMMARY = os.getenv("CONVERSATION_SUMMARY", "0") == "1"  # fold trimmed turns into a summary
+CONVERSATION_SUMMARY_MODEL = os.getenv("CONVERSATION_SUMMARY_MODEL", "llama-3.1-8b-instant")
+CONVERSATION_SUMMARY_TOKENS = _int("CONVERSATION_SUMMARY_TOKENS", 200)
+
+# Sessions
+INBOX_SIZE = _int("INBOX_SIZE", 8)            # unprocessed messages per client before reads pause
+MAX_MESSAGE_BYTES = _int("MAX_MESSAGE_BYTES", 10 ** 7)        # largest WebSocket frame accepted
+SESSION_AUDIO_BYTES = _int("SESSION_AUDIO_BYTES", 16 * 1024 * 1024)  # audio queued or being transcribed per client
+OUTBOX_MAX_BYTES = _int("OUTBOX_MAX_BYTES", 1024 * 1024)     # queued audio per client before older replies are dropped
+OUTBOX_STALE_SECONDS = _float("OUTBOX_STALE_SECONDS", 10.0)  # audio not sent by then is dropped with the rest of its reply
+OUTBOX_MAX_TEXT_BYTES = _int("OUTBOX_MAX_TEXT_BYTES", 1024 * 1024)  # queued text/control per client before it is disconnected
+BARGE_IN = os.getenv("BARGE_IN", "1") == "1"   # a new audio/text message cancels the reply in progress
+
+# Server-wide stage limits, shared fairly (round-robin) by all sessions
+STT_CONCURRENCY = _int("STT_CONCURRENCY", 8)
+LLM_CONCURRENCY = _int("LLM_CONCURRENCY", 12)
+TOOL_CONCURRENCY = _int("TOOL_CONCURRENCY", TOOL_WORKERS)
+TTS_CONCURRENCY = _int("TTS_CONCURRENCY", TTS_WORKERS)
+STAGE_QUEUE_SIZE = _int("STAGE_QUEUE_SIZE", 64)   # waiting jobs per stage before new ones are rejected
+
+# Streamed microphone input
+MAX_UTTERANCE_SECONDS = _float("MAX_UTTERANCE_SECONDS", 30.0)   # endpoint forced after this long
+MIN_SPEECH_SECONDS = _float("MIN_SPEECH_SECONDS", 0.2)         # shorter bursts are treated as noise
+MIN_SAMPLE_RATE = _int("MIN_SAMPLE_RATE", 8000)               # sample rates accepted from clients, Hz
+MAX_SAMPLE_RATE = _int("MAX_SAMPLE_RATE", 48000)
+
+# Reminder / message / conversation store
+STORE_PATH = os.getenv("STORE_PATH", "assistant.db")      # SQLite file, WAL mode
+STORE_BATCH_SIZE = _int("STORE_BATCH_SIZE", 256)          # writes committed per transaction at most
+
+# Worker processes sharing the port (SO_REUSEPORT) and the store
+WORKERS = _int("WORKERS", 1)
+WORKER_INDEX = _int("WORKER_INDEX", 0)                      # set for each worker by the supervisor
+REMINDER_POLL_SECONDS = _float("REMINDER_POLL_SECONDS", 1.0)  # with WORKERS > 1: pick up other workers' reminders
+
+# Observability
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()         # DEBUG logs every message sent/received
+METRICS_HOST = os.getenv("METRICS_HOST", "localhost")
+METRICS_PORT = _int("METRICS_PORT", 9100)                  # Prometheus /metrics, -1 = disabled
+MEMORY_DEBUG = os.getenv("MEMORY_DEBUG", "0") == "1"       # tracemalloc and /debug/memory (slows allocation)
+MEMORY_DEBUG_FRAMES = _int("MEMORY_DEBUG_FRAMES", 1)      # stack frames kept per traced allocation
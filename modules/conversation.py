@@ -0,0 +1,144 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+from .config import CONVERSATION_MAX_TOKENS, CONVERSATION_SUMMARY
+
+log = logging.getLogger(__name__)
+
+
+def message_chars(message: Dict) -> int:
+    """Characters of text in one chat message: its content and any tool calls"""
+    chars = len(message.get("content") or "")
+    for tool_call in message.get("tool_calls") or ():
+        function = tool_call.get("function", {})
+        chars += len(function.get("name", "")) + len(function.get("arguments") or "")
+    return chars
+
+
+def estimate_tokens(message: Dict) -> int:
+    """Rough token count of one chat message (~4 characters per token plus framing)"""
+    return message_chars(message) // 4 + 4
+
+
+class Conversation:
+    """
+    One client's chat history, kept under a token budget.
+
+    Messages are stored in turns - a user message plus everything up to
+    the next one, so an assistant tool_calls message always stays with its
+    tool replies - each with its token estimate, computed once on append.
+    When the history exceeds max_tokens the oldest turns are evicted whole
+    (the latest turn is always kept). With summarize on, evicted turns are
+    folded into a short summary by fold(), which the caller runs off the
+    reply path; the summary is sent after the system prompt and counts
+    towards the budget.
+    """
+
+    def __init__(self, system_prompt: str, max_tokens: int = CONVERSATION_MAX_TOKENS,
+                 summarize: bool = CONVERSATION_SUMMARY):
+        self.system = {"role": "system", "content": system_prompt}
+        self.max_tokens = max_tokens
+        self.summarize = summarize
+
+        self._turns = []        # [[messages], tokens]
+        self.tokens = 0         # history only, summary included
+        self.summary = None
+        self._summary_tokens = 0
+        self._evicted = []      # messages waiting to be folded into the summary
+        self._folding = None
+
+    def messages(self) -> List[Dict]:
+        """The prompt prefix for the next completion"""
+        messages = [self.system]
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation: {self.summary}"})
+        for turn, _ in self._turns:
+            messages.extend(turn)
+        return messages
+
+    def __len__(self):
+        return sum(len(turn) for turn, _ in self._turns)
+
+    def size(self) -> int:
+        """Approximate bytes of text held: history, summary and turns waiting to be folded"""
+        chars = sum(message_chars(message) for turn, _ in self._turns for message in turn)
+        chars += sum(message_chars(message) for message in self._evicted)
+        return chars + len(self.summary or "")
+
+    def add_turn(self, text: str, response: Dict):
+        """Record a finished turn: the user's text and the assistant's conversation_update"""
+        turn = [{"role": "user", "content": text}]
+        update = response.get("conversation_update")
+        if isinstance(update, list):
+            turn.extend(update)
+        elif update:
+            turn.append(update)
+
+        tokens = sum(estimate_tokens(message) for message in turn)
+        self._turns.append([turn, tokens])
+        self.tokens += tokens
+        self._trim()
+
+    def _trim(self):
+        evicted = 0
+        while self.tokens > self.max_tokens and len(self._turns) > 1:
+            turn, tokens = self._turns.pop(0)
+            self.tokens -= tokens
+            evicted += 1
+            if self.summarize:
+                self._evicted.extend(turn)
+        if evicted:
+            log.debug("Conversation trimmed by %d turn(s) to ~%d tokens", evicted, self.tokens)
+
+    def state(self) -> Dict:
+        """JSON-able history, so another worker (or a restart) can restore() it"""
+        return {"turns": [turn for turn, _ in self._turns], "summary": self.summary, "evicted": self._evicted}
+
+    def restore(self, state: Dict):
+        self._turns = [[turn, sum(estimate_tokens(message) for message in turn)] for turn in state.get("turns", [])]
+        self.summary = state.get("summary")
+        self._summary_tokens = estimate_tokens({"content": self.summary}) if self.summary else 0
+        self.tokens = self._summary_tokens + sum(tokens for _, tokens in self._turns)
+        self._evicted = list(state.get("evicted", []))
+        self._trim()
+
+    @property
+    def needs_fold(self) -> bool:
+        return bool(self._evicted) and self._folding is None
+
+    async def fold(self, summarize_fn: Callable[[Optional[str], List[Dict]], Awaitable[str]]):
+        """Fold evicted turns into the summary with summarize_fn(previous summary, messages)"""
+        if not self.needs_fold:
+            return
+        evicted, self._evicted = self._evicted, []
+        self._folding = asyncio.current_task()
+        try:
+            summary = await summarize_fn(self.summary, evicted)
+        except Exception as e:
+            # The window is already bounded; those turns just go unsummarized
+            log.warning("Conversation summary failed: %s", e)
+            return
+        finally:
+            self._folding = None
+
+        self.tokens -= self._summary_tokens
+        self.summary = summary.strip() or None
+        self._summary_tokens = estimate_tokens({"content": self.summary}) if self.summary else 0
+        self.tokens += self._summary_tokens
+        self._trim()
+
+
+def transcript(messages: List[Dict]) -> str:
+    """Plain-text rendering of messages for the summarizer prompt"""
+    lines = []
+    for message in messages:
+        if message.get("tool_calls"):
+            calls = ", ".join(
+                f"{tc['function']['name']}({tc['function'].get('arguments') or ''})" for tc in message["tool_calls"]
+            )
+            lines.append(f"assistant called: {calls}")
+        elif message["role"] == "tool":
+            lines.append(f"tool result: {message.get('content', '')}")
+        elif message.get("content"):
+            lines.append(f"{message['role']}: {message['content']}")
+    return "\n".join(lines)
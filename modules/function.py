@@ -1,31 +1,25 @@
 from datetime import datetime, timedelta
 import webbrowser
 import urllib.parse
+from .scheduler import reminder_scheduler
+from .session import current_session
+from .store import store
 
 
-reminders = []
-messages = []
+def _owner():
+    session = current_session.get()
+    return session.client_id if session else None
+
 
 def set_reminder(reminder_text: str, duration_minutes: int = 5) -> dict:
     reminder_time = datetime.now() + timedelta(minutes=duration_minutes)
-    reminder = {
-        "id": len(reminders) + 1,
-        "text": reminder_text,
-        "time": reminder_time.strftime("%Y-%m-%d %H:%M"),
-        "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "active": True
-    }
-    reminders.append(reminder)
+    owner = _owner()
+    reminder = store.add_reminder(reminder_text, reminder_time, owner)
+    reminder_scheduler.schedule(reminder, reminder_time, owner)
     return {"success": True, "message": f"Reminder set for {reminder_time.strftime('%I:%M %p')}", "data": reminder}
 
 def send_message(content: str, recipient: str = "default") -> dict:
-    message = {
-        "id": len(messages) + 1,
-        "recipient": recipient,
-        "content": content,
-        "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
-    messages.append(message)
+    message = store.add_message(recipient, content, _owner())
     return {"success": True, "message": f"Message sent to {recipient}", "data": message}
 
 def play_youtube(query: str) -> dict:
@@ -34,18 +28,36 @@ def play_youtube(query: str) -> dict:
     return {"success": True, "message": f"Opening YouTube to play: {query}", "data": {"platform": "YouTube", "query": query, "url": url}}
 
 def get_reminders() -> dict:
-    active_reminders = [r for r in reminders if r.get("active", True)]
+    active_reminders = store.active_reminders(_owner())
     return {"success": True, "message": f"You have {len(active_reminders)} active reminder(s)", "data": active_reminders}
 
 def get_messages() -> dict:
+    messages = store.messages(_owner())
     return {"success": True, "message": f"You have {len(messages)} message(s)", "data": messages}
 
 def delete_reminder(reminder_id: int) -> dict:
-    for reminder in reminders:
-        if reminder["id"] == reminder_id:
-            reminder["active"] = False
-            return {"success": True, "message": f"Reminder {reminder_id} deleted", "data": reminder}
-    return {"success": False, "message": f"Reminder {reminder_id} not found"}
+    reminder = store.get_reminder(reminder_id, _owner())
+    if reminder is None:
+        return {"success": False, "message": f"Reminder {reminder_id} not found"}
+    reminder["active"] = False
+    store.deactivate_reminder(reminder_id)
+    reminder_scheduler.cancel(reminder_id)
+    return {"success": True, "message": f"Reminder {reminder_id} deleted", "data": reminder}
+
+def load_reminders() -> int:
+    """Hand every stored active reminder to the scheduler (at startup)"""
+    pending = store.pending_reminders()
+    for reminder, due, owner in pending:
+        reminder_scheduler.schedule(reminder, due, owner)
+    return len(pending)
+
+def claim_reminder(reminder: dict) -> bool:
+    """Mark a due reminder delivered; False if it was deleted or another worker delivered it"""
+    return store.claim_reminder(reminder["id"])
+
+def due_reminders(owner: str = None, since: datetime = None) -> list:
+    """Active reminders that are already due (optionally only those due after since)"""
+    return store.undelivered_reminders(datetime.now(), owner, since)
 
 def get_current_time() -> dict:
     current_time = datetime.now().strftime("%I:%M %p")
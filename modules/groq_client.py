@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from .config import (
+    GROQ_API_KEY, GROQ_BASE_URL, GROQ_MAX_CONCURRENCY, GROQ_MAX_CONNECTIONS,
+    GROQ_KEEPALIVE_CONNECTIONS, GROQ_KEEPALIVE_EXPIRY, GROQ_CONNECT_TIMEOUT,
+    GROQ_LLM_TIMEOUT, GROQ_MAX_RETRIES,
+)
+
+
+# Bounds how many requests are in flight to the LLM / STT provider across all clients
+groq_slots = asyncio.Semaphore(GROQ_MAX_CONCURRENCY)
+
+_client = None
+_client_lock = threading.Lock()   # backends may be created from worker threads at startup
+
+
+def get_client():
+    """
+    One async client for the whole process: every socket shares its keep-alive
+    connection pool. The SDK (and httpx) are imported on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is not None:
+            return _client
+        import httpx
+        from groq import AsyncGroq, DefaultAsyncHttpxClient
+
+        _client = AsyncGroq(
+            api_key=GROQ_API_KEY,
+            base_url=GROQ_BASE_URL,
+            timeout=httpx.Timeout(GROQ_LLM_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT),
+            max_retries=GROQ_MAX_RETRIES,
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=GROQ_MAX_CONNECTIONS,
+                    max_keepalive_connections=GROQ_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+                )
+            ),
+        )
+        return _client
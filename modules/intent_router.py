@@ -0,0 +1,110 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from .config import INTENT_THRESHOLD
+
+
+# Phrasings for tools that take no arguments and whose result message can
+# be spoken as-is. Patterns run against normalize()d text.
+INTENT_PATTERNS = {
+    "get_current_time": [
+        r"what(?:'s| is) the (?:current )?time(?: now| right now)?",
+        r"what time is it(?: now| right now)?",
+        r"(?:tell me |give me )?the (?:current )?time",
+        r"current time",
+        r"time(?: now)?",
+    ],
+    "get_current_date": [
+        r"what(?:'s| is) (?:the |today's )?date(?: today)?",
+        r"what day is (?:it|today)(?: today)?",
+        r"what(?:'s| is) today(?:'s date)?",
+        r"(?:tell me |give me )?(?:the |today's )date",
+        r"date(?: today)?",
+    ],
+    "get_reminders": [
+        r"(?:list|show|read|tell me|give me|get|check) (?:me )?(?:all )?(?:of )?my (?:active )?reminders",
+        r"what(?:'s| is| are) my (?:active )?reminders",
+        r"(?:do i have )?any reminders",
+        r"my reminders",
+    ],
+    "get_messages": [
+        r"(?:list|show|read|tell me|give me|get|check) (?:me )?(?:all )?(?:of )?my messages",
+        r"what(?:'s| is| are) my messages",
+        r"(?:do i have )?any (?:new )?messages",
+        r"my messages",
+    ],
+}
+
+_FILLER_PREFIX = re.compile(
+    r"^(?:(?:hey|hi|ok|okay|so)\s+)?(?:aria\s+)?(?:(?:please|can you|could you|would you)\s+)?"
+)
+_FILLER_SUFFIX = re.compile(r"\s+(?:please|aria|thanks|thank you)$")
+
+
+def normalize(text: str) -> str:
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"[^\w' ]+", " ", text)
+    text = " ".join(text.split())
+    text = _FILLER_PREFIX.sub("", text)
+    return _FILLER_SUFFIX.sub("", text)
+
+
+class IntentRouter:
+    """
+    Answers simple, deterministic requests without the LLM.
+
+    Each eligible tool (one of INTENT_PATTERNS whose schema in `tools` has
+    no required parameters) gets precompiled patterns. A request's
+    confidence for a tool is the share of the normalized text its best
+    pattern covers, so "what time is it" scores 1.0 while "what time is it
+    in Tokyo" scores lower; matches at or above threshold are routed.
+    """
+
+    def __init__(self, tools: List[Dict], threshold: float = INTENT_THRESHOLD,
+                 patterns: Dict[str, List[str]] = INTENT_PATTERNS):
+        self.threshold = threshold
+        self._patterns = {}
+        for tool in tools:
+            function = tool["function"]
+            if function["name"] in patterns and not function.get("parameters", {}).get("required"):
+                self._patterns[function["name"]] = [re.compile(rf"\b{p}\b") for p in patterns[function["name"]]]
+
+        self.hits = {name: 0 for name in self._patterns}
+        self.misses = 0
+
+    @property
+    def intents(self) -> List[str]:
+        return list(self._patterns)
+
+    def classify(self, text: str) -> Tuple[Optional[str], float]:
+        """Best (tool name, confidence) for text; (None, 0.0) if nothing matches"""
+        normalized = normalize(text)
+        best, confidence = None, 0.0
+        if not normalized:
+            return best, confidence
+        for name, patterns in self._patterns.items():
+            for pattern in patterns:
+                match = pattern.search(normalized)
+                if match:
+                    score = (match.end() - match.start()) / len(normalized)
+                    if score > confidence:
+                        best, confidence = name, score
+        return best, confidence
+
+    def route(self, text: str) -> Optional[str]:
+        """Tool to answer text with directly, or None to use the LLM"""
+        name, confidence = self.classify(text)
+        if name is not None and confidence >= self.threshold:
+            self.hits[name] += 1
+            return name
+        self.misses += 1
+        return None
+
+    def stats(self) -> Dict:
+        hits = sum(self.hits.values())
+        total = hits + self.misses
+        return {
+            "hits": hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "by_intent": dict(self.hits),
+        }
@@ -0,0 +1,116 @@
+import logging
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+from .config import MEMORY_DEBUG, MEMORY_DEBUG_FRAMES
+
+log = logging.getLogger(__name__)
+
+TOP_SITES = 25
+TOP_SESSIONS = 10
+
+# Allocations made by tracemalloc itself and by the import system are noise here
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (Linux /proc; peak RSS elsewhere)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _size(value: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+class MemoryTracer:
+    """
+    Backs /debug/memory: process RSS, the accounted memory of each session
+    and, with tracing on, the top allocation sites by line and how they
+    grew since the previous report. A report takes a tracemalloc snapshot
+    on the event loop, which can take a second on a big heap; it is for
+    debugging, not for scraping.
+    """
+
+    def __init__(self, enabled: bool = MEMORY_DEBUG, frames: int = MEMORY_DEBUG_FRAMES):
+        self.enabled = enabled
+        self.frames = frames
+        self._previous = None       # (snapshot, taken at)
+
+    def start(self):
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            log.warning("tracemalloc on (%d frame(s) per allocation): allocations are slower", self.frames)
+
+    def stop(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._previous = None
+
+    def report(self, sessions: Optional[Dict[str, Dict[str, int]]] = None) -> str:
+        """Plain-text report; sessions maps a client id to its Session.memory()"""
+        lines = [f"rss {_size(rss_bytes())}"]
+
+        if sessions is not None:
+            totals = {}
+            for usage in sessions.values():
+                for kind, size in usage.items():
+                    totals[kind] = totals.get(kind, 0) + size
+            lines.append(f"sessions {len(sessions)}" + "".join(f", {kind} {_size(size)}" for kind, size in totals.items()))
+            largest = sorted(sessions.items(), key=lambda item: sum(item[1].values()), reverse=True)[:TOP_SESSIONS]
+            for client_id, usage in largest:
+                lines.append(f"  {client_id:<34}" + "  ".join(f"{kind} {_size(size)}" for kind, size in usage.items()))
+
+        if not tracemalloc.is_tracing():
+            lines.append("tracemalloc off: start the server with MEMORY_DEBUG=1 for allocation sites")
+            return "\n".join(lines) + "\n"
+
+        current, peak = tracemalloc.get_traced_memory()
+        lines.append(f"traced {_size(current)} (peak {_size(peak)}), "
+                     f"tracemalloc's own overhead {_size(tracemalloc.get_tracemalloc_memory())}")
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        lines.append(f"\ntop {TOP_SITES} allocation sites:")
+        for stat in snapshot.statistics("lineno")[:TOP_SITES]:
+            lines.append(f"  {_size(stat.size):>10} {stat.count:>8} blocks  {self._where(stat.traceback)}")
+
+        if self._previous:
+            previous, taken = self._previous
+            lines.append(f"\ngrowth since the last report {time.monotonic() - taken:.0f} s ago:")
+            for stat in snapshot.compare_to(previous, "lineno")[:TOP_SITES]:
+                if stat.size_diff:
+                    lines.append(f"  {'+' if stat.size_diff > 0 else '-'}{_size(abs(stat.size_diff)):>9} "
+                                 f"{stat.count_diff:>+8} blocks  {self._where(stat.traceback)}")
+        self._previous = (snapshot, time.monotonic())
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _where(traceback) -> str:
+        frame = traceback[0]
+        filename = os.path.relpath(frame.filename) if os.path.isabs(frame.filename) else frame.filename or "?"
+        return f"{filename}:{frame.lineno}"
+
+    def route(self, sessions_fn: Callable[[], Dict[str, Dict[str, int]]]):
+        """A MetricsServer route: fn() -> (content type, body)"""
+        return lambda: ("text/plain; charset=utf-8", self.report(sessions_fn()))
+
+
+memory_tracer = MemoryTracer()
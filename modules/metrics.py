@@ -0,0 +1,291 @@
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+from .config import METRICS_HOST, METRICS_PORT
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in values]
+
+
+class Gauge(Metric):
+    """
+    A value set directly, or read at scrape time from fn(), which returns a
+    number or a {label values tuple: number} dict
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), fn: Callable = None, kind: str = None):
+        super().__init__(name, help, labels)
+        self.fn = fn
+        if kind:
+            self.kind = kind    # e.g. "counter" for totals kept elsewhere
+        self._values = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        if self.fn is None:
+            with self._lock:
+                values = list(self._values.items())
+        else:
+            try:
+                result = self.fn()
+            except Exception as e:
+                log.warning("Metric %s collection failed: %s", self.name, e)
+                return []
+            values = result.items() if isinstance(result, dict) else [((), result)]
+        return [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self._series = {}   # key -> [bucket counts..., count, sum]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1      # index == len(buckets) is the +Inf bucket
+            series[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = [(key, list(values)) for key, values in self._series.items()]
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), values):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {values[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = (), fn: Callable = None, kind: str = None) -> Gauge:
+        return self.register(Gauge(name, help, labels, fn, kind))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (), buckets: Tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+STAGE_SECONDS = registry.histogram("voice_stage_seconds", "Time spent in each turn stage", ["stage"])
+STAGE_WAIT_SECONDS = registry.histogram("voice_stage_wait_seconds", "Time waiting for a stage slot", ["stage"])
+TOOL_SECONDS = registry.histogram("voice_tool_seconds", "Tool call duration", ["tool", "outcome"])
+TURN_SECONDS = registry.histogram("voice_turn_seconds", "Whole turn duration", ["kind", "outcome"])
+FIRST_AUDIO_SECONDS = registry.histogram("voice_first_audio_seconds", "Turn start to first audio sent", ["kind"])
+MESSAGES = registry.counter("voice_messages_total", "Client messages received", ["type"])
+FAST_PATH = registry.counter("voice_fast_path_total", "Turns answered without the LLM", ["path"])
+STARTUP_SECONDS = registry.gauge("voice_startup_seconds", "start_server() to backends created / socket bound", ["phase"])
+
+
+# ----- per-turn spans -----
+
+class Turn:
+    """Monotonic timings of one turn's stages, relative to its start"""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.started = time.monotonic()
+        self.spans = []     # (stage, offset, duration)
+        self.first_audio = None
+
+    def audio_sent(self):
+        if self.first_audio is None:
+            self.first_audio = time.monotonic() - self.started
+            FIRST_AUDIO_SECONDS.observe(self.first_audio, kind=self.kind)
+
+    def summary(self) -> str:
+        """Per-stage totals in first-seen order, e.g. "stt=310ms llm_1=420ms send=3ms(x12)" """
+        totals = {}
+        for stage, _, duration in self.spans:
+            total, count = totals.get(stage, (0.0, 0))
+            totals[stage] = (total + duration, count + 1)
+        return " ".join(
+            f"{stage}={total * 1000:.0f}ms" + (f"(x{count})" if count > 1 else "")
+            for stage, (total, count) in totals.items()
+        )
+
+
+current_turn = contextvars.ContextVar("current_turn", default=None)
+
+
+@contextlib.contextmanager
+def span(stage: str):
+    """Time a block into voice_stage_seconds and the current turn"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = time.monotonic() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        turn = current_turn.get()
+        if turn is not None:
+            turn.spans.append((stage, started - turn.started, elapsed))
+
+
+@contextlib.contextmanager
+def turn_span(kind: str):
+    """Scope a turn: its stages are collected and it is logged when it ends"""
+    turn = Turn(kind)
+    token = current_turn.set(turn)
+    outcome = "ok"
+    try:
+        yield turn
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        current_turn.reset(token)
+        elapsed = time.monotonic() - turn.started
+        TURN_SECONDS.observe(elapsed, kind=kind, outcome=outcome)
+        log.info("%s turn %s in %.0f ms: %s", kind, outcome, elapsed * 1000, turn.summary())
+
+
+# ----- HTTP endpoint -----
+
+class MetricsServer:
+    """
+    Tiny HTTP/1.0 server for scrapes, running on the same event loop as the
+    WebSocket server. Routes map a path to fn() -> (content type, body).
+    """
+
+    def __init__(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.host = host
+        self.port = port
+        self.routes = {
+            "/metrics": lambda: ("text/plain; version=0.0.4; charset=utf-8", registry.render()),
+        }
+        self._server = None
+
+    def route(self, path: str, fn: Callable[[], Tuple[str, str]]):
+        self.routes[path] = fn
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info("Metrics on http://%s:%d/metrics", self.host, self.port)
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+            method, target = head.split(b" ", 2)[:2]
+            path = target.decode("latin-1").split("?", 1)[0]
+            handler = self.routes.get(path)
+            if method != b"GET" or handler is None:
+                status, content_type, body = "404 Not Found", "text/plain", "not found\n"
+            else:
+                try:
+                    content_type, body = handler()
+                    status = "200 OK"
+                except Exception as e:
+                    log.exception("%s failed: %s", path, e)
+                    status, content_type, body = "500 Internal Server Error", "text/plain", f"{e}\n"
+            payload = body.encode("utf-8")
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode("latin-1") + payload
+            )
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
@@ -0,0 +1,229 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Callable, Optional
+from .config import OUTBOX_MAX_BYTES, OUTBOX_MAX_TEXT_BYTES, OUTBOX_STALE_SECONDS
+from .metrics import registry
+
+log = logging.getLogger(__name__)
+
+# Lower goes first; within a priority frames keep the order they were queued in
+CONTROL = 0     # hello, endpoint, errors, stats
+TEXT = 1        # transcriptions, replies, deltas, reminders, interrupt
+AUDIO = 2       # speech and audio_end, which must follow its chunks
+
+PRIORITIES = {CONTROL: "control", TEXT: "text", AUDIO: "audio"}
+
+CONTROL_TYPES = frozenset(('hello', 'endpoint', 'error', 'stats'))
+AUDIO_TYPES = frozenset(('audio_response', 'audio_chunk', 'audio_end'))
+
+OUTBOX_WAIT_SECONDS = registry.histogram("voice_outbox_wait_seconds", "Queued to handed to the socket", ["priority"])
+OUTBOX_SEND_SECONDS = registry.histogram("voice_outbox_send_seconds", "websocket.send() duration", ["priority"])
+OUTBOX_DROPPED = registry.counter("voice_outbox_dropped_total", "Audio frames never sent", ["reason"])
+OUTBOX_OVERFLOWS = registry.counter("voice_outbox_overflows_total",
+                                    "Clients disconnected for not reading their text and control frames")
+
+
+def priority_of(message_type: str) -> int:
+    if message_type in AUDIO_TYPES:
+        return AUDIO
+    if message_type in CONTROL_TYPES:
+        return CONTROL
+    return TEXT
+
+
+class _Frame:
+    __slots__ = ("frame", "size", "priority", "group", "turn", "queued", "dropped")
+
+    def __init__(self, frame, priority: int, turn):
+        self.frame = frame
+        self.size = len(frame)
+        self.priority = priority
+        self.group = turn if turn is not None else object()    # one reply per turn; reminders stand alone
+        self.turn = turn
+        self.queued = time.monotonic()
+        self.dropped = False
+
+
+class Outbox:
+    """
+    Per-session send queue, drained by one sender task, so a slow client
+    only ever delays its own frames and never the code producing them.
+
+    Frames go out by priority (control, then text, then audio), so a
+    transcription isn't stuck behind half a megabyte of speech. Audio is
+    bounded by max_bytes: when it is full, audio of older replies still
+    queued is dropped in favour of the current one, and failing that the
+    producer waits (backpressure on its own turn only). Audio that has
+    waited longer than stale_seconds is dropped when it reaches the front,
+    together with the rest of its reply, so the client is never left with
+    a gap in a reply's chunks. Text and control frames can't be dropped
+    without confusing the client, so they are always accepted up to
+    max_text_bytes; past that the client has stopped reading, and the
+    outbox closes and calls close() to disconnect it. If the socket fails
+    the outbox closes too and later frames are discarded; the reading side
+    notices the disconnect.
+    """
+
+    def __init__(self, send: Callable, max_bytes: int = OUTBOX_MAX_BYTES,
+                 stale_seconds: float = OUTBOX_STALE_SECONDS, max_text_bytes: int = OUTBOX_MAX_TEXT_BYTES,
+                 close: Optional[Callable] = None):
+        self.send = send
+        self.max_bytes = max_bytes
+        self.stale_seconds = stale_seconds
+        self.max_text_bytes = max_text_bytes
+        self._close_connection = close
+        self.queued_bytes = 0
+        self.text_bytes = 0     # the part of queued_bytes that is text and control frames
+        self.sent = 0
+        self.dropped = 0
+        self._heap = []
+        self._order = itertools.count()
+        self._dropped_groups = {}     # recent groups whose later audio is dropped too (dict keeps order)
+        self._changed = None
+        self._sender = None
+        self._closer = None
+        self._sending = False
+        self._closed = False
+
+    def __len__(self):
+        return sum(1 for _, _, item in self._heap if not item.dropped)
+
+    def _start(self):
+        if self._sender is None and not self._closed:
+            self._changed = asyncio.Condition()
+            self._sender = asyncio.create_task(self._send_loop())
+
+    async def close(self):
+        self._closed = True
+        if self._sender:
+            self._sender.cancel()
+            await asyncio.gather(self._sender, return_exceptions=True)
+        self._heap.clear()
+        self.queued_bytes = self.text_bytes = 0
+        if self._changed:
+            async with self._changed:
+                self._changed.notify_all()    # release producers waiting for room
+
+    async def put(self, frame, message_type: str, turn=None):
+        """
+        Queue a ready-to-send frame. Audio of the same turn is one reply:
+        dropping a frame of it drops the rest, and turn.audio_sent() is
+        called when its first audio actually leaves
+        """
+        if self._closed:
+            return
+        self._start()
+        item = _Frame(frame, priority_of(message_type), turn)
+        async with self._changed:
+            if item.priority == AUDIO:
+                if item.group in self._dropped_groups:
+                    self._drop(item, "stale")
+                    return
+                if not self._fits(item):
+                    self._coalesce(item.group)
+                await self._changed.wait_for(lambda: self._closed or self._fits(item))
+                if self._closed:
+                    return
+            elif self.text_bytes + item.size > self.max_text_bytes:
+                self._overflow()
+                return
+            else:
+                self.text_bytes += item.size
+            heapq.heappush(self._heap, (item.priority, next(self._order), item))
+            self.queued_bytes += item.size
+            self._changed.notify_all()
+
+    def _overflow(self):
+        """The client isn't reading: stop queueing for it and drop the connection"""
+        log.warning("Outbox over %d bytes of text and control frames, disconnecting the client",
+                    self.max_text_bytes)
+        OUTBOX_OVERFLOWS.inc()
+        self._closed = True
+        self._heap.clear()
+        self.queued_bytes = self.text_bytes = 0
+        if self._sender:
+            self._sender.cancel()
+        self._changed.notify_all()
+        if self._close_connection:
+            self._closer = asyncio.create_task(self._close_connection())
+
+    def _fits(self, item: _Frame) -> bool:
+        # An empty outbox takes anything, or a clip bigger than max_bytes could never be sent
+        return self.queued_bytes + item.size <= self.max_bytes or self.queued_bytes == 0
+
+    def _coalesce(self, keep):
+        """Drop queued audio of replies other than keep, oldest first, until there is room"""
+        for _, _, item in sorted(self._heap, key=lambda entry: entry[1]):
+            if self.queued_bytes <= self.max_bytes // 2:
+                break
+            if item.priority == AUDIO and not item.dropped and item.group is not keep:
+                self.drop_group(item.group, "coalesced")
+
+    def drop_group(self, group, reason: str):
+        for _, _, item in self._heap:
+            if item.group is group and not item.dropped:
+                self._drop(item, reason)
+                self.queued_bytes -= item.size
+        self._dropped_groups[group] = True
+        if len(self._dropped_groups) > 64:
+            del self._dropped_groups[next(iter(self._dropped_groups))]
+
+    def drop_turn_audio(self, reason: str = "interrupt"):
+        """Drop queued audio that belongs to a turn (not reminders): the turn was cancelled"""
+        for _, _, item in self._heap:
+            if item.priority == AUDIO and item.turn is not None and not item.dropped:
+                self.drop_group(item.group, reason)
+
+    def _drop(self, item: _Frame, reason: str):
+        item.dropped = True
+        self.dropped += 1
+        OUTBOX_DROPPED.inc(reason=reason)
+
+    async def flush(self):
+        """Wait until everything queued so far has been sent (or dropped)"""
+        if self._changed is None:
+            return
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._closed or self._sender.done() or not (self._heap or self._sending))
+
+    async def _send_loop(self):
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._heap)
+                _, _, item = heapq.heappop(self._heap)
+                if not item.dropped:
+                    self.queued_bytes -= item.size
+                    if item.priority != AUDIO:
+                        self.text_bytes -= item.size
+                    waited = time.monotonic() - item.queued
+                    if item.priority == AUDIO and waited > self.stale_seconds:
+                        log.debug("Dropping audio that waited %.1f s for a slow client", waited)
+                        self.drop_group(item.group, "stale")
+                        self._drop(item, "stale")
+                self._sending = not item.dropped
+                self._changed.notify_all()
+            if item.dropped:
+                continue
+
+            priority = PRIORITIES[item.priority]
+            OUTBOX_WAIT_SECONDS.observe(waited, priority=priority)
+            started = time.monotonic()
+            try:
+                await self.send(item.frame)
+            except Exception as e:
+                log.debug("Outbox closed, send failed: %s", e)
+                self._closed = True
+                self._heap.clear()
+                self.queued_bytes = self.text_bytes = 0
+                return
+            finally:
+                async with self._changed:
+                    self._sending = False
+                    self._changed.notify_all()
+            OUTBOX_SEND_SECONDS.observe(time.monotonic() - started, priority=priority)
+            self.sent += 1
+            if item.turn is not None and item.priority == AUDIO:
+                item.turn.audio_sent()
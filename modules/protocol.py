@@ -0,0 +1,42 @@
+import json
+import struct
+from typing import Dict, Tuple
+
+
+# Protocol 1: everything is a JSON text frame, audio is base64 inside it.
+# Protocol 2: audio travels as binary frames laid out as
+#
+#     [4-byte big-endian header length][UTF-8 JSON header][raw audio bytes]
+#
+# so clips are sent without base64 inflation or extra copies. Control
+# messages stay JSON text frames. A client opts in by sending
+# {"type": "hello", "protocol": 2} after connecting; clients that never say
+# hello keep getting protocol 1.
+PROTOCOL_VERSION = 2
+
+_HEADER_LENGTH = struct.Struct("!I")
+
+
+def encode_frame(header: Dict, payload: bytes) -> bytes:
+    head = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return b"".join([_HEADER_LENGTH.pack(len(head)), head, payload])
+
+
+def decode_frame(frame: bytes) -> Tuple[Dict, memoryview]:
+    view = memoryview(frame)
+    if len(view) < _HEADER_LENGTH.size:
+        raise ValueError("Binary frame too short")
+    (length,) = _HEADER_LENGTH.unpack_from(view)
+    end = _HEADER_LENGTH.size + length
+    if end > len(view):
+        raise ValueError("Binary frame header length exceeds frame size")
+    header = json.loads(bytes(view[_HEADER_LENGTH.size:end]))
+    return header, view[end:]
+
+
+def negotiate(requested) -> int:
+    """Protocol version to use for a client that asked for `requested`"""
+    try:
+        return max(1, min(int(requested), PROTOCOL_VERSION))
+    except (TypeError, ValueError):
+        return 1
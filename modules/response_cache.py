@@ -0,0 +1,94 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from .config import RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_TTL, RESPONSE_CACHE_CONTEXT
+from .intent_router import normalize
+
+
+def schema_version(tools: List[Dict]) -> str:
+    """Short hash of the tool schema; cached replies die with any schema change"""
+    return hashlib.sha256(json.dumps(tools, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of finished assistant turns.
+
+    The key hashes the normalized user message, the last context_messages
+    messages of the history (so a follow-up isn't answered out of context),
+    the tool schema version, model and temperature. Turns that called a tool
+    whose policy has side_effects or time_dependent set are never stored,
+    since replaying them would skip the action or serve stale data.
+    """
+
+    def __init__(self, tool_policies: Dict[str, Dict], tools_version: str,
+                 max_entries: int = RESPONSE_CACHE_ENTRIES, ttl: float = RESPONSE_CACHE_TTL,
+                 context_messages: int = RESPONSE_CACHE_CONTEXT):
+        self.tool_policies = tool_policies
+        self.tools_version = tools_version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.context_messages = context_messages
+
+        self._entries = OrderedDict()     # key -> (expires, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def key(self, user_message: str, history: List[Dict], model: str, temperature: float) -> str:
+        turns = [m for m in history if m.get("role") != "system"]
+        tail = turns[-self.context_messages:] if self.context_messages else []
+        raw = json.dumps(
+            [normalize(user_message), tail, self.tools_version, model, temperature],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            response = entry[1]
+        # Callers own (and may extend) what they get back
+        return copy.deepcopy(response)
+
+    def cacheable(self, response: Dict) -> bool:
+        if response.get("status") != "success" or not response.get("message"):
+            return False
+        for result in response.get("function_results") or ():
+            policy = self.tool_policies.get(result["function_name"], {})
+            if policy.get("side_effects") or policy.get("time_dependent"):
+                return False
+        return True
+
+    def put(self, key: str, response: Dict):
+        if not self.cacheable(response):
+            with self._lock:
+                self.bypassed += 1
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+log = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """
+    Server-wide reminder timer.
+
+    Pending reminders sit in a min-heap of (due datetime, id); the run() task
+    sleeps until the earliest one is due, or until an insert that becomes the
+    new earliest wakes it. cancel() just forgets the id and the stale heap
+    entry is skipped when it surfaces, so insert and cancel are both
+    O(log n) at worst.
+
+    Each reminder fires once and is delivered to the sessions registered for
+    its owner (every session here if it has no owner), after claim(reminder)
+    confirms nobody delivered it yet. Several workers sharing one store all
+    schedule every reminder; only one holding the owner's socket claims it.
+    Reminders whose owner is not connected stay undelivered in the store:
+    fetch_due(owner, since) finds them when the owner registers, and, every
+    poll_interval, finds reminders set on other workers that came due while
+    their owner was connected here. schedule() and cancel() may be called
+    from any thread.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._pending = {}                   # id -> (reminder, owner)
+        self._sessions = defaultdict(set)    # owner -> sessions
+        self._deliver = None
+        self._claim = None
+        self._fetch_due = None
+        self._poll_interval = 0.0
+        self._deliveries = set()
+        self._wake = None
+        self._loop = None
+        self._loop_thread = None
+        self._task = None
+        self._poller = None
+        self.fired = 0
+        self.delivered = 0
+
+    def start(self, deliver, claim=None, fetch_due=None, poll_interval: float = 0.0):
+        """
+        Start firing reminders: deliver(session, reminder) is awaited per
+        recipient. claim(reminder) -> bool and fetch_due(owner, since) ->
+        [(reminder, owner)] are blocking store calls, run in threads
+        """
+        if self._task is not None:
+            return
+        self._deliver = deliver
+        self._claim = claim
+        self._fetch_due = fetch_due
+        self._poll_interval = poll_interval
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        if fetch_due and poll_interval > 0:
+            self._poller = asyncio.create_task(self._poll())
+        log.info("Reminder scheduler started with %d pending reminder(s)", len(self._pending))
+
+    async def close(self):
+        tasks = [task for task in (self._task, self._poller) if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, *self._deliveries, return_exceptions=True)
+        self._task = None
+        self._poller = None
+        self._loop = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    # ----- reminders -----
+
+    def schedule(self, reminder: Dict, due: datetime, owner: Optional[str] = None):
+        self._call(self._insert, reminder, due, owner)
+
+    def cancel(self, reminder_id):
+        self._call(self._pending.pop, reminder_id, None)
+
+    def _call(self, fn, *args):
+        # Not started yet, or already on the loop: nothing else touches the heap
+        if self._loop is None or threading.get_ident() == self._loop_thread:
+            fn(*args)
+        else:
+            self._loop.call_soon_threadsafe(fn, *args)
+
+    def _insert(self, reminder: Dict, due: datetime, owner: Optional[str]):
+        self._pending[reminder["id"]] = (reminder, owner)
+        heapq.heappush(self._heap, (due, reminder["id"]))
+        if self._wake and self._heap[0][1] == reminder["id"]:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            while self._heap and self._heap[0][1] not in self._pending:
+                heapq.heappop(self._heap)    # cancelled
+            if not self._heap:
+                await self._wake.wait()
+                continue
+
+            due, reminder_id = self._heap[0]
+            delay = (due - datetime.now()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            reminder, owner = self._pending.pop(reminder_id)
+            self.fired += 1
+            self._dispatch(reminder, owner)
+
+    async def _poll(self):
+        since = datetime.now()
+        window = timedelta(seconds=self._poll_interval)
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            # Overlapping windows: a reminder seen twice is only claimed once
+            until = datetime.now()
+            if self._sessions:
+                try:
+                    due = await asyncio.to_thread(self._fetch_due, None, since - window)
+                except Exception as e:
+                    log.error("Reminder poll failed: %s", e)
+                    continue
+                for reminder, owner in due:
+                    if reminder["id"] not in self._pending and (owner is None or owner in self._sessions):
+                        self._dispatch(reminder, owner)
+            since = until
+
+    # ----- sessions -----
+
+    def register(self, session, owner: str):
+        self._sessions[owner].add(session)
+        if self._fetch_due and self._loop is not None:
+            self._spawn(self._deliver_missed(session, owner))
+
+    async def _deliver_missed(self, session, owner: str):
+        """Reminders that came due while owner was away (on any worker)"""
+        for reminder, _ in await asyncio.to_thread(self._fetch_due, owner, None):
+            if reminder["id"] not in self._pending:
+                await self._deliver_once(reminder, {session})
+
+    def unregister(self, session, owner: str):
+        sessions = self._sessions.get(owner)
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self._sessions[owner]
+
+    def _dispatch(self, reminder: Dict, owner: Optional[str]):
+        if owner is None:
+            recipients = set().union(*self._sessions.values())
+        else:
+            recipients = set(self._sessions.get(owner, ()))
+        if not recipients:
+            log.info("Reminder %s waits until its owner connects", reminder["id"])
+            return
+        self._spawn(self._deliver_once(reminder, recipients))
+
+    async def _deliver_once(self, reminder: Dict, recipients):
+        if self._claim and not await asyncio.to_thread(self._claim, reminder):
+            return      # deleted, or delivered already (here or by another worker)
+        reminder["active"] = False
+        self.delivered += 1
+        await asyncio.gather(*(self._send(session, reminder) for session in recipients))
+
+    async def _send(self, session, reminder: Dict):
+        try:
+            await self._deliver(session, reminder)
+        except Exception as e:
+            log.error("Reminder delivery failed: %s", e)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._deliveries.add(task)
+        task.add_done_callback(self._delivered)
+
+    def _delivered(self, task):
+        self._deliveries.discard(task)
+        if not task.cancelled() and task.exception():
+            log.error("Reminder delivery failed: %s", task.exception())
+
+
+reminder_scheduler = ReminderScheduler()
@@ -0,0 +1,76 @@
+import base64
+import contextvars
+import json
+import uuid
+from typing import Dict
+from .codec import AUDIO_BYTES, detect_codec, mime_type
+from .conversation import Conversation
+from .metrics import span, current_turn
+from .outbox import Outbox
+from .protocol import encode_frame
+
+
+# The session whose turn is running; tools use it to find who they act for
+current_session = contextvars.ContextVar("current_session", default=None)
+
+
+class Session:
+    """
+    State for one connected client: its socket, protocol and conversation.
+    Everything sent goes through its outbox, so the send_* methods return
+    once a frame is queued rather than when the client has received it.
+    """
+
+    def __init__(self, websocket, conversation: Conversation):
+        self.websocket = websocket
+        self.outbox = Outbox(websocket.send, close=lambda: websocket.close(1008, "not reading"))
+        self.conversation = conversation
+        self.protocol = 1
+        self.audio_codec = "wav"    # what synthesized speech is encoded as, negotiated in 'hello'
+
+        # Stable id sent by the client in 'hello' (e.g. one per browser), so
+        # reminders reach it after a reconnect; random until then
+        self.client_id = uuid.uuid4().hex
+        self.identified = False     # client_id came from the client: worth persisting state for
+
+        # The turn being processed, cancelled on barge-in
+        self.turn = None
+
+        # Audio received and not yet transcribed (queued or in its turn), capped by SESSION_AUDIO_BYTES
+        self.audio_bytes = 0
+
+        # Streamed microphone input (stream_start .. stream_stop)
+        self.endpointer = None
+        self.stream_sample_rate = 16000
+        self.stream_reply = False
+
+    @property
+    def remote_address(self):
+        return self.websocket.remote_address
+
+    def memory(self) -> Dict[str, int]:
+        """Approximate bytes this session holds, by what holds them"""
+        return {
+            'conversation': self.conversation.size(),
+            'audio': self.audio_bytes,
+            'stream': self.endpointer.buffered_bytes if self.endpointer else 0,
+            'outbox': self.outbox.queued_bytes,
+        }
+
+    async def send_json(self, message: Dict):
+        with span("send"):
+            await self.outbox.put(json.dumps(message), message['type'])
+
+    async def send_audio(self, header: Dict, audio: bytes):
+        """Send audio with its header: one binary frame on protocol 2, base64 JSON otherwise"""
+        # Labelled by what the bytes are, so a clip that fell back to WAV still plays
+        codec = detect_codec(audio)
+        header = {**header, 'format': codec, 'mime': mime_type(codec)}
+        AUDIO_BYTES.inc(len(audio), codec=codec)
+        if self.protocol >= 2:
+            frame = encode_frame(header, audio)
+        else:
+            frame = json.dumps({**header, 'audio': base64.b64encode(audio).decode('utf-8')})
+        # Only waits if this client's outbox is full of audio
+        with span("send"):
+            await self.outbox.put(frame, header['type'], current_turn.get())
@@ -0,0 +1,296 @@
+import itertools
+import json
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from .config import STORE_PATH, STORE_BATCH_SIZE, WORKERS, WORKER_INDEX
+
+log = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL,
+    due REAL NOT NULL,
+    created REAL NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS reminders_due ON reminders (due) WHERE active = 1;
+CREATE INDEX IF NOT EXISTS reminders_owner ON reminders (owner, active);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    content TEXT NOT NULL,
+    time REAL NOT NULL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_owner ON messages (owner, id);
+
+CREATE TABLE IF NOT EXISTS conversations (
+    owner TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+_STOP = object()
+
+
+class Store:
+    """
+    SQLite (WAL) storage for reminders, messages and conversations.
+
+    Writes never wait for the disk: they are queued to one writer thread
+    that commits whatever has accumulated (up to batch_size statements) in a
+    single transaction. Ids come from an in-process counter seeded from the
+    table's max(id), so a row's id is known before it is written; with
+    several worker processes on one file each counts in steps of id_step
+    from its own id_offset, so they never hand out the same id. Reads run
+    on a per-thread connection after waiting for the writes queued before
+    them, so a caller always sees its own changes.
+
+    The database is opened on first use.
+    """
+
+    def __init__(self, path: str = STORE_PATH, batch_size: int = STORE_BATCH_SIZE,
+                 id_step: int = max(1, WORKERS), id_offset: int = WORKER_INDEX):
+        self.path = path
+        self.batch_size = batch_size
+        self.id_step = id_step
+        self.id_offset = id_offset % id_step
+        self._lock = threading.Lock()
+        self._committed = threading.Condition()
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._writer = None
+        self._ids = {}
+        self._enqueued = 0
+        self._done = 0
+        self.commits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout = 5000")
+        return conn
+
+    def open(self):
+        if self._writer is not None:
+            return
+        with self._lock:
+            if self._writer is not None:
+                return
+            conn = self._connect()
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA)
+            for table in ("reminders", "messages"):
+                last = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+                first = last + 1 + (self.id_offset - (last + 1)) % self.id_step
+                self._ids[table] = itertools.count(first, self.id_step)
+            self._writer = threading.Thread(target=self._write_loop, args=(conn,), name="store-writer", daemon=True)
+            self._writer.start()
+
+    def close(self):
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(_STOP)
+            writer.join()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ----- writes -----
+
+    def next_id(self, table: str) -> int:
+        self.open()
+        with self._lock:
+            return next(self._ids[table])
+
+    def write(self, sql: str, params: Tuple = ()) -> Future:
+        """Queue a statement; the future resolves once it is committed"""
+        self.open()
+        future = Future()
+        with self._committed:
+            self._enqueued += 1
+            self._queue.put((sql, params, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every write queued so far is committed"""
+        with self._committed:
+            target = self._enqueued
+            return self._committed.wait_for(lambda: self._done >= target, timeout)
+
+    def _write_loop(self, conn: sqlite3.Connection):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            batch = [job for job in batch if job is not _STOP]
+
+            results = []
+            with conn:
+                for sql, params, future in batch:
+                    try:
+                        results.append((future, conn.execute(sql, params).rowcount, None))
+                    except sqlite3.Error as e:
+                        log.error("Store write failed: %s", e)
+                        results.append((future, None, e))
+            self.commits += 1
+
+            with self._committed:
+                self._done += len(batch)
+                self._committed.notify_all()
+            for future, rowcount, error in results:
+                if error:
+                    future.set_exception(error)
+                else:
+                    future.set_result(rowcount)
+
+            if stop:
+                conn.close()
+                return
+
+    # ----- reads -----
+
+    def query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        self.open()
+        self.flush()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn.execute(sql, params).fetchall()
+
+    # ----- reminders -----
+
+    @staticmethod
+    def _owned(owner: Optional[str]) -> Tuple[str, Tuple]:
+        # Without an owner (e.g. called outside a session) everything is visible
+        if owner is None:
+            return "", ()
+        return " AND (owner = ? OR owner IS NULL)", (owner,)
+
+    def add_reminder(self, text: str, due: datetime, owner: Optional[str] = None) -> Dict:
+        reminder_id = self.next_id("reminders")
+        created = datetime.now()
+        self.write(
+            "INSERT INTO reminders (id, text, due, created, active, owner) VALUES (?, ?, ?, ?, 1, ?)",
+            (reminder_id, text, due.timestamp(), created.timestamp(), owner)
+        )
+        return reminder_dict(reminder_id, text, due, created, True)
+
+    def active_reminders(self, owner: Optional[str] = None) -> List[Dict]:
+        where, params = self._owned(owner)
+        rows = self.query(f"SELECT * FROM reminders WHERE active = 1{where} ORDER BY due", params)
+        return [row_to_reminder(row) for row in rows]
+
+    def pending_reminders(self) -> List[Tuple[Dict, datetime, Optional[str]]]:
+        """Every active reminder with its due time and owner, soonest first"""
+        rows = self.query("SELECT * FROM reminders WHERE active = 1 ORDER BY due")
+        return [(row_to_reminder(row), datetime.fromtimestamp(row["due"]), row["owner"]) for row in rows]
+
+    def due_reminders(self, until: datetime, limit: int = 100) -> List[Dict]:
+        rows = self.query(
+            "SELECT * FROM reminders WHERE active = 1 AND due <= ? ORDER BY due LIMIT ?",
+            (until.timestamp(), limit)
+        )
+        return [row_to_reminder(row) for row in rows]
+
+    def get_reminder(self, reminder_id: int, owner: Optional[str] = None) -> Optional[Dict]:
+        where, params = self._owned(owner)
+        rows = self.query(f"SELECT * FROM reminders WHERE id = ?{where}", (reminder_id,) + params)
+        return row_to_reminder(rows[0]) if rows else None
+
+    def deactivate_reminder(self, reminder_id: int):
+        self.write("UPDATE reminders SET active = 0 WHERE id = ?", (reminder_id,))
+
+    def claim_reminder(self, reminder_id: int) -> bool:
+        """Deactivate a reminder if it still is active; False if it was deleted or another worker got it"""
+        return self.write("UPDATE reminders SET active = 0 WHERE id = ? AND active = 1", (reminder_id,)).result() == 1
+
+    def undelivered_reminders(self, until: datetime, owner: Optional[str] = None, since: Optional[datetime] = None,
+                              limit: int = 100) -> List[Tuple[Dict, Optional[str]]]:
+        """Active reminders due by until (and after since), with their owners"""
+        where, params = self._owned(owner)
+        if since is not None:
+            where += " AND due > ?"
+            params += (since.timestamp(),)
+        rows = self.query(
+            f"SELECT * FROM reminders WHERE active = 1 AND due <= ?{where} ORDER BY due LIMIT ?",
+            (until.timestamp(),) + params + (limit,)
+        )
+        return [(row_to_reminder(row), row["owner"]) for row in rows]
+
+    # ----- messages -----
+
+    def add_message(self, recipient: str, content: str, owner: Optional[str] = None) -> Dict:
+        message_id = self.next_id("messages")
+        sent = datetime.now()
+        self.write(
+            "INSERT INTO messages (id, recipient, content, time, owner) VALUES (?, ?, ?, ?, ?)",
+            (message_id, recipient, content, sent.timestamp(), owner)
+        )
+        return message_dict(message_id, recipient, content, sent)
+
+    def messages(self, owner: Optional[str] = None) -> List[Dict]:
+        where, params = self._owned(owner)
+        rows = self.query(f"SELECT * FROM messages WHERE 1 = 1{where} ORDER BY id", params)
+        return [
+            message_dict(row["id"], row["recipient"], row["content"], datetime.fromtimestamp(row["time"]))
+            for row in rows
+        ]
+
+    # ----- conversations -----
+
+    def save_conversation(self, owner: str, state: Dict):
+        self.write(
+            "INSERT OR REPLACE INTO conversations (owner, state, updated) VALUES (?, ?, ?)",
+            (owner, json.dumps(state), datetime.now().timestamp())
+        )
+
+    def load_conversation(self, owner: str) -> Optional[Dict]:
+        rows = self.query("SELECT state FROM conversations WHERE owner = ?", (owner,))
+        return json.loads(rows[0]["state"]) if rows else None
+
+
+def reminder_dict(reminder_id: int, text: str, due: datetime, created: datetime, active: bool) -> Dict:
+    return {
+        "id": reminder_id,
+        "text": text,
+        "time": due.strftime("%Y-%m-%d %H:%M"),
+        "created": created.strftime("%Y-%m-%d %H:%M:%S"),
+        "active": active
+    }
+
+
+def row_to_reminder(row: sqlite3.Row) -> Dict:
+    return reminder_dict(
+        row["id"], row["text"], datetime.fromtimestamp(row["due"]),
+        datetime.fromtimestamp(row["created"]), bool(row["active"])
+    )
+
+
+def message_dict(message_id: int, recipient: str, content: str, sent: datetime) -> Dict:
+    return {
+        "id": message_id,
+        "recipient": recipient,
+        "content": content,
+        "time": sent.strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+store = Store()
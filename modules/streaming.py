@@ -0,0 +1,38 @@
+import re
+from typing import List, Optional
+
+
+# End of a sentence: terminal punctuation (optionally followed by a closing
+# quote/bracket) and whitespace, or a line break.
+_BOUNDARY = re.compile(r'(?<=[.!?])["\')\]]*\s+|\n+')
+
+
+class SentenceChunker:
+    """
+    Splits a stream of completion tokens into speakable sentences.
+
+    Sentences shorter than min_chars are merged with the next one so TTS
+    isn't called for fragments like "Sure." or "Dr."; anything left when the
+    stream ends is returned by flush().
+    """
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in _BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return rest or None
@@ -0,0 +1,203 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from .config import (
+    GROQ_STT_TIMEOUT, STT_LOCAL_MODEL, STT_LOCAL_COMPUTE_TYPE, STT_LOCAL_WORKERS,
+    STT_LOCAL_CPU_THREADS, STT_LOCAL_BEAM_SIZE, STT_LANGUAGE, STT_BATCH_SIZE, STT_BATCH_WINDOW_MS,
+)
+
+log = logging.getLogger(__name__)
+
+
+class STTBackend:
+    """Speech-to-text engine behind AIVoiceAssistant.process_audio"""
+
+    name = "base"
+
+    async def start(self):
+        """Load models / open connections before the first request"""
+
+    async def close(self):
+        pass
+
+    async def transcribe(self, audio_file: io.BytesIO) -> str:
+        """Transcribe a named in-memory clip (webm, wav, ...)"""
+        raise NotImplementedError
+
+
+class GroqSTT(STTBackend):
+    """Remote whisper-large-v3 on the shared Groq client"""
+
+    name = "groq"
+
+    def __init__(self, model: str = "whisper-large-v3"):
+        self.model = model
+
+    async def transcribe(self, audio_file: io.BytesIO) -> str:
+        from .groq_client import get_client, groq_slots
+
+        async with groq_slots:
+            return await get_client().audio.transcriptions.create(
+                model=self.model,
+                file=audio_file,
+                response_format="text",
+                timeout=GROQ_STT_TIMEOUT
+            )
+
+
+class LocalWhisperSTT(STTBackend):
+    """
+    Offline transcription with a quantized faster-whisper model on the CPU.
+
+    The model is loaded and warmed up once in start() and shared by a fixed
+    pool of worker threads (CTranslate2 runs generate() calls from different
+    threads in parallel when created with num_workers). Requests that arrive
+    within batch_window_ms of each other are decoded together: clips up to
+    30 s are padded into a single encoder/decoder batch, longer ones fall back
+    to the model's regular segmenting transcribe().
+    """
+
+    name = "local"
+
+    def __init__(self, model_size: str = STT_LOCAL_MODEL, compute_type: str = STT_LOCAL_COMPUTE_TYPE,
+                 workers: int = STT_LOCAL_WORKERS, cpu_threads: int = STT_LOCAL_CPU_THREADS,
+                 beam_size: int = STT_LOCAL_BEAM_SIZE, language: str = STT_LANGUAGE,
+                 batch_size: int = STT_BATCH_SIZE, batch_window_ms: int = STT_BATCH_WINDOW_MS):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.workers = workers
+        self.cpu_threads = cpu_threads
+        self.beam_size = beam_size
+        self.language = language
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000
+
+        self._model = None
+        self._tokenizer = None
+        self._prompt = None
+        self._pool = None
+        self._queue = None
+        self._batcher = None
+        self._free_workers = None
+
+    async def start(self):
+        if self._model is not None:
+            return
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stt")
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._pool, self._load)
+        self._queue = asyncio.Queue()
+        self._free_workers = asyncio.Semaphore(self.workers)
+        self._batcher = asyncio.create_task(self._batch_loop())
+
+    def _load(self):
+        import numpy as np
+        from faster_whisper import WhisperModel
+        from faster_whisper.tokenizer import Tokenizer
+
+        log.info("Loading local STT model '%s' (%s, %d worker(s))", self.model_size, self.compute_type, self.workers)
+        self._model = WhisperModel(
+            self.model_size,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+            num_workers=self.workers
+        )
+        self._tokenizer = Tokenizer(
+            self._model.hf_tokenizer,
+            self._model.model.is_multilingual,
+            task="transcribe",
+            language=self.language
+        )
+        self._prompt = self._model.get_prompt(self._tokenizer, [], without_timestamps=True)
+
+        # Warm-up pass so the first real request doesn't pay for lazy initialization
+        self._decode([np.zeros(self._model.feature_extractor.sampling_rate, dtype=np.float32)])
+        log.info("Local STT model ready")
+
+    async def close(self):
+        if self._batcher:
+            self._batcher.cancel()
+            await asyncio.gather(self._batcher, return_exceptions=True)
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._model = None
+        self._batcher = None
+        self._pool = None
+
+    async def transcribe(self, audio_file: io.BytesIO) -> str:
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((audio_file, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            batch = [(clip, future) for clip, future in batch if not future.done()]
+            if batch:
+                await self._free_workers.acquire()
+                asyncio.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        loop = asyncio.get_running_loop()
+        try:
+            texts = await loop.run_in_executor(self._pool, self._transcribe_batch, [clip for clip, _ in batch])
+            for (_, future), text in zip(batch, texts):
+                if not future.done():
+                    future.set_result(text)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._free_workers.release()
+
+    def _transcribe_batch(self, clips: List[io.BytesIO]) -> List[str]:
+        from faster_whisper.audio import decode_audio
+
+        sampling_rate = self._model.feature_extractor.sampling_rate
+        audios = [decode_audio(clip, sampling_rate=sampling_rate) for clip in clips]
+        window = self._model.feature_extractor.n_samples
+
+        texts = [None] * len(audios)
+        short = [i for i, audio in enumerate(audios) if len(audio) <= window]
+        if short:
+            for i, text in zip(short, self._decode([audios[i] for i in short])):
+                texts[i] = text
+        for i, audio in enumerate(audios):
+            if texts[i] is None:
+                segments, _ = self._model.transcribe(audio, language=self.language, beam_size=self.beam_size)
+                texts[i] = "".join(segment.text for segment in segments).strip()
+        return texts
+
+    def _decode(self, audios) -> List[str]:
+        """One batched encoder + decoder pass over clips of at most 30 s"""
+        import numpy as np
+        from faster_whisper.audio import pad_or_trim
+
+        features = np.stack([pad_or_trim(self._model.feature_extractor(audio)[..., :-1]) for audio in audios])
+        encoder_output = self._model.encode(features)
+        results = self._model.model.generate(
+            encoder_output,
+            [self._prompt] * len(audios),
+            beam_size=self.beam_size,
+            max_length=self._model.max_length,
+            suppress_blank=True,
+            suppress_tokens=[-1]
+        )
+        return [self._tokenizer.decode(result.sequences_ids[0]).strip() for result in results]
+
+
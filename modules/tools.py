@@ -53,3 +53,27 @@ function_map = {
     "get_current_date": get_current_date
 }
 
+# How the assistant treats each tool's result:
+#   direct_reply   - the result's "message" is a complete spoken answer, so
+#                    the turn ends there instead of asking the LLM to phrase it
+#   side_effects   - the call changes something; turns using it are never cached
+#   time_dependent - the result goes stale (clock, stored data); never cached
+tool_policies = {
+    "set_reminder": {"direct_reply": True, "side_effects": True},
+    "send_message": {"direct_reply": True, "side_effects": True},
+    "play_youtube": {"direct_reply": True, "side_effects": True},
+    "get_reminders": {"direct_reply": False, "time_dependent": True},   # the model reads out the list
+    "get_messages": {"direct_reply": False, "time_dependent": True},
+    "delete_reminder": {"direct_reply": True, "side_effects": True},
+    "get_current_time": {"direct_reply": True, "time_dependent": True},
+    "get_current_date": {"direct_reply": True, "time_dependent": True}
+}
+
+# Seconds each tool may run before its call is answered with a timeout
+# error (TOOL_TIMEOUT for tools not listed). Tools may be plain functions,
+# which run in a worker thread, or coroutine functions, awaited on the loop.
+tool_timeouts = {
+    "play_youtube": 5.0,
+    "get_current_time": 2.0,
+    "get_current_date": 2.0
+}
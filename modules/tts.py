@@ -1,25 +1,196 @@
-import io
+import asyncio
+import logging
 import os
-import threading
-import pyttsx3
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List
+from . import backends
+from .codec import cache_format, transcoder
+from .config import TTS_BACKEND, TTS_WORKERS, TTS_QUEUE_SIZE, TTS_RATE, TTS_VOICE, TTS_CACHE_ENTRIES
+from .metrics import span
+from .tts_cache import TTSCache
+from .turn_scheduler import turn_scheduler
+
+log = logging.getLogger(__name__)
+
+
+# Each worker process owns its own pyttsx3 engine, created on first use
+tts_engine = None
+
+
+def _init_engine():
+    global tts_engine
+    import pyttsx3
+    tts_engine = pyttsx3.init()
+    if TTS_RATE:
+        tts_engine.setProperty("rate", TTS_RATE)
+    if TTS_VOICE:
+        tts_engine.setProperty("voice", TTS_VOICE)
 
-tts_engine = pyttsx3.init()
-tts_lock = threading.Lock()
 
 def text_to_speech(text: str) -> bytes:
-    """Convert text to speech using pyttsx3"""
+    """Convert text to speech using this process's pyttsx3 engine"""
+    temp_file = None
     try:
-        with tts_lock:
-            temp_file = "tts_output.wav"
-            tts_engine.save_to_file(text, temp_file)
-            tts_engine.runAndWait()
+        if tts_engine is None:
+            _init_engine()
 
-            with open(temp_file, "rb") as f:
-                audio_bytes = f.read()
+        # pyttsx3 can only render to a file; give every call its own
+        fd, temp_file = tempfile.mkstemp(suffix=".wav", prefix="tts_")
+        os.close(fd)
+        tts_engine.save_to_file(text, temp_file)
+        tts_engine.runAndWait()
 
-            os.remove(temp_file)
-            return audio_bytes
+        with open(temp_file, "rb") as f:
+            return f.read()
 
     except Exception as e:
-        print(f"pyttsx3 TTS Error: {e}")
+        log.error("pyttsx3 TTS error: %s", e)
         return b""
+    finally:
+        if temp_file and os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def pyttsx3_backend():
+    return text_to_speech
+
+
+class TTSService:
+    """
+    Async front end for speech synthesis.
+
+    Requests wait in a bounded queue (synthesize() blocks while it is full)
+    and are handed to a pool of worker processes, each running its own
+    engine, so synthesis never runs on the event loop. If the caller is
+    cancelled - e.g. its client disconnected - a request that hasn't started
+    yet is dropped instead of synthesized.
+
+    Engines produce WAV; a codec other than "wav" is then encoded by the
+    transcoder's own pool, after the TTS slot is released. Finished audio
+    goes into a TTSCache under its codec, so repeated phrases skip both
+    steps. synthesize_fn defaults to the TTS_BACKEND from the backend registry.
+    """
+
+    def __init__(self, workers: int = TTS_WORKERS, queue_size: int = TTS_QUEUE_SIZE,
+                 synthesize_fn=None, use_processes: bool = True,
+                 cache: TTSCache = None, voice: str = TTS_VOICE, rate: int = TTS_RATE):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.synthesize_fn = synthesize_fn
+        self.use_processes = use_processes
+        self.cache = cache
+        self.voice = voice
+        self.rate = rate
+        self._queue = None
+        self._pool = None
+        self._dispatchers = []
+
+    def start(self):
+        if self._queue is not None:
+            return
+        if self.synthesize_fn is None:
+            self.synthesize_fn = backends.create("tts", TTS_BACKEND)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._pool = self._new_pool()
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+        log.info("TTS service started with %d worker(s)", self.workers)
+
+    def _new_pool(self):
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tts")
+
+    async def close(self):
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self._queue = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def synthesize(self, text: str, codec: str = "wav") -> bytes:
+        """
+        Return speech for text encoded as codec (b"" if synthesis failed);
+        WAV if encoding failed, which every client can play
+        """
+        key = None
+        if self.cache:
+            key = self.cache.key(text, self.voice, self.rate, cache_format(codec))
+            audio = await self._cached(key)
+            if audio is not None:
+                return audio
+            self.cache.miss()
+
+        # Another client may have had the same phrase as WAV: encode that instead
+        # (not counted: this request is already a miss)
+        wav = None
+        if self.cache and codec != "wav":
+            wav = await self._cached(self.cache.key(text, self.voice, self.rate, "wav"), count=False)
+
+        if wav is None:
+            # Cache hits above don't take a TTS slot; misses share them fairly across sessions
+            async with turn_scheduler.tts.slot():
+                with span("tts"):
+                    wav = await self._synthesize_uncached(text)
+
+        audio = await transcoder.encode(wav, codec)
+
+        # A clip that fell back to WAV isn't cached as codec, so the next request retries
+        if key and audio and (codec == "wav" or audio is not wav):
+            self.cache.put(key, audio)
+            if self.cache.disk_dir:
+                await asyncio.to_thread(self.cache.put_on_disk, key, audio)
+        return audio
+
+    async def _cached(self, key: str, count: bool = True):
+        audio = self.cache.get(key, count)
+        if audio is None and self.cache.disk_dir:
+            audio = await asyncio.to_thread(self.cache.get_from_disk, key, count)
+        return audio
+
+    async def _synthesize_uncached(self, text: str) -> bytes:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+    async def prewarm(self, phrases: List[str], codec: str = "wav"):
+        """Synthesize phrases in the background so their first use is a cache hit"""
+        if not self.cache:
+            return
+        for phrase in phrases:
+            await self.synthesize(phrase, codec)
+        log.info("TTS cache prewarmed with %d phrase(s): %s", len(phrases), self.cache.stats())
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            text, future = await self._queue.get()
+            if future.done():
+                continue    # caller went away while queued
+            try:
+                audio = await loop.run_in_executor(self._pool, self.synthesize_fn, text)
+            except BrokenProcessPool:
+                log.error("TTS worker died, restarting pool")
+                self._pool = self._new_pool()
+                audio = b""
+            except Exception as e:
+                log.error("TTS worker failed: %s", e)
+                audio = b""
+            if not future.done():
+                future.set_result(audio)
+
+
+tts_service = TTSService(cache=TTSCache() if TTS_CACHE_ENTRIES > 0 else None)
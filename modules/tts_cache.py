@@ -0,0 +1,174 @@
+import hashlib
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from .config import (
+    TTS_CACHE_ENTRIES, TTS_CACHE_MEMORY_BYTES, TTS_CACHE_DIR, TTS_CACHE_DISK_BYTES,
+    TTS_PREWARM_PHRASES,
+)
+
+log = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Collapse the differences that don't change what gets spoken"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class TTSCache:
+    """
+    Content-addressed cache of synthesized audio.
+
+    Entries are keyed by a hash of (normalized text, voice, rate, format).
+    The memory tier is an LRU bounded by entry count and bytes; the optional
+    disk tier keeps one file per key under disk_dir, evicting the least
+    recently used files once disk_max_bytes is exceeded. get() only touches
+    memory so it is safe to call on the event loop; the *_disk methods do
+    file IO and belong in a thread.
+    """
+
+    def __init__(self, max_entries: int = TTS_CACHE_ENTRIES, max_bytes: int = TTS_CACHE_MEMORY_BYTES,
+                 disk_dir: Optional[str] = TTS_CACHE_DIR, disk_max_bytes: int = TTS_CACHE_DISK_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory = OrderedDict()    # key -> audio bytes
+        self._memory_bytes = 0
+        self._disk = OrderedDict()      # key -> file size
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def key(text: str, voice: Optional[str], rate: int, fmt: str) -> str:
+        raw = "\x1f".join([normalize_text(text), voice or "", str(rate or ""), fmt])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ----- memory tier -----
+
+    def get(self, key: str, count: bool = True) -> Optional[bytes]:
+        """count=False looks up without recording a hit (a secondary lookup for the same request)"""
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is None:
+                return None
+            self._memory.move_to_end(key)
+            if count:
+                self.hits += 1
+            return audio
+
+    def put(self, key: str, audio: bytes):
+        if not audio or len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = audio
+            self._memory_bytes += len(audio)
+            while len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    # ----- disk tier -----
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.audio")
+
+    def _load_disk_index(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".audio"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((stat.st_mtime, name[:-len(".audio")], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def get_from_disk(self, key: str, count: bool = True) -> Optional[bytes]:
+        if not self.disk_dir or key not in self._disk:
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            with self._lock:
+                self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+        with self._lock:
+            if key in self._disk:
+                self._disk.move_to_end(key)
+            if count:
+                self.disk_hits += 1
+        self.put(key, audio)
+        return audio
+
+    def put_on_disk(self, key: str, audio: bytes):
+        if not self.disk_dir or not audio or len(audio) > self.disk_max_bytes or key in self._disk:
+            return
+        tmp = self._path(key) + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(audio)
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            log.warning("TTS cache write failed: %s", e)
+            return
+        with self._lock:
+            self._disk[key] = len(audio)
+            self._disk_bytes += len(audio)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        while True:
+            with self._lock:
+                if self._disk_bytes <= self.disk_max_bytes or not self._disk:
+                    return
+                key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+
+def common_phrases() -> List[str]:
+    """Spoken replies worth having cached before the first client asks"""
+    from .function import get_current_date
+
+    phrases = [f"You have {n} active reminder(s)" for n in range(6)]
+    phrases += [f"You have {n} message(s)" for n in range(6)]
+    phrases.append(get_current_date()["message"])
+    phrases += TTS_PREWARM_PHRASES
+    return phrases
@@ -0,0 +1,117 @@
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict, deque
+from typing import Dict
+from .config import STT_CONCURRENCY, LLM_CONCURRENCY, TOOL_CONCURRENCY, TTS_CONCURRENCY, STAGE_QUEUE_SIZE
+from .metrics import STAGE_WAIT_SECONDS
+from .session import current_session
+
+
+class StageBusy(Exception):
+    """A stage's queue is full; the request is rejected instead of queued"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Server is busy ({stage} queue full), please try again in a moment.")
+        self.stage = stage
+
+
+class Stage:
+    """
+    Concurrency limit for one pipeline stage, shared by every session.
+
+    Up to `concurrency` holders run at once. Waiters queue per session and
+    free slots go round-robin across sessions, so one client with many
+    queued jobs can't starve the others. When `queue_size` jobs are already
+    waiting, slot() raises StageBusy. A waiter that is cancelled (e.g. its
+    client disconnected) leaves the queue; a holder that is cancelled frees
+    its slot on the way out.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int = STAGE_QUEUE_SIZE):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._active = 0
+        self._waiting = OrderedDict()   # session -> deque of futures, in round-robin order
+        self._waiting_count = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, session=None):
+        await self.acquire(session if session is not None else current_session.get())
+        try:
+            yield
+        finally:
+            self.completed += 1
+            self.release()
+
+    async def acquire(self, session):
+        if self._active < self.concurrency and not self._waiting_count:
+            self._active += 1
+            STAGE_WAIT_SECONDS.observe(0.0, stage=self.name)
+            return
+        if self._waiting_count >= self.queue_size:
+            self.rejected += 1
+            raise StageBusy(self.name)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(session, deque()).append(future)
+        self._waiting_count += 1
+        queued = time.monotonic()
+        try:
+            await future
+            STAGE_WAIT_SECONDS.observe(time.monotonic() - queued, stage=self.name)
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()      # granted just as we were cancelled
+            else:
+                self._forget(session, future)
+            raise
+
+    def release(self):
+        self._active -= 1
+        while self._active < self.concurrency and self._waiting_count:
+            session, queue = next(iter(self._waiting.items()))
+            future = queue.popleft()
+            self._waiting_count -= 1
+            if queue:
+                self._waiting.move_to_end(session)
+            else:
+                del self._waiting[session]
+            self._active += 1
+            future.set_result(None)
+
+    def _forget(self, session, future):
+        queue = self._waiting.get(session)
+        if queue and future in queue:
+            queue.remove(future)
+            self._waiting_count -= 1
+            if not queue:
+                del self._waiting[session]
+
+    def stats(self) -> Dict:
+        return {
+            "active": self._active,
+            "waiting": self._waiting_count,
+            "waiting_sessions": len(self._waiting),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+class TurnScheduler:
+    """The server-wide stages every turn passes through"""
+
+    def __init__(self):
+        self.stt = Stage("stt", STT_CONCURRENCY)
+        self.llm = Stage("llm", LLM_CONCURRENCY)
+        self.tools = Stage("tools", TOOL_CONCURRENCY)
+        self.tts = Stage("tts", TTS_CONCURRENCY)
+
+    def stats(self) -> Dict:
+        return {stage.name: stage.stats() for stage in (self.stt, self.llm, self.tools, self.tts)}
+
+
+turn_scheduler = TurnScheduler()
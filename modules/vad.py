@@ -0,0 +1,140 @@
+import math
+import struct
+import sys
+from array import array
+from collections import deque
+from typing import Optional
+
+
+def pcm_rms(frame: bytes) -> float:
+    """Root-mean-square energy of 16-bit little-endian mono PCM"""
+    samples = array("h", frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+def wav_header(data_bytes: int, sample_rate: int) -> bytes:
+    """44-byte RIFF header for data_bytes of 16-bit mono PCM"""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_bytes
+    )
+
+
+class EnergyEndpointer:
+    """
+    Finds the end of an utterance in a stream of 16-bit mono PCM.
+
+    Uses the same energy model as speech_recognition.Recognizer.listen():
+    a frame is speech when its RMS exceeds energy_threshold, and while no
+    one is speaking the threshold drifts towards ambient noise * ratio if
+    dynamic_energy_threshold is on. An utterance starts at the first speech
+    frame (plus non_speaking_duration of pre-roll) and closes after
+    pause_threshold seconds of silence, or at max_seconds.
+    """
+
+    def __init__(self, sample_rate: int = 16000, energy_threshold: float = 300,
+                 dynamic_energy_threshold: bool = True, dynamic_energy_adjustment_damping: float = 0.15,
+                 dynamic_energy_ratio: float = 1.5, pause_threshold: float = 0.8,
+                 non_speaking_duration: float = 0.5, min_speech_seconds: float = 0.2,
+                 max_seconds: float = 30.0, frame_ms: int = 30):
+        self.sample_rate = sample_rate
+        self.energy_threshold = energy_threshold
+        self.dynamic_energy_threshold = dynamic_energy_threshold
+        self.dynamic_energy_ratio = dynamic_energy_ratio
+        self.frame_seconds = frame_ms / 1000
+        self.frame_bytes = int(sample_rate * self.frame_seconds) * 2
+        if self.frame_bytes <= 0:
+            raise ValueError(f"sample_rate {sample_rate} Hz is too low for {frame_ms} ms frames")
+        self.damping = dynamic_energy_adjustment_damping ** self.frame_seconds
+
+        self.pause_frames = math.ceil(pause_threshold / self.frame_seconds)
+        self.min_speech_frames = math.ceil(min_speech_seconds / self.frame_seconds)
+        self.max_frames = int(max_seconds / self.frame_seconds)
+
+        self._pending = bytearray()
+        self._preroll = deque(maxlen=max(1, math.ceil(non_speaking_duration / self.frame_seconds)))
+        self._frames = []
+        self._speech_frames = 0
+        self._silent_frames = 0
+
+    @classmethod
+    def from_recognizer(cls, recognizer, sample_rate: int, **kwargs) -> "EnergyEndpointer":
+        """Build an endpointer with a speech_recognition.Recognizer's settings"""
+        return cls(
+            sample_rate=sample_rate,
+            energy_threshold=recognizer.energy_threshold,
+            dynamic_energy_threshold=recognizer.dynamic_energy_threshold,
+            dynamic_energy_adjustment_damping=recognizer.dynamic_energy_adjustment_damping,
+            dynamic_energy_ratio=recognizer.dynamic_energy_ratio,
+            pause_threshold=recognizer.pause_threshold,
+            non_speaking_duration=recognizer.non_speaking_duration,
+            **kwargs
+        )
+
+    @property
+    def in_speech(self) -> bool:
+        return bool(self._frames)
+
+    @property
+    def buffered_bytes(self) -> int:
+        return len(self._pending) + sum(map(len, self._frames)) + sum(map(len, self._preroll))
+
+    def feed(self, pcm: bytes) -> Optional[bytes]:
+        """Add PCM; returns the utterance's PCM once it has ended, else None"""
+        self._pending += pcm
+        utterance = None
+        offset = 0
+        while len(self._pending) - offset >= self.frame_bytes:
+            frame = bytes(self._pending[offset:offset + self.frame_bytes])
+            offset += self.frame_bytes
+            utterance = self._process(frame) or utterance
+        del self._pending[:offset]
+        return utterance
+
+    def finish(self) -> Optional[bytes]:
+        """The stream ended: return whatever speech was collected"""
+        if self._pending and self._frames:
+            self._frames.append(bytes(self._pending))
+        self._pending.clear()
+        return self._close()
+
+    def _process(self, frame: bytes) -> Optional[bytes]:
+        energy = pcm_rms(frame)
+        is_speech = energy > self.energy_threshold
+
+        if not self._frames:
+            if not is_speech:
+                if self.dynamic_energy_threshold:
+                    target = energy * self.dynamic_energy_ratio
+                    self.energy_threshold = self.energy_threshold * self.damping + target * (1 - self.damping)
+                self._preroll.append(frame)
+                return None
+            self._frames = list(self._preroll)
+            self._preroll.clear()
+
+        self._frames.append(frame)
+        if is_speech:
+            self._speech_frames += 1
+            self._silent_frames = 0
+        else:
+            self._silent_frames += 1
+
+        if self._silent_frames >= self.pause_frames or len(self._frames) >= self.max_frames:
+            return self._close()
+        return None
+
+    def _close(self) -> Optional[bytes]:
+        frames, speech, silent = self._frames, self._speech_frames, self._silent_frames
+        self._frames = []
+        self._speech_frames = 0
+        self._silent_frames = 0
+        if speech < self.min_speech_frames:
+            return None
+        # Keep a little of the trailing silence so the last word isn't clipped
+        return b"".join(frames[:len(frames) - max(0, silent - 3)])
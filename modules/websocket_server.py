@@ -1,208 +1,573 @@
 import asyncio
-import json
 import base64
+import json
+import logging
+import time
+import websockets
+from . import backends
 from .assistant import AIVoiceAssistant
-from .tts import text_to_speech
-from .function import reminders
-from .tools import tools, function_map
-from datetime import datetime, timedelta   # <-- Add this
-
+from .codec import transcoder
+from .config import (
+    STREAM_RESPONSES, INBOX_SIZE, MAX_MESSAGE_BYTES, SESSION_AUDIO_BYTES, TTS_PREWARM, BARGE_IN,
+    MAX_UTTERANCE_SECONDS, MIN_SPEECH_SECONDS, MIN_SAMPLE_RATE, MAX_SAMPLE_RATE,
+    LOG_LEVEL, METRICS_PORT, STT_BACKEND, LLM_BACKEND, TTS_BACKEND, WORKERS, WORKER_INDEX, REMINDER_POLL_SECONDS,
+)
+from .conversation import Conversation
+from .memory import memory_tracer, rss_bytes
+from .metrics import registry, turn_span, MetricsServer, MESSAGES, STARTUP_SECONDS
+from .protocol import decode_frame, negotiate
+from .scheduler import reminder_scheduler
+from .session import Session, current_session
+from .stt import STTBackend
+from .streaming import SentenceChunker
+from .tts import tts_service
+from .tts_cache import common_phrases
+from .vad import EnergyEndpointer
+from .function import load_reminders, claim_reminder, due_reminders
+from .store import store
+from .turn_scheduler import turn_scheduler, StageBusy
+
+
+log = logging.getLogger(__name__)
 
 SYSTEM_PROMPT = """Your system prompt here..."""
 
 assistant = AIVoiceAssistant()
 
-
-async def check_reminders_background(websocket):
-    """Background task to check and trigger reminders"""
+# Connected sessions and their inboxes, for the gauges below
+sessions = {}
+
+# Conversation summaries running in the background
+folds = set()
+
+INTERRUPTS = registry.counter("voice_interrupts_total", "Turns cut short by barge-in")
+AUDIO_REJECTED = registry.counter("voice_audio_rejected_total",
+                                  "Recordings refused: the client already had SESSION_AUDIO_BYTES in flight")
+
+
+async def deliver_reminder(session, reminder):
+    """Send a due reminder, and its speech, to one client"""
+    await session.send_json({
+        'type': 'reminder',
+        'data': {
+            'message': f"⏰ Reminder: {reminder['text']}",
+            'reminder': reminder
+        }
+    })
+
+    audio_content = await tts_service.synthesize(f"Reminder: {reminder['text']}", session.audio_codec)
+    if audio_content:
+        await session.send_audio({'type': 'audio_response'}, audio_content)
+
+
+def update_conversation(session, text, response):
+    """Append the finished turn to the history, trimmed to the token budget"""
+    conversation = session.conversation
+    conversation.add_turn(text, response)
+    log.info("Conversation history: %d messages, ~%d tokens", len(conversation), conversation.tokens)
+
+    save_conversation(session)
+
+    # Summarizing trimmed turns costs an LLM call; keep it off the reply path
+    if conversation.needs_fold:
+        fold = asyncio.create_task(conversation.fold(assistant.summarize))
+        # The loop only holds weak references to tasks: keep it alive until done
+        folds.add(fold)
+        fold.add_done_callback(folds.discard)
+        fold.add_done_callback(lambda _: save_conversation(session))
+
+
+def save_conversation(session):
+    """Keep the history in the store, so the client carries on after reconnecting to any worker"""
+    if session.identified:
+        store.save_conversation(session.client_id, session.conversation.state())
+
+
+async def restore_conversation(session):
+    state = await asyncio.to_thread(store.load_conversation, session.client_id)
+    if state and not len(session.conversation):
+        session.conversation.restore(state)
+        log.info("Restored %d messages of conversation for %s", len(session.conversation), session.client_id)
+
+
+async def respond(session, text, stream=False):
+    """Run one AI turn for text and send the reply (and its speech) to the client"""
+    if stream and STREAM_RESPONSES:
+        await stream_response(session, text)
+        return
+
+    log.debug("Sending text to AI for processing")
+    response = await assistant.process_command(text, session.conversation.messages())
+    log.info("AI response: %s", response['message'])
+
+    update_conversation(session, text, response)
+
+    await session.send_json({
+        'type': 'response',
+        'data': response
+    })
+    log.debug("AI response sent to client")
+
+    # Generate and send speech audio
+    if response['message']:
+        audio_content = await tts_service.synthesize(response['message'], session.audio_codec)
+        if audio_content:
+            await session.send_audio({'type': 'audio_response'}, audio_content)
+            log.debug("TTS audio sent to client")
+
+
+async def stream_response(session, text):
+    """
+    Streaming turn: forward completion tokens as response_delta messages and
+    speak the reply sentence by sentence, so the first audio_chunk goes out
+    while the model is still generating the rest.
+    """
+    sentences = asyncio.Queue()
+
+    async def speak():
+        seq = 0
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                break
+            audio_content = await tts_service.synthesize(sentence, session.audio_codec)
+            if audio_content:
+                await session.send_audio({'type': 'audio_chunk', 'seq': seq, 'text': sentence}, audio_content)
+                seq += 1
+        await session.send_json({'type': 'audio_end', 'chunks': seq})
+
+    speaker = asyncio.create_task(speak())
+    chunker = SentenceChunker()
+    response = None
+    try:
+        async for kind, value in assistant.stream_command(text, session.conversation.messages()):
+            if kind == "delta":
+                await session.send_json({'type': 'response_delta', 'text': value})
+                for sentence in chunker.feed(value):
+                    sentences.put_nowait(sentence)
+            else:
+                response = value
+
+        if response["status"] == "success":
+            tail = chunker.flush()
+            if tail:
+                sentences.put_nowait(tail)
+        sentences.put_nowait(None)
+
+        log.info("AI response: %s", response['message'])
+        update_conversation(session, text, response)
+
+        await session.send_json({
+            'type': 'response',
+            'data': response,
+            'streamed': True
+        })
+        log.debug("AI response sent to client")
+        await speaker
+    finally:
+        speaker.cancel()
+
+
+def server_stats():
+    """Hit/miss counters of the server's caches and fast paths"""
+    return {
+        'intent_router': assistant.router.stats() if assistant.router else None,
+        'response_cache': assistant.response_cache.stats() if assistant.response_cache else None,
+        'tts_cache': tts_service.cache.stats() if tts_service.cache else None,
+        'stages': turn_scheduler.stats(),
+    }
+
+
+def session_memory_totals():
+    totals = {}
+    for session in sessions:
+        for kind, size in session.memory().items():
+            totals[(kind,)] = totals.get((kind,), 0) + size
+    return totals
+
+
+def register_metrics():
+    """Gauges read from live server state at scrape time"""
+    registry.gauge("voice_sessions", "Connected clients", fn=lambda: len(sessions))
+    registry.gauge("voice_inbox_depth", "Turns queued across all sessions",
+                   fn=lambda: sum(inbox.qsize() for inbox in sessions.values()))
+    registry.gauge("voice_outbox_frames", "Frames queued to be sent across all sessions",
+                   fn=lambda: sum(len(session.outbox) for session in sessions))
+    registry.gauge("voice_outbox_bytes", "Bytes queued to be sent across all sessions",
+                   fn=lambda: sum(session.outbox.queued_bytes for session in sessions))
+    registry.gauge("voice_session_memory_bytes", "Accounted memory of all sessions", ["kind"],
+                   fn=lambda: session_memory_totals())
+    registry.gauge("voice_process_rss_bytes", "Resident memory of this server process", fn=rss_bytes)
+    registry.gauge("voice_stage_active", "Stage slots in use", ["stage"],
+                   fn=lambda: {(name,): s['active'] for name, s in turn_scheduler.stats().items()})
+    registry.gauge("voice_stage_waiting", "Requests queued for a stage slot", ["stage"],
+                   fn=lambda: {(name,): s['waiting'] for name, s in turn_scheduler.stats().items()})
+    registry.gauge("voice_stage_rejected_total", "Requests refused with 'busy'", ["stage"], kind="counter",
+                   fn=lambda: {(name,): s['rejected'] for name, s in turn_scheduler.stats().items()})
+    registry.gauge("voice_tts_pending", "Synthesis requests waiting for a worker", fn=lambda: tts_service.pending)
+
+    caches = {}
+    if tts_service.cache:
+        caches['tts'] = tts_service.cache.stats
+    if assistant.response_cache:
+        caches['response'] = assistant.response_cache.stats
+    if assistant.router:
+        caches['intent_router'] = assistant.router.stats
+    registry.gauge("voice_cache_lookups_total", "Cache and fast-path lookups", ["cache", "result"], kind="counter",
+                   fn=lambda: {
+                       (name, result): stats()[result]
+                       for name, stats in caches.items() for result in ('hits', 'misses')
+                   })
+
+
+AUDIO_MESSAGES = ('audio', 'audio_stream')
+
+
+async def client_sample_rate(session, data):
+    """The message's sample_rate, or None after telling the client it is out of range"""
+    try:
+        sample_rate = int(data.get('sample_rate', 16000))
+    except (TypeError, ValueError):
+        sample_rate = 0
+    if MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+        return sample_rate
+    await session.send_json({
+        'type': 'error',
+        'message': f"sample_rate must be {MIN_SAMPLE_RATE}-{MAX_SAMPLE_RATE} Hz"
+    })
+    return None
+
+
+def parse_message(message):
+    """Split an incoming frame into (message dict, audio payload or None); ValueError if malformed"""
+    if isinstance(message, bytes):
+        # Protocol 2 binary frame: JSON header followed by raw audio
+        data, payload = decode_frame(message)
+    else:
+        data = json.loads(message)
+        payload = data.get('audio') if isinstance(data, dict) else None
+    if not isinstance(data, dict):
+        raise ValueError("Message is not a JSON object")
+    # Only audio messages carry audio; 'audio' in hello is the list of codecs the client plays
+    return data, payload if data.get('type') in AUDIO_MESSAGES else None
+
+
+async def handle_message(session, data, audio):
+    """Process one client message (audio or text) through to the reply"""
+    try:
+        log.debug("Received message type=%s", data.get('type'))
+        MESSAGES.inc(type=data.get('type'))
+
+        if data['type'] == 'hello':
+            session.protocol = negotiate(data.get('protocol', 1))
+            session.audio_codec = transcoder.negotiate(data.get('audio'))
+            if data.get('client_id'):
+                reminder_scheduler.unregister(session, session.client_id)
+                session.client_id = str(data['client_id'])
+                session.identified = True
+                reminder_scheduler.register(session, session.client_id)
+                await restore_conversation(session)
+            await session.send_json({'type': 'hello', 'protocol': session.protocol, 'audio': session.audio_codec})
+            log.info("Client speaks protocol %d, gets %s audio", session.protocol, session.audio_codec)
+
+        elif data['type'] == 'stats':
+            await session.send_json({'type': 'stats', 'data': server_stats()})
+
+        elif data['type'] == 'audio':
+            sample_rate = await client_sample_rate(session, data)
+            if sample_rate is None:
+                return
+            with turn_span('audio'):
+                # Process audio to text
+                text = await assistant.process_audio(audio, data.get('format', 'webm'), sample_rate)
+                log.info("Recognized text: %s", text)
+
+                # Check if transcription was successful
+                if text and not text.startswith("[ERROR]") and not text.startswith("[WARN]"):
+                    # Send transcription
+                    await session.send_json({
+                        'type': 'transcription',
+                        'text': text
+                    })
+
+                    await respond(session, text, data.get('stream', False))
+                else:
+                    # Send error to client
+                    log.warning("Audio processing failed: %s", text)
+                    await session.send_json({
+                        'type': 'error',
+                        'message': 'Could not process audio. Please try again.'
+                    })
+
+        elif data['type'] == 'text':
+            with turn_span('text'):
+                text = data['text']
+                log.info("User message: %s", text)
+
+                await respond(session, text, data.get('stream', False))
+
+    except StageBusy as e:
+        log.warning("Rejected %s message: %s", data.get('type'), e)
+        await session.send_json({
+            'type': 'error',
+            'code': 'busy',
+            'message': str(e)
+        })
+    except Exception as e:
+        log.exception("Processing message failed: %s", e)
+        await session.send_json({
+            'type': 'error',
+            'message': str(e)
+        })
+
+
+def payload_bytes(audio) -> int:
+    return len(audio) if audio is not None else 0
+
+
+async def queue_message(session, inbox, data, audio):
+    """
+    Queue a message for process_messages(), counting its audio against the
+    session's SESSION_AUDIO_BYTES; a recording over the limit is refused
+    with an error rather than buffered
+    """
+    size = payload_bytes(audio)
+    if size and session.audio_bytes + size > SESSION_AUDIO_BYTES:
+        AUDIO_REJECTED.inc()
+        log.warning("Refused %d bytes of audio from %s: %d already in flight",
+                    size, session.remote_address, session.audio_bytes)
+        await session.send_json({
+            'type': 'error',
+            'code': 'too_large',
+            'message': 'Too much audio waiting to be processed. Please try again shortly.'
+        })
+        return
+    session.audio_bytes += size
+    await inbox.put((data, audio))
+
+
+async def process_messages(session, inbox):
+    """Work through a client's messages in order, one turn at a time"""
     while True:
+        data, audio = await inbox.get()
+        # Each message runs as its own task so interrupt() can cancel just that turn
+        session.turn = asyncio.create_task(handle_message(session, data, audio))
         try:
-            current_time = datetime.now()
-            for reminder in reminders:
-                if reminder.get("active", True):
-                    reminder_time = datetime.strptime(reminder["time"], "%Y-%m-%d %H:%M")
-
-                    # Check if reminder time has passed
-                    if current_time >= reminder_time:
-                        # Mark as inactive
-                        reminder["active"] = False
-
-                        # Send reminder notification to client
-                        await websocket.send(json.dumps({
-                            'type': 'reminder',
-                            'data': {
-                                'message': f"⏰ Reminder: {reminder['text']}",
-                                'reminder': reminder
-                            }
-                        }))
-
-                        # Generate TTS for reminder
-                        audio_content = text_to_speech(f"Reminder: {reminder['text']}")
-                        if audio_content:
-                            audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-                            await websocket.send(json.dumps({
-                                'type': 'audio_response',
-                                'audio': audio_base64
-                            }))
-
-            await asyncio.sleep(10)  # Check every 10 seconds
-
-        except Exception as e:
-            print(f"[ERROR] Reminder checker: {e}")
-            await asyncio.sleep(10)
-
-
-    
+            await asyncio.wait([session.turn])
+        finally:
+            session.turn.cancel()
+            session.audio_bytes -= payload_bytes(audio)
+
+
+TURN_MESSAGES = ('audio', 'text')
+
+
+async def interrupt(session, inbox, reason):
+    """
+    Barge-in: cancel the turn in flight (its LLM request and queued TTS go
+    with it) and any turns still queued, and tell the client to stop playback
+    """
+    superseded = 0
+    kept = []
+    while not inbox.empty():
+        item = inbox.get_nowait()
+        if item[0].get('type') in TURN_MESSAGES:
+            superseded += 1
+            session.audio_bytes -= payload_bytes(item[1])
+        else:
+            kept.append(item)
+    for item in kept:
+        inbox.put_nowait(item)
+
+    turn = session.turn
+    cancelled = turn is not None and not turn.done()
+    if cancelled:
+        turn.cancel()
+        # Let it unwind first, so nothing from the old turn follows 'interrupt'
+        await asyncio.wait([turn])
+    # Its speech still waiting for the socket is of no use now either
+    session.outbox.drop_turn_audio()
+
+    if cancelled or superseded or reason == 'interrupt':
+        INTERRUPTS.inc()
+        log.info("Turn interrupted by %s (in flight: %s, queued dropped: %d)", reason, cancelled, superseded)
+        await session.send_json({'type': 'interrupt', 'reason': reason})
+
+
+async def handle_stream(session, inbox, data, audio):
+    """
+    Streamed microphone input. Runs on the reading side (not queued behind
+    turns) so PCM keeps flowing into the endpointer while a reply is being
+    generated; each finished utterance is queued as an ordinary audio turn.
+    """
+    utterance = None
+
+    if data['type'] == 'stream_start':
+        sample_rate = await client_sample_rate(session, data)
+        if sample_rate is None:
+            return
+        if BARGE_IN:
+            await interrupt(session, inbox, 'stream_start')
+        session.stream_sample_rate = sample_rate
+        session.stream_reply = data.get('stream', False)
+        session.endpointer = EnergyEndpointer.from_recognizer(
+            assistant.recognizer,
+            session.stream_sample_rate,
+            min_speech_seconds=MIN_SPEECH_SECONDS,
+            max_seconds=MAX_UTTERANCE_SECONDS
+        )
+        log.debug("Microphone stream started at %d Hz", session.stream_sample_rate)
+
+    elif data['type'] == 'audio_stream':
+        if session.endpointer is None or audio is None:
+            return
+        if isinstance(audio, str):
+            audio = base64.b64decode(audio)     # protocol 1: PCM as base64 in the JSON
+        utterance = session.endpointer.feed(audio)
+
+    elif data['type'] == 'stream_stop':
+        if session.endpointer is None:
+            return
+        utterance = session.endpointer.finish()
+        session.endpointer = None
+        log.debug("Microphone stream stopped")
+
+    if utterance:
+        log.debug("Utterance endpointed: %.2fs", len(utterance) / 2 / session.stream_sample_rate)
+        # One utterance per stream_start: the client stops capturing on 'endpoint'
+        session.endpointer = None
+        await session.send_json({'type': 'endpoint'})
+        await queue_message(session, inbox, {
+            'type': 'audio',
+            'format': 'pcm16',
+            'sample_rate': session.stream_sample_rate,
+            'stream': session.stream_reply
+        }, utterance)
+    elif data['type'] == 'stream_stop':
+        await session.send_json({'type': 'endpoint'})
+
+
+STREAM_MESSAGES = ('stream_start', 'audio_stream', 'stream_stop')
 
 
 async def handle_client(websocket, path):
     """Handle WebSocket client connection with logging"""
-    print(f"[CONNECT] Client connected: {websocket.remote_address}")
+    log.info("Client connected: %s", websocket.remote_address)
 
     # Initialize conversation history for this client
-    client_conversation = [
-        {"role": "system", "content": SYSTEM_PROMPT}
-    ]
-    print("[INFO] Initialized conversation history")
+    session = Session(websocket, Conversation(SYSTEM_PROMPT))
 
-    # Start reminder checker background task
-    reminder_task = asyncio.create_task(check_reminders_background(websocket))
+    # Due reminders are pushed by the server-wide scheduler
+    reminder_scheduler.register(session, session.client_id)
+    current_session.set(session)
+
+    # Turns run in their own task so the socket keeps being read: a disconnect
+    # is noticed right away and cancels whatever STT/LLM/TTS work is in flight
+    inbox = asyncio.Queue(maxsize=INBOX_SIZE)
+    turn_task = asyncio.create_task(process_messages(session, inbox))
+    sessions[session] = inbox
 
     try:
         async for message in websocket:
             try:
-                print(f"[RECEIVED] Raw message: {message[:100]}...")  # truncated for readability
-                data = json.loads(message)
-                print(f"[PARSE] JSON parsed successfully: type={data.get('type')}")
-
-                if data['type'] == 'audio':
-                    print("[INFO] Audio message received")
-
-                    # Process audio to text
-                    text = assistant.process_audio(data['audio'])
-                    print(f"[TRANSCRIPTION] Recognized text: {text}")
-
-                    # Check if transcription was successful
-                    if text and not text.startswith("[ERROR]") and not text.startswith("[WARN]"):
-                        # Send transcription
-                        await websocket.send(json.dumps({
-                            'type': 'transcription',
-                            'text': text
-                        }))
-                        print("[SEND] Transcription sent to client")
-
-                        # Process command with AI
-                        print("[INFO] Sending text to AI for processing")
-                        response = await assistant.process_command(text, client_conversation)
-                        print(f"[AI RESPONSE] {response['message']}")
-
-                        # Update conversation history
-                        print("[INFO] Updating conversation history")
-                        client_conversation.append({"role": "user", "content": text})
-                        if response.get("conversation_update"):
-                            if isinstance(response["conversation_update"], list):
-                                client_conversation.extend(response["conversation_update"])
-                            else:
-                                client_conversation.append(response["conversation_update"])
-                        print(f"[INFO] Conversation history length: {len(client_conversation)}")
-
-                        # Keep conversation history manageable (last 20 messages)
-                        if len(client_conversation) > 21:
-                            client_conversation = [client_conversation[0]] + client_conversation[-20:]
-                            print("[INFO] Truncated conversation history to last 20 messages")
-
-                        # Send response
-                        await websocket.send(json.dumps({
-                            'type': 'response',
-                            'data': response
-                        }))
-
-                        print("[SEND] AI response sent to client")
-
-                        # Generate and send speech audio
-                        if response['message']:
-                            print("[INFO] Generating TTS audio")
-                            audio_content = text_to_speech(response['message'])
-                            if audio_content:
-                                audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-                                await websocket.send(json.dumps({
-                                    'type': 'audio_response',
-                                    'audio': audio_base64
-                                }))
-                                print("[SEND] TTS audio sent to client")
-                    else:
-                        # Send error to client
-                        print(f"[WARN] Audio processing failed: {text}")
-                        await websocket.send(json.dumps({
-                            'type': 'error',
-                            'message': 'Could not process audio. Please try again.'
-                        }))
-
-                elif data['type'] == 'text':
-                    print("[INFO] Text message received")
-                    text = data['text']
-                    print(f"[USER MESSAGE] {text}")
-
-                    response = await assistant.process_command(text, client_conversation)
-                    print(f"[AI RESPONSE] {response['message']}")
-
-                    # Update conversation history
-                    client_conversation.append({"role": "user", "content": text})
-                    if response.get("conversation_update"):
-                        if isinstance(response["conversation_update"], list):
-                            client_conversation.extend(response["conversation_update"])
-                        else:
-                            client_conversation.append(response["conversation_update"])
-                    print(f"[INFO] Conversation history length: {len(client_conversation)}")
-
-                    # Keep conversation history manageable
-                    if len(client_conversation) > 21:
-                        client_conversation = [client_conversation[0]] + client_conversation[-20:]
-                        print("[INFO] Truncated conversation history to last 20 messages")
-
-                    await websocket.send(json.dumps({
-                        'type': 'response',
-                        'data': response
-                    }))
-                    print("[SEND] AI response sent to client")
-
-                    # Generate and send speech audio
-                    if response['message']:
-                        print("[INFO] Generating TTS audio")
-                        audio_content = text_to_speech(response['message'])
-                        if audio_content:
-                            audio_base64 = base64.b64encode(audio_content).decode('utf-8')
-                            await websocket.send(json.dumps({
-                                'type': 'audio_response',
-                                'audio': audio_base64
-                            }))
-                            print("[SEND] TTS audio sent to client")
-
-            except json.JSONDecodeError:
-                print("[ERROR] Invalid JSON format")
-                await websocket.send(json.dumps({
+                data, audio = parse_message(message)
+            except (json.JSONDecodeError, ValueError) as e:
+                log.error("Invalid message format: %s", e)
+                await session.send_json({
                     'type': 'error',
                     'message': 'Invalid JSON format'
-                }))
+                })
+                continue
+            # Protocol 1: the base64 audio lives on in data; don't keep the raw frame as well
+            del message
+
+            try:
+                if data.get('type') in STREAM_MESSAGES:
+                    await handle_stream(session, inbox, data, audio)
+                elif data.get('type') == 'interrupt':
+                    await interrupt(session, inbox, 'interrupt')
+                else:
+                    if BARGE_IN and data.get('type') in TURN_MESSAGES:
+                        await interrupt(session, inbox, data['type'])
+                    await queue_message(session, inbox, data, audio)
+            except websockets.exceptions.ConnectionClosed:
+                raise
             except Exception as e:
-                print(f"[ERROR] Processing message failed: {e}")
-                import traceback
-                traceback.print_exc()
-                await websocket.send(json.dumps({
+                log.exception("Handling %s message failed: %s", data.get('type'), e)
+                await session.send_json({
                     'type': 'error',
                     'message': str(e)
-                }))
+                })
 
     except websockets.exceptions.ConnectionClosed:
-        print(f"[DISCONNECT] Client disconnected: {websocket.remote_address}")
+        log.info("Client disconnected: %s", websocket.remote_address)
     finally:
-        # Cancel reminder task when client disconnects
-        reminder_task.cancel()
-
-
-
-
-async def start_server():
-    import websockets
-    async with websockets.serve(handle_client, "localhost", 8765, max_size=10 ** 7):
-        await asyncio.Future()
+        # Cancel in-flight work when the client disconnects
+        turn_task.cancel()
+        sessions.pop(session, None)
+        reminder_scheduler.unregister(session, session.client_id)
+        await session.outbox.close()
+
+
+
+
+async def start_server(host: str = "localhost", port: int = 8765, stt: STTBackend = None, llm=None,
+                       synthesize_fn=None, reuse_port: bool = False):
+    """
+    Run the WebSocket server until cancelled. stt, llm and synthesize_fn
+    replace the configured backends (synthesize_fn runs in threads), e.g.
+    with stubs for benchmarks; the others are created in parallel before
+    the socket is bound. reuse_port lets worker processes share the port
+    """
+    started = time.perf_counter()
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if LOG_LEVEL != "DEBUG":
+        logging.getLogger("httpx").setLevel(logging.WARNING)     # one line per Groq request otherwise
+    metrics_server = None
+    memory_tracer.start()
+    if METRICS_PORT >= 0:
+        register_metrics()
+        # One endpoint per worker: METRICS_PORT, METRICS_PORT + 1, ...
+        metrics_server = MetricsServer(port=METRICS_PORT + WORKER_INDEX if METRICS_PORT else 0)
+        metrics_server.route("/debug/memory", memory_tracer.route(
+            lambda: {session.client_id: session.memory() for session in sessions}
+        ))
+        await metrics_server.start()
+
+    backends.load_plugins()
+    configured = {'stt': STT_BACKEND, 'llm': LLM_BACKEND, 'tts': TTS_BACKEND}
+    injected = {'stt': stt, 'llm': llm, 'tts': synthesize_fn}
+    created = await backends.create_all({kind: configured[kind] for kind in configured if injected[kind] is None})
+    STARTUP_SECONDS.set(time.perf_counter() - started, phase='backends')
+
+    assistant.stt = stt or created['stt']
+    assistant.llm = llm or created['llm']
+    tts_service.synthesize_fn = synthesize_fn or created['tts']
+    tts_service.use_processes = synthesize_fn is None
+
+    tts_service.start()
+    transcoder.start()
+    # Model warm-up (local STT) and the reminder load overlap too
+    await asyncio.gather(assistant.stt.start(), asyncio.to_thread(load_reminders))
+    reminder_scheduler.start(
+        deliver_reminder, claim=claim_reminder, fetch_due=due_reminders,
+        poll_interval=REMINDER_POLL_SECONDS if WORKERS > 1 else 0.0
+    )
+    if TTS_PREWARM:
+        # In the codec most clients will negotiate: the server's first choice
+        asyncio.create_task(tts_service.prewarm(common_phrases(), transcoder.offered[0]))
+    try:
+        async with websockets.serve(handle_client, host, port, max_size=MAX_MESSAGE_BYTES, reuse_port=reuse_port):
+            elapsed = time.perf_counter() - started
+            STARTUP_SECONDS.set(elapsed, phase='ready')
+            log.info("Listening on ws://%s:%d, ready in %.0f ms", host, port, elapsed * 1000)
+            await asyncio.Future()
+    finally:
+        await reminder_scheduler.close()
+        await asyncio.to_thread(store.close)
+        await assistant.stt.close()
+        await tts_service.close()
+        transcoder.close()
+        if metrics_server:
+            await metrics_server.close()
+        memory_tracer.stop()
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from multiprocessing.connection import wait
+from .config import WORKERS, LOG_LEVEL
+
+log = logging.getLogger(__name__)
+
+RESTART_DELAY = 1.0     # seconds between a worker dying and its replacement starting
+
+
+def _interrupt(*_):
+    raise KeyboardInterrupt
+
+
+def stop_on_sigterm():
+    """
+    Turn SIGTERM into KeyboardInterrupt, so asyncio.run() cancels
+    start_server() and its cleanup (store flush, TTS pool) runs
+    """
+    signal.signal(signal.SIGTERM, _interrupt)
+
+
+def _run_worker(host: str, port: int):
+    # WORKER_INDEX is already in this process's environment, read by config on import
+    from .websocket_server import start_server
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)    # the supervisor decides when workers stop
+    stop_on_sigterm()
+    try:
+        asyncio.run(start_server(host, port, reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+
+class WorkerPool:
+    """
+    Pre-forked server processes sharing one port.
+
+    Every worker binds host:port with SO_REUSEPORT and the kernel spreads
+    new connections across them; everything a client needs on another
+    worker (reminders, messages, its conversation) is in the shared SQLite
+    store. A worker that exits is restarted with the same index, so ids it
+    hands out keep their stride; its clients reconnect and carry on.
+    """
+
+    def __init__(self, workers: int = WORKERS, host: str = "localhost", port: int = 8765):
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.restarts = 0
+        self._context = multiprocessing.get_context("spawn")
+        self._processes = []
+        self._stopping = False
+
+    def _spawn(self, index: int):
+        os.environ["WORKER_INDEX"] = str(index)
+        os.environ["WORKERS"] = str(self.workers)
+        process = self._context.Process(
+            target=_run_worker, args=(self.host, self.port), name=f"worker-{index}"
+        )
+        process.start()
+        return process
+
+    def start(self):
+        self._processes = [self._spawn(index) for index in range(self.workers)]
+        log.info("Started %d workers on ws://%s:%d", self.workers, self.host, self.port)
+
+    def stop(self, *_):
+        self._stopping = True
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            process.join(10)
+
+    def run(self):
+        """Start the workers and keep them running until SIGINT/SIGTERM"""
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise RuntimeError("WORKERS > 1 needs SO_REUSEPORT (Linux, macOS, BSD)")
+        signal.signal(signal.SIGTERM, self.stop)
+        self.start()
+        try:
+            while not self._stopping:
+                wait([process.sentinel for process in self._processes], timeout=1.0)
+                for index, process in enumerate(self._processes):
+                    if process.is_alive() or self._stopping:
+                        continue
+                    log.warning("Worker %d exited with code %s, restarting", index, process.exitcode)
+                    time.sleep(RESTART_DELAY)
+                    self._processes[index] = self._spawn(index)
+                    self.restarts += 1
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+def run_workers(workers: int = WORKERS, host: str = "localhost", port: int = 8765):
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    WorkerPool(workers, host, port).run()
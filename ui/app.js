@@ -3,8 +3,41 @@ const state = {
     ws: null,
     mediaRecorder: null,
     audioChunks: [],
+    capture: null,
     isRecording: false,
-    isConnected: false
+    isConnected: false,
+    streamingMessage: null,
+    protocol: 1
+};
+
+// Protocol 2 sends audio as binary frames: [u32 header length][JSON header][audio bytes]
+const PROTOCOL_VERSION = 2;
+
+// Speech codecs this browser plays, best first; the server picks from these in 'hello'
+function playableCodecs() {
+    const probe = document.createElement('audio');
+    const codecs = [['opus', 'audio/ogg; codecs=opus'], ['webm', 'audio/webm; codecs=opus'], ['mp3', 'audio/mpeg']];
+    return codecs.filter(([, mime]) => probe.canPlayType(mime) !== '').map(([name]) => name).concat('wav');
+}
+
+// Stable per-browser id so reminders set here are delivered here after a reconnect
+function getClientId() {
+    let id = localStorage.getItem('ariaClientId');
+    if (!id) {
+        id = (crypto.randomUUID ? crypto.randomUUID() : String(Date.now()) + Math.random().toString(16).slice(2));
+        localStorage.setItem('ariaClientId', id);
+    }
+    return id;
+}
+
+// Gapless playback of streamed audio_chunk messages
+const playback = {
+    ctx: null,
+    turn: 0,
+    nextSeq: 0,
+    nextTime: 0,
+    pending: new Map(),
+    sources: new Set()
 };
 
 
@@ -31,6 +64,7 @@ const elements = {
 // ===== WebSocket Connection =====
 function connectWebSocket() {
     state.ws = new WebSocket('ws://localhost:8765');
+    state.ws.binaryType = 'arraybuffer';
 
     state.ws.onopen = handleConnect;
     state.ws.onmessage = handleMessage;
@@ -41,6 +75,10 @@ function connectWebSocket() {
 function handleConnect() {
     console.log('✅ Connected to AI Voice Assistant');
     state.isConnected = true;
+    state.protocol = 1;
+    state.ws.send(JSON.stringify({
+        type: 'hello', protocol: PROTOCOL_VERSION, client_id: getClientId(), audio: playableCodecs()
+    }));
     updateStatus('connected', 'Connected');
     enableControls(true);
     showNotification('Connected to ARIA', 'success');
@@ -48,21 +86,47 @@ function handleConnect() {
 
 function handleMessage(event) {
     try {
+        if (event.data instanceof ArrayBuffer) {
+            handleBinaryFrame(event.data);
+            return;
+        }
+
         const data = JSON.parse(event.data);
         
         switch(data.type) {
+            case 'hello':
+                state.protocol = data.protocol;
+                break;
             case 'transcription':
                 handleTranscription(data.text);
                 break;
             case 'response':
-                handleResponse(data.data);
+                if (data.streamed) {
+                    finishStreamedResponse(data.data);
+                } else {
+                    handleResponse(data.data);
+                }
+                break;
+            case 'response_delta':
+                handleResponseDelta(data.text);
                 break;
             case 'audio_response':
-                playAudioResponse(data.audio);
+                playAudioResponse(data.audio, data.mime);
+                break;
+            case 'audio_chunk':
+                queueAudioChunk(data.seq, data.audio);
                 break;
             case 'reminder':
                 handleReminder(data.data);
                 break;
+            case 'interrupt':
+                // Server cancelled the reply; drop anything of it that already arrived
+                handleInterrupt();
+                break;
+            case 'endpoint':
+                // Server heard the end of the utterance
+                stopStreaming(false);
+                break;
             case 'error':
                 handleErrorMessage(data.message);
                 break;
@@ -72,6 +136,30 @@ function handleMessage(event) {
     }
 }
 
+function encodeFrame(header, payload) {
+    const head = new TextEncoder().encode(JSON.stringify(header));
+    const frame = new Uint8Array(4 + head.length + payload.byteLength);
+    new DataView(frame.buffer).setUint32(0, head.length);
+    frame.set(head, 4);
+    frame.set(new Uint8Array(payload), 4 + head.length);
+    return frame.buffer;
+}
+
+function handleBinaryFrame(buffer) {
+    const length = new DataView(buffer).getUint32(0);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, length)));
+    const audio = new Uint8Array(buffer, 4 + length);
+
+    switch(header.type) {
+        case 'audio_response':
+            playAudioResponse(audio, header.mime);
+            break;
+        case 'audio_chunk':
+            queueAudioChunk(header.seq, audio);
+            break;
+    }
+}
+
 function handleError(error) {
     console.error('❌ WebSocket error:', error);
     updateStatus('disconnected', 'Connection error');
@@ -81,6 +169,7 @@ function handleError(error) {
 function handleDisconnect() {
     console.log('🔌 Disconnected from server');
     state.isConnected = false;
+    stopStreaming(false);
     updateStatus('disconnected', 'Disconnected');
     enableControls(false);
     
@@ -124,6 +213,36 @@ function handleResponse(response) {
     }
 }
 
+function handleResponseDelta(text) {
+    if (!state.streamingMessage) {
+        setThinking(false);
+        state.streamingMessage = addMessage('', 'assistant');
+        state.streamingMessage.dataset.text = '';
+    }
+    const message = state.streamingMessage;
+    message.dataset.text += text;
+    message.querySelector('.message-content').textContent = message.dataset.text;
+    elements.chatContainer.scrollTop = elements.chatContainer.scrollHeight;
+}
+
+function finishStreamedResponse(response) {
+    // Swap the live bubble for the final one (adds the function badge and data cards)
+    if (state.streamingMessage) {
+        state.streamingMessage.remove();
+        state.streamingMessage = null;
+    }
+    handleResponse(response);
+}
+
+function handleInterrupt() {
+    stopPlayback();
+    setThinking(false);
+    if (state.streamingMessage) {
+        state.streamingMessage.classList.add('interrupted');
+        state.streamingMessage = null;
+    }
+}
+
 function handleReminder(data) {
     addMessage(data.message, 'assistant');
     showNotification(data.reminder.text, 'info', '⏰ Reminder');
@@ -136,6 +255,120 @@ function handleErrorMessage(message) {
 }
 
 // ===== Voice Recording =====
+// AudioWorklet that converts microphone input to 16-bit PCM in ~100 ms chunks
+const PCM_WORKLET = `
+class PcmCapture extends AudioWorkletProcessor {
+    constructor() {
+        super();
+        this.chunk = new Int16Array(Math.round(sampleRate / 10));
+        this.length = 0;
+    }
+    process(inputs) {
+        const input = inputs[0][0];
+        if (input) {
+            for (let i = 0; i < input.length; i++) {
+                const s = Math.max(-1, Math.min(1, input[i]));
+                this.chunk[this.length++] = s < 0 ? s * 0x8000 : s * 0x7fff;
+                if (this.length === this.chunk.length) {
+                    this.port.postMessage(this.chunk.buffer, [this.chunk.buffer]);
+                    this.chunk = new Int16Array(this.chunk.length);
+                    this.length = 0;
+                }
+            }
+        }
+        return true;
+    }
+}
+registerProcessor('pcm-capture', PcmCapture);
+`;
+
+async function startListening() {
+    // Barge-in: the user talking over a reply stops it (the server cancels it too)
+    stopPlayback();
+    // Protocol 2 clients stream PCM and let the server detect the end of speech
+    if (state.protocol >= 2 && window.AudioWorkletNode) {
+        await startStreaming();
+    } else {
+        await startRecording();
+    }
+}
+
+function stopListening() {
+    if (state.capture) {
+        stopStreaming(true);
+    } else {
+        stopRecording();
+    }
+}
+
+async function startStreaming() {
+    let stream = null;
+    let ctx = null;
+    try {
+        stream = await navigator.mediaDevices.getUserMedia({
+            audio: {
+                channelCount: 1,
+                echoCancellation: true,
+                noiseSuppression: true
+            }
+        });
+
+        ctx = new AudioContext({ sampleRate: 16000 });
+        const workletUrl = URL.createObjectURL(new Blob([PCM_WORKLET], { type: 'application/javascript' }));
+        await ctx.audioWorklet.addModule(workletUrl);
+        URL.revokeObjectURL(workletUrl);
+
+        const source = ctx.createMediaStreamSource(stream);
+        const node = new AudioWorkletNode(ctx, 'pcm-capture');
+        node.port.onmessage = (event) => {
+            if (state.ws && state.ws.readyState === WebSocket.OPEN) {
+                state.ws.send(encodeFrame({ type: 'audio_stream' }, event.data));
+            }
+        };
+
+        state.ws.send(JSON.stringify({ type: 'stream_start', sample_rate: ctx.sampleRate, stream: true }));
+        source.connect(node);
+
+        state.capture = { stream, ctx, source, node };
+        state.isRecording = true;
+        startRecordingUI('Listening...');
+
+    } catch (error) {
+        if (!stream) {
+            console.error('Microphone error:', error);
+            showNotification('Could not access microphone', 'error');
+            return;
+        }
+        // The mic works but AudioContext/AudioWorklet setup failed (e.g. Firefox
+        // refusing a 16 kHz context): release it and record whole clips instead
+        console.warn('PCM streaming unavailable, recording clips instead:', error);
+        stream.getTracks().forEach(track => track.stop());
+        if (ctx) {
+            ctx.close();
+        }
+        await startRecording();
+    }
+}
+
+function stopStreaming(notifyServer) {
+    const capture = state.capture;
+    if (!capture) {
+        return;
+    }
+    state.capture = null;
+    state.isRecording = false;
+
+    capture.source.disconnect();
+    capture.node.port.onmessage = null;
+    capture.stream.getTracks().forEach(track => track.stop());
+    capture.ctx.close();
+
+    if (notifyServer && state.ws && state.ws.readyState === WebSocket.OPEN) {
+        state.ws.send(JSON.stringify({ type: 'stream_stop' }));
+    }
+    stopRecordingUI();
+}
+
 async function startRecording() {
     try {
         const stream = await navigator.mediaDevices.getUserMedia({
@@ -156,13 +389,18 @@ async function startRecording() {
 
         state.mediaRecorder.onstop = async () => {
             const audioBlob = new Blob(state.audioChunks, { type: 'audio/webm' });
-            const reader = new FileReader();
-            
-            reader.readAsDataURL(audioBlob);
-            reader.onloadend = () => {
-                const base64Audio = reader.result.split(',')[1];
-                sendAudio(base64Audio);
-            };
+
+            if (state.protocol >= 2) {
+                sendAudio(await audioBlob.arrayBuffer());
+            } else {
+                const reader = new FileReader();
+
+                reader.readAsDataURL(audioBlob);
+                reader.onloadend = () => {
+                    const base64Audio = reader.result.split(',')[1];
+                    sendAudio(base64Audio);
+                };
+            }
 
             stream.getTracks().forEach(track => track.stop());
             stopRecordingUI();
@@ -192,10 +430,10 @@ function stopRecording() {
     }
 }
 
-function startRecordingUI() {
+function startRecordingUI(status = 'Listening... (5s max)') {
     elements.micButton.classList.add('listening');
     elements.voiceVisualizer.classList.add('active');
-    elements.micStatus.textContent = 'Listening... (5s max)';
+    elements.micStatus.textContent = status;
     updateStatus('listening', 'Listening');
 }
 
@@ -207,20 +445,28 @@ function stopRecordingUI() {
 }
 
 // ===== Message Sending =====
-function sendAudio(base64Audio) {
+function sendAudio(audio) {
     if (state.ws && state.ws.readyState === WebSocket.OPEN) {
+        stopPlayback();
+        if (audio instanceof ArrayBuffer) {
+            state.ws.send(encodeFrame({ type: 'audio', format: 'webm', stream: true }, audio));
+            return;
+        }
         state.ws.send(JSON.stringify({
             type: 'audio',
-            audio: base64Audio
+            audio: audio,
+            stream: true
         }));
     }
 }
 
 function sendTextMessage(text) {
     if (state.ws && state.ws.readyState === WebSocket.OPEN) {
+        stopPlayback();
         state.ws.send(JSON.stringify({
             type: 'text',
-            text: text
+            text: text,
+            stream: true
         }));
         addMessage(text, 'user');
         setThinking(true);
@@ -257,6 +503,7 @@ function addMessage(text, sender, functionCalled = null) {
     messageDiv.innerHTML = content;
     elements.chatContainer.appendChild(messageDiv);
     elements.chatContainer.scrollTop = elements.chatContainer.scrollHeight;
+    return messageDiv;
 }
 
 function clearChat() {
@@ -330,16 +577,24 @@ function createDataCard(title, content) {
 }
 
 // ===== Audio Playback =====
-async function playAudioResponse(base64Audio) {
+function audioBytes(audio) {
+    if (audio instanceof Uint8Array) {
+        return audio;     // binary frame payload, already raw bytes
+    }
+    const audioData = atob(audio);
+    const bytes = new Uint8Array(audioData.length);
+
+    for (let i = 0; i < audioData.length; i++) {
+        bytes[i] = audioData.charCodeAt(i);
+    }
+    return bytes;
+}
+
+async function playAudioResponse(audio, mime = 'audio/wav') {
     try {
-        const audioData = atob(base64Audio);
-        const arrayBuffer = new Uint8Array(audioData.length);
-        
-        for (let i = 0; i < audioData.length; i++) {
-            arrayBuffer[i] = audioData.charCodeAt(i);
-        }
+        const arrayBuffer = audioBytes(audio);
 
-        const blob = new Blob([arrayBuffer], { type: 'audio/wav' });
+        const blob = new Blob([arrayBuffer], { type: mime });
         const url = URL.createObjectURL(blob);
 
         elements.audioPlayer.src = url;
@@ -354,6 +609,71 @@ async function playAudioResponse(base64Audio) {
     }
 }
 
+function unlockAudio() {
+    // Browsers only start an AudioContext from a user gesture
+    if (!playback.ctx) {
+        playback.ctx = new (window.AudioContext || window.webkitAudioContext)();
+    }
+    if (playback.ctx.state === 'suspended') {
+        playback.ctx.resume();
+    }
+}
+
+async function queueAudioChunk(seq, audio) {
+    try {
+        unlockAudio();
+        // seq 0 starts a new reply; it is queued behind whatever is still playing
+        if (seq === 0) {
+            playback.turn++;
+            playback.nextSeq = 0;
+            playback.pending.clear();
+        }
+        const turn = playback.turn;
+
+        // Chunks decode concurrently but are scheduled strictly in seq order
+        // decodeAudioData detaches its input, so hand it a copy of just this clip
+        const buffer = await playback.ctx.decodeAudioData(audioBytes(audio).slice().buffer);
+        if (turn !== playback.turn) {
+            return;
+        }
+        playback.pending.set(seq, buffer);
+
+        while (playback.pending.has(playback.nextSeq)) {
+            const next = playback.pending.get(playback.nextSeq);
+            playback.pending.delete(playback.nextSeq);
+            playback.nextSeq++;
+
+            const source = playback.ctx.createBufferSource();
+            source.buffer = next;
+            source.connect(playback.ctx.destination);
+
+            const startAt = Math.max(playback.ctx.currentTime, playback.nextTime);
+            playback.sources.add(source);
+            source.onended = () => playback.sources.delete(source);
+            source.start(startAt);
+            playback.nextTime = startAt + next.duration;
+        }
+    } catch (error) {
+        console.error('Error playing audio chunk:', error);
+    }
+}
+
+function stopPlayback() {
+    // Whole replies play through the <audio> element, streamed ones through Web Audio
+    elements.audioPlayer.pause();
+    elements.audioPlayer.removeAttribute('src');
+
+    playback.turn++;
+    playback.nextSeq = 0;
+    playback.pending.clear();
+    playback.sources.forEach(source => {
+        source.onended = null;
+        source.stop();
+    });
+    playback.sources.clear();
+    playback.nextTime = 0;
+}
+
 // ===== Notifications =====
 function showNotification(message, type = 'info', title = null) {
     // You can implement a custom notification system here
@@ -381,6 +701,7 @@ function sendQuickAction(command) {
 }
 
 function sendTextCommand() {
+    unlockAudio();
     const text = elements.textInput.value.trim();
     if (text && state.ws && state.ws.readyState === WebSocket.OPEN) {
         sendTextMessage(text);
@@ -396,11 +717,12 @@ elements.micButton.addEventListener('click', () => {
     wakeSound.play().catch(err => {
         console.warn('Wake sound blocked:', err);
     });
+    unlockAudio();
 
     if (!state.isRecording) {
-        startRecording();
+        startListening();
     } else {
-        stopRecording();
+        stopListening();
     }
 });
 